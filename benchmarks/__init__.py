@@ -0,0 +1 @@
+"""Performance benchmarks, run on generated data."""
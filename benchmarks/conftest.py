@@ -0,0 +1,91 @@
+from collections.abc import Iterable, Iterator
+from functools import cache
+from pathlib import Path
+from sqlite3 import connect
+
+import pytest
+from pandas import DataFrame
+
+from src.data.synthetic_movies import CatalogueProfile, SyntheticMovieGenerator
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.sqlite_conn import SQLiteConn
+
+CATALOGUE_SIZES: list[int] = [8_000, 50_000, 200_000]
+REQUIRED_FEATURES: list[str] = [
+    "original_title",
+    "original_language",
+    "popularity",
+    "vote_average",
+    "vote_count",
+    "is_popular",
+    "runtime",
+    "budget",
+    "revenue",
+    "genres",
+    "spoken_languages",
+]
+
+
+@cache
+def movies(rows: int) -> DataFrame:
+    """Synthetic catalogue fitted on the raw snapshots, shared by every benchmark."""
+    return SyntheticMovieGenerator(CatalogueProfile.from_parquet()).generate(rows)
+
+
+class InMemoryFeatureStore(FeatureStoreInterface):
+    """Feature store returning the generated catalogue, to time models without SQLite."""
+
+    def __init__(self, features: DataFrame):
+        self.features = features
+
+    def insert(self, feature_group: str, features: DataFrame, mode: str = "append") -> None:
+        pass
+
+    def fetch_existing_movie_ids(self, feature_group: str) -> set:
+        return set(self.features["id"])
+
+    def fetch_watermark(self, feature_group: str, name: str) -> str | None:
+        return None
+
+    def store_watermark(self, feature_group: str, name: str, value: str) -> None:
+        pass
+
+    def query_features(
+        self, feature_group: str, columns: list[str] | None = None, as_of: str | None = None
+    ) -> DataFrame:
+        return self.features[columns] if columns else self.features
+
+    def iter_features(
+        self, feature_group: str, columns: list[str] | None = None, chunk_size: int = 50_000
+    ) -> Iterator[DataFrame]:
+        features: DataFrame = self.query_features(feature_group, columns)
+        for start in range(0, len(features), chunk_size):
+            yield features.iloc[start : start + chunk_size]
+
+    def fetch_stale_movie_ids(
+        self, feature_group: str, extracted_before: str, limit: int
+    ) -> list[int]:
+        return []
+
+    def store_refresh_attempts(self, feature_group: str, ids: list[int], attempted_on: str) -> None:
+        pass
+
+    def update_features(self, feature_group: str, features: DataFrame, key: str = "id") -> int:
+        return 0
+
+    def update_popular_movies(self, feature_group: str, popular_ids: set[int]) -> int:
+        return 0
+
+    def get_features_by_ids(
+        self, feature_group: str, ids: Iterable[int], columns: list[str] | None = None
+    ) -> DataFrame:
+        features: DataFrame = self.features[self.features["id"].isin(list(ids))]
+        return features[["id", *columns]] if columns else features
+
+
+@pytest.fixture(scope="session")
+def sqlite_store(tmp_path_factory: pytest.TempPathFactory) -> SQLiteConn:
+    """SQLite feature store in a temporary database."""
+    db_path: Path = tmp_path_factory.mktemp("feature_store") / "feature_store.sqlite"
+    connect(db_path).close()
+    return SQLiteConn(str(db_path))
@@ -0,0 +1,62 @@
+"""Compare the vectorized multi-label binarization with the row-wise implementation.
+
+Usage:
+    python -m benchmarks.multilabel_binarizer --rows 1000000
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from loguru import logger
+from numpy import array_equal
+from pandas import DataFrame
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from src.data.synthetic_movies import CatalogueProfile, SyntheticMovieGenerator
+from src.pipelines.training_pipeline.movie_feature_preprocessor import (
+    MovieFeaturePreprocessor,
+    MultiLabelBinarizerTransformer,
+)
+
+
+def row_wise(X: DataFrame) -> tuple:
+    """Previous implementation: per-row mapping and sklearn's dense MultiLabelBinarizer."""
+    mappings = MovieFeaturePreprocessor.SPOKEN_LANGUAGES_MAPPINGS
+    mapped = X["spoken_languages"].apply(
+        lambda x: [mappings.get(item, "Unknown/Other") for item in x]
+    )
+    mlb = MultiLabelBinarizer()
+    return mlb.fit_transform(mapped), mlb.classes_.tolist()
+
+
+def vectorized(X: DataFrame) -> tuple:
+    transformer = MultiLabelBinarizerTransformer(
+        mappings=MovieFeaturePreprocessor.SPOKEN_LANGUAGES_MAPPINGS
+    )
+    return transformer.fit_transform(X), transformer.get_feature_names_out()
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    rows: int = parser.parse_args().rows
+
+    X: DataFrame = SyntheticMovieGenerator(CatalogueProfile.from_parquet()).generate(rows)[
+        ["spoken_languages"]
+    ]
+    timings: dict[str, float] = {}
+    outputs: dict[str, tuple] = {}
+    for name, implementation in (("row-wise", row_wise), ("vectorized", vectorized)):
+        start: float = perf_counter()
+        outputs[name] = implementation(X)
+        timings[name] = perf_counter() - start
+        logger.info(f"{name:>10}: {timings[name]:.2f}s")
+
+    (dense, dense_names), (sparse, sparse_names) = outputs["row-wise"], outputs["vectorized"]
+    assert dense_names == sparse_names
+    assert array_equal(dense, sparse.toarray())
+    logger.info(f"{rows} rows, speedup x{timings['row-wise'] / timings['vectorized']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.conftest import REQUIRED_FEATURES, movies
+from src.utils.sqlite_conn import SQLiteConn
+
+SIZES: list[int] = [8_000, 50_000]
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_insert(benchmark: BenchmarkFixture, sqlite_store: SQLiteConn, rows: int) -> None:
+    features = movies(rows)
+    benchmark.pedantic(
+        sqlite_store.insert,
+        args=(f"movies_insert_{rows}", features, "replace"),
+        rounds=3,
+    )
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_query_features(benchmark: BenchmarkFixture, sqlite_store: SQLiteConn, rows: int) -> None:
+    sqlite_store.insert(f"movies_query_{rows}", movies(rows), "replace")
+    features = benchmark.pedantic(
+        sqlite_store.query_features,
+        args=(f"movies_query_{rows}", ["id", *REQUIRED_FEATURES]),
+        rounds=3,
+    )
+    assert len(features) == rows
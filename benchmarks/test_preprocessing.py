@@ -0,0 +1,15 @@
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.conftest import CATALOGUE_SIZES, REQUIRED_FEATURES, movies
+from src.pipelines.training_pipeline.movie_feature_preprocessor import MovieFeaturePreprocessor
+
+
+@pytest.mark.parametrize("rows", CATALOGUE_SIZES)
+def test_fit_transform(benchmark: BenchmarkFixture, rows: int) -> None:
+    features = movies(rows)[REQUIRED_FEATURES].convert_dtypes()
+    matrix = benchmark.pedantic(
+        lambda: MovieFeaturePreprocessor.get_preprocessor().fit_transform(features),
+        rounds=3,
+    )
+    assert matrix.shape[0] == rows
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+from sklearn.metrics.pairwise import cosine_similarity
+
+from benchmarks.conftest import CATALOGUE_SIZES, REQUIRED_FEATURES, InMemoryFeatureStore, movies
+from src.pipelines.inference_pipeline.pipeline import (
+    InferencePipelineConfig,
+    MovieInferencePipeline,
+)
+from src.pipelines.training_pipeline.movie_feature_preprocessor import MovieFeaturePreprocessor
+from src.utils.embedding_store import EmbeddingStore
+from src.utils.recommender_models import RecommenderModel, RecommenderModelConfig
+
+EMBEDDING_GROUP: str = "movie_embeddings"
+
+
+def build_model(rows: int, embedding_store: EmbeddingStore) -> RecommenderModel:
+    return RecommenderModel(
+        RecommenderModelConfig(
+            model_name="cosine-smilarity-movies",
+            feature_store=InMemoryFeatureStore(movies(rows)),
+            training_feature_group="movies",
+            similarity_matrix_group="cosine_similarity_movies",
+            required_features=REQUIRED_FEATURES,
+            transformation_pipeline=MovieFeaturePreprocessor.get_preprocessor(),
+            model=cosine_similarity,
+            embedding_group=EMBEDDING_GROUP,
+            embedding_store=embedding_store,
+        )
+    )
+
+
+@pytest.mark.parametrize("rows", CATALOGUE_SIZES)
+def test_fit(benchmark: BenchmarkFixture, tmp_path: Path, rows: int) -> None:
+    embedding_store = EmbeddingStore(str(tmp_path))
+    model = benchmark.pedantic(lambda: build_model(rows, embedding_store).fit(), rounds=3)
+    assert model.embeddings is not None
+
+
+@pytest.mark.parametrize("rows", CATALOGUE_SIZES)
+def test_recommend_latency(benchmark: BenchmarkFixture, tmp_path: Path, rows: int) -> None:
+    """Latency of a single query against memory-mapped embeddings."""
+    embedding_store = EmbeddingStore(str(tmp_path))
+    build_model(rows, embedding_store).fit().store_outputs()
+    pipeline = MovieInferencePipeline(
+        InferencePipelineConfig(embedding_group=EMBEDDING_GROUP, embedding_store=embedding_store)
+    )
+
+    recommendations = benchmark(pipeline.recommend, [rows // 2])
+    assert len(recommendations) == pipeline.config.k
@@ -1,24 +1,76 @@
-from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
-
-from src.pipelines.feature_pipeline.pipeline import (
-    FeaturePipelineConfig,
-    MovieFeaturePipeline,
-)
-from src.pipelines.training_pipeline.movie_feature_preprocessor import (
-    MovieFeaturePreprocessor,
-)
-from src.pipelines.training_pipeline.pipeline import MovieTrainPipeline
+from typing import TYPE_CHECKING
+
 from src.utils.arg_parser import ArgParser, PipelineArgs
-from src.utils.recommender_models import RecommenderModel, RecommenderModelConfig
-from src.utils.sqlite_conn import SQLiteConn
+from src.utils.profiling import StageProfiler
+from src.utils.telemetry import telemetry
 
+if TYPE_CHECKING:
+    from src.utils.feature_store_interface import FeatureStoreInterface
+    from src.utils.recommender_models import RecommenderModelConfig
 
-def main() -> None:
-    ERR_MISSING_TOKEN: str = "API token must be provided for feature pipeline"  # noqa: S105
+# the pipelines and their dependencies (pandas, scikit-learn) are imported by the branch
+# that runs them, so short feature runs don't pay for loading the training stack
 
-    args: PipelineArgs = ArgParser.get()
+# features the recommender models are trained on
+MOVIE_FEATURES: list[str] = [
+    "original_title",
+    "original_language",
+    "popularity",
+    "vote_average",
+    "vote_count",
+    "is_popular",
+    "runtime",
+    "budget",
+    "revenue",
+    "genres",
+    "spoken_languages",
+]
+
+# text the text similarity model is trained on
+TEXT_FEATURES: list[str] = ["overview", "tagline"]
+
+
+def text_model_config(
+    args: PipelineArgs, feature_store: "FeatureStoreInterface", model_name: str
+) -> "RecommenderModelConfig":
+    """Text similarity model, storing the top k neighbours of each movie.
+
+    The text is always preprocessed out of core, with its own chunk size, as the overview
+    and tagline of the whole catalogue are much larger than the movie features.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    from src.pipelines.training_pipeline.text_feature_preprocessor import (
+        TextFeaturePreprocessor,
+    )
+    from src.utils.recommender_models import RecommenderModelConfig
+
+    return RecommenderModelConfig(
+        model_name=model_name,
+        feature_store=feature_store,
+        training_feature_group="movies",
+        similarity_matrix_group="text_similarity_movies",
+        required_features=TEXT_FEATURES,
+        transformation_pipeline=TextFeaturePreprocessor.get_preprocessor(
+            n_components=args.text_components
+        ),
+        model=cosine_similarity,
+        chunk_size=args.text_chunk_size,
+        chunked_fit=TextFeaturePreprocessor.fit_chunked,
+        top_k=args.top_k,
+    )
+
+
+def run_pipeline(args: PipelineArgs) -> None:  # noqa: PLR0915
+    ERR_MISSING_TOKEN: str = "API token must be provided for feature pipeline"  # noqa: S105
 
     if args.pipeline_type == "feature":
+        from src.pipelines.feature_pipeline.pipeline import (
+            FeaturePipelineConfig,
+            MovieFeaturePipeline,
+        )
+        from src.utils.sqlite_conn import SQLiteConn
+
         if not args.api_token:
             raise ValueError(ERR_MISSING_TOKEN)
 
@@ -27,32 +79,75 @@ def main() -> None:
             feature_group="movies",
             type=args.load_type,
             pages=args.pages,
+            popular_pages=args.popular_pages,
+            base_url=args.base_url,
+            max_age_days=args.max_age_days,
+            request_budget=args.request_budget,
+            raw_dir=args.raw_dir,
         )
-        feature_pipeline = MovieFeaturePipeline(config)
         feature_store = SQLiteConn(r"data/feature_store.sqlite")
-        feature_pipeline.run(feature_store)
+        if args.daemon:
+            from src.pipelines.feature_pipeline.daemon import DaemonConfig, FeatureIngestDaemon
+
+            daemon_config = DaemonConfig(
+                interval=args.interval, jitter=args.jitter, max_cycles=args.cycles
+            )
+            FeatureIngestDaemon(config, daemon_config, feature_store).serve()
+        else:
+            feature_pipeline = MovieFeaturePipeline(config)
+            feature_pipeline.run(feature_store)
+
+    elif args.pipeline_type == "backfill":
+        from src.pipelines.backfill_pipeline.pipeline import (
+            BackfillPipelineConfig,
+            MovieBackfillPipeline,
+            raw_snapshots,
+        )
+        from src.utils.sqlite_conn import SQLiteConn
+
+        backfill_config = BackfillPipelineConfig(
+            feature_group="movies",
+            paths=args.snapshots or raw_snapshots(),
+            type=args.load_type or "initial",
+        )
+        MovieBackfillPipeline(backfill_config).run(SQLiteConn(r"data/feature_store.sqlite"))
+
+    elif args.pipeline_type == "replay":
+        from src.pipelines.replay_pipeline.pipeline import (
+            MovieReplayPipeline,
+            ReplayPipelineConfig,
+        )
+        from src.utils.sqlite_conn import SQLiteConn
+
+        replay_config = ReplayPipelineConfig(
+            feature_group="movies",
+            raw_dir=args.raw_dir,
+            type=args.load_type or "initial",
+        )
+        MovieReplayPipeline(replay_config).run(SQLiteConn(r"data/feature_store.sqlite"))
 
     elif args.pipeline_type == "train":
+        from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
+
+        from src.pipelines.training_pipeline.movie_feature_preprocessor import (
+            MovieFeaturePreprocessor,
+        )
+        from src.pipelines.training_pipeline.pipeline import MovieTrainPipeline
+        from src.utils.model_registry import ModelRegistry
+        from src.utils.recommender_models import RecommenderModel, RecommenderModelConfig
+        from src.utils.sqlite_conn import SQLiteConn
+
         cosine_config = RecommenderModelConfig(
             model_name="cosine-smilarity-movies",
             feature_store=SQLiteConn(r"data/feature_store.sqlite"),
             training_feature_group="movies",
             similarity_matrix_group="cosine_similarity_movies",
-            required_features=[
-                "original_title",
-                "original_language",
-                "popularity",
-                "vote_average",
-                "vote_count",
-                "is_popular",
-                "runtime",
-                "budget",
-                "revenue",
-                "genres",
-                "spoken_languages",
-            ],
+            embedding_group="movie_embeddings",
+            required_features=MOVIE_FEATURES,
             transformation_pipeline=MovieFeaturePreprocessor.get_preprocessor(),
             model=cosine_similarity,
+            precision=args.precision,
+            chunk_size=args.chunk_size,
         )
         cosine_model: RecommenderModel = RecommenderModel(cosine_config)
         linear_kernel_config = RecommenderModelConfig(
@@ -60,30 +155,127 @@ def main() -> None:
             feature_store=SQLiteConn(r"data/feature_store.sqlite"),
             training_feature_group="movies",
             similarity_matrix_group="linear_kernel_similarity_movies",
-            required_features=[
-                "original_title",
-                "original_language",
-                "popularity",
-                "vote_average",
-                "vote_count",
-                "is_popular",
-                "runtime",
-                "budget",
-                "revenue",
-                "genres",
-                "spoken_languages",
-            ],
+            embedding_group="movie_embeddings",
+            required_features=MOVIE_FEATURES,
             transformation_pipeline=MovieFeaturePreprocessor.get_preprocessor(),
             model=linear_kernel,  # Replace with actual model type
+            precision=args.precision,
+            chunk_size=args.chunk_size,
         )
         linear_kernel_model: RecommenderModel = RecommenderModel(linear_kernel_config)
+        text_model: RecommenderModel = RecommenderModel(
+            text_model_config(
+                args, SQLiteConn(r"data/feature_store.sqlite"), "text-similarity-movies"
+            )
+        )
         (
-            MovieTrainPipeline()
+            MovieTrainPipeline(
+                executor=args.executor,
+                warm_cache_k=args.warm_cache_k,
+                hot_ids=args.hot_ids,
+                registry=ModelRegistry(r"data/06_models/registry", keep=args.keep_versions),
+            )
             .add_training_step(cosine_model)
             .add_training_step(linear_kernel_model)
+            .add_training_step(text_model)
             .save_model_outputs()
         )
 
+    elif args.pipeline_type == "inference":
+        from loguru import logger
+        from pandas import DataFrame, read_json
+
+        from src.pipelines.inference_pipeline.pipeline import (
+            InferencePipelineConfig,
+            MovieInferencePipeline,
+        )
+        from src.utils.model_registry import ModelRegistry
+        from src.utils.sqlite_conn import SQLiteConn
+
+        registry = ModelRegistry(r"data/06_models/registry")
+        inference_config = InferencePipelineConfig(
+            embedding_group="movie_embeddings",
+            kernel=args.kernel,
+            k=args.top_k,
+            feature_store=SQLiteConn(r"data/feature_store.sqlite"),
+            # embeddings stored before the registry are served until a version is published
+            registry=registry if registry.current() else None,
+            reload_seconds=None,  # a single request, no version switch to wait for
+        )
+        inference_pipeline: MovieInferencePipeline = MovieInferencePipeline(inference_config)
+        recommendations: DataFrame = (
+            inference_pipeline.recommend_features(read_json(args.features_file))
+            if args.features_file
+            else inference_pipeline.recommend(args.movie_ids or [])
+        )
+        logger.info(f"Recommendations:\n{recommendations.to_string(index=False)}")
+
+    elif args.pipeline_type == "rollback":
+        from src.utils.model_registry import ModelRegistry
+
+        ModelRegistry(r"data/06_models/registry").rollback(args.version)
+
+    elif args.pipeline_type == "evaluate":
+        from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
+
+        from src.pipelines.evaluation_pipeline.pipeline import (
+            EvaluationPipelineConfig,
+            MovieEvaluationPipeline,
+        )
+        from src.pipelines.training_pipeline.movie_feature_preprocessor import (
+            MovieFeaturePreprocessor,
+        )
+        from src.utils.recommender_models import RecommenderModelConfig, euclidean_similarity
+        from src.utils.sqlite_conn import SQLiteConn
+
+        feature_store = SQLiteConn(r"data/feature_store.sqlite")
+        models = {
+            "cosine": cosine_similarity,
+            "linear": linear_kernel,
+            "euclidean": euclidean_similarity,
+        }
+        evaluation_config = EvaluationPipelineConfig(
+            models=[
+                RecommenderModelConfig(
+                    model_name=name,
+                    feature_store=feature_store,
+                    training_feature_group="movies",
+                    similarity_matrix_group=f"{name}_similarity_movies",
+                    # kernel models are evaluated as served, from their embeddings
+                    embedding_group="movie_embeddings",
+                    required_features=MOVIE_FEATURES,
+                    transformation_pipeline=MovieFeaturePreprocessor.get_preprocessor(),
+                    model=models[name],
+                )
+                if name != "text"
+                else text_model_config(args, feature_store, name)
+                # models are judged in the feature space of the first, movie features if selected
+                for name in sorted(args.models, key=lambda name: name == "text")
+            ],
+            feature_group="movies",
+            k=args.top_k,
+        )
+        MovieEvaluationPipeline(evaluation_config).run().write()
+
+
+def main() -> None:
+    args: PipelineArgs = ArgParser.get()
+
+    run_stage: str = f"{args.pipeline_type}_pipeline"
+    telemetry.reset()
+    if args.profile:
+        telemetry.profiler = StageProfiler(args.profile, stage=args.profile_stage or run_stage)
+    try:
+        with telemetry.stage(run_stage):
+            run_pipeline(args)
+    finally:  # failed runs are the ones worth reporting
+        telemetry.write(args.pipeline_type)
+        if telemetry.profiler:
+            telemetry.profiler.write(
+                rf"data/08_reporting/profiles/{run_stage}_"
+                f"{telemetry.started_at.strftime(telemetry.TIMESTAMP_FORMAT)}"
+            )
+
 
 if __name__ == "__main__":
     main()
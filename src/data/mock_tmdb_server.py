@@ -0,0 +1,244 @@
+"""Local mock of the TMDb API serving a synthetic catalogue, to load test the feature pipeline.
+
+Usage:
+    python -m src.data.mock_tmdb_server --movies 100000 --port 8765 --rate-limit 40
+"""
+
+from argparse import ArgumentParser
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from math import ceil
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Any, ClassVar
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+from numpy.random import Generator, default_rng
+from pandas import DataFrame
+
+from src.data.synthetic_movies import CatalogueProfile, SyntheticMovieGenerator
+
+
+@dataclass
+class MockTMDbConfig:
+    """Configuration of the mock TMDb server.
+
+    Attributes:
+        host: Interface to listen on.
+        port: Port to listen on, 0 picks a free one.
+        latency: Seconds added to every response.
+        latency_jitter: Maximum random seconds added on top of ``latency``.
+        error_rate: Share of requests answered with a 500 error.
+        rate_limit: Requests per second allowed before answering 429, None disables it.
+        page_size: Movies per discover/popular page.
+        seed: Seed of the latency and error draws.
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 0
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: float | None = None
+    page_size: int = 20
+    seed: int = 42
+
+
+class MockTMDbServer:
+    """HTTP server answering ``/discover/movie``, ``/movie/popular`` and ``/movie/{id}``.
+
+    Discover pages are sorted by release date (desc) and popular pages by popularity, as
+    the client requests them. Throttling uses a token bucket refilled at ``rate_limit``
+    requests per second; throttled requests get a 429 with a ``Retry-After`` header.
+
+    Attributes:
+        config: Server configuration.
+        stats: Number of responses by endpoint and status code.
+    """
+
+    RETRY_AFTER: ClassVar[int] = 1  # seconds
+    HTTP_OKAY: ClassVar[int] = 200
+    HTTP_UNAUTHORIZED: ClassVar[int] = 401
+    HTTP_NOT_FOUND: ClassVar[int] = 404
+    HTTP_TOO_MANY_REQUESTS: ClassVar[int] = 429
+    HTTP_SERVER_ERROR: ClassVar[int] = 500
+
+    def __init__(
+        self,
+        movies: DataFrame,
+        generator: SyntheticMovieGenerator,
+        config: MockTMDbConfig | None = None,
+    ):
+        self.config = config or MockTMDbConfig()
+        self.stats: Counter = Counter()
+        self.__rng: Generator = default_rng(self.config.seed)
+        self.__lock: Lock = Lock()
+        self.__tokens: float = self.config.rate_limit or 0
+        self.__refilled: float = monotonic()
+
+        self.__generator = generator
+        self.__discover: list[dict] = generator.discover_results(
+            movies.sort_values("release_date", ascending=False)
+        )
+        self.__popular: list[dict] = generator.discover_results(
+            movies[movies["is_popular"]].sort_values("popularity", ascending=False)
+        )
+        self.__movies: dict[int, dict] = {movie["id"]: movie for movie in movies.to_dict("records")}
+
+        self.__server: ThreadingHTTPServer = ThreadingHTTPServer(
+            (self.config.host, self.config.port), self.__handler()
+        )
+        self.__thread: Thread | None = None
+
+    @classmethod
+    def from_profile(
+        cls, rows: int, config: MockTMDbConfig | None = None, seed: int = 42
+    ) -> "MockTMDbServer":
+        """Server for a synthetic catalogue of ``rows`` movies fitted from ``data/01_raw``."""
+        generator = SyntheticMovieGenerator(CatalogueProfile.from_parquet(), seed=seed)
+        return cls(generator.generate(rows), generator, config)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host!s}:{port}/3"
+
+    def __throttled(self) -> bool:
+        if self.config.rate_limit is None:
+            return False
+
+        with self.__lock:
+            now: float = monotonic()
+            self.__tokens = min(
+                self.config.rate_limit,
+                self.__tokens + (now - self.__refilled) * self.config.rate_limit,
+            )
+            self.__refilled = now
+            if self.__tokens < 1:
+                return True
+            self.__tokens -= 1
+            return False
+
+    def __page(self, movies: list[dict], query: dict[str, list[str]]) -> tuple[int, dict]:
+        page: int = int(query.get("page", ["1"])[0])
+        start: int = (page - 1) * self.config.page_size
+        return self.HTTP_OKAY, {
+            "page": page,
+            "results": movies[start : start + self.config.page_size],
+            "total_pages": ceil(len(movies) / self.config.page_size),
+            "total_results": len(movies),
+        }
+
+    def __route(self, path: str, query: dict[str, list[str]]) -> tuple[int, dict]:
+        if path == "/3/discover/movie":
+            return self.__page(self.__discover, query)
+        if path == "/3/movie/popular":
+            return self.__page(self.__popular, query)
+
+        movie_id: str = path.removeprefix("/3/movie/")
+        if movie_id.isdigit() and int(movie_id) in self.__movies:
+            return self.HTTP_OKAY, self.__generator.movie_details(self.__movies[int(movie_id)])
+        return self.HTTP_NOT_FOUND, {"status_code": 34, "status_message": "Not found."}
+
+    def respond(self, path: str, authorization: str | None) -> tuple[int, dict[str, str], dict]:
+        """Status, headers and body of a request, after the simulated latency and faults."""
+        url = urlparse(path)
+        sleep(self.config.latency + self.__rng.random() * self.config.latency_jitter)
+
+        headers: dict[str, str] = {}
+        status: int
+        body: dict[str, Any]
+        if not authorization or not authorization.startswith("Bearer "):
+            status, body = (
+                self.HTTP_UNAUTHORIZED,
+                {"status_code": 7, "status_message": "Invalid API key"},
+            )
+        elif self.__throttled():
+            headers["Retry-After"] = str(self.RETRY_AFTER)
+            status, body = (
+                self.HTTP_TOO_MANY_REQUESTS,
+                {"status_code": 25, "status_message": "Too many requests"},
+            )
+        elif self.__rng.random() < self.config.error_rate:
+            status, body = (
+                self.HTTP_SERVER_ERROR,
+                {"status_code": 11, "status_message": "Internal error"},
+            )
+        else:
+            status, body = self.__route(url.path, parse_qs(url.query))
+
+        endpoint: str = (
+            "/3/movie/{id}" if url.path.removeprefix("/3/movie/").isdigit() else url.path
+        )
+        with self.__lock:
+            self.stats[(endpoint, status)] += 1
+        return status, headers, body
+
+    def __handler(self) -> type[BaseHTTPRequestHandler]:
+        server: MockTMDbServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                status, headers, body = server.respond(self.path, self.headers.get("Authorization"))
+                payload: bytes = dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # one line per request would flood the load test output
+
+        return Handler
+
+    def start(self) -> "MockTMDbServer":
+        self.__thread = Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        logger.info(f"Mock TMDb server listening on {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread:
+            self.__thread.join()
+        logger.info(f"Mock TMDb server stopped, responses: {dict(self.stats)}")
+
+    def __enter__(self) -> "MockTMDbServer":
+        return self.start()
+
+    def __exit__(self, *_: object) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Mock TMDb API serving a synthetic catalogue")
+    parser.add_argument("--movies", type=int, default=10_000, help="Catalogue size")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 500 errors")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second")
+    args = parser.parse_args()
+
+    mock_server = MockTMDbServer.from_profile(
+        args.movies,
+        MockTMDbConfig(
+            port=args.port,
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+        ),
+    ).start()
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        mock_server.stop()
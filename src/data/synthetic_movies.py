@@ -0,0 +1,183 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, ClassVar
+
+from loguru import logger
+from numpy import asarray, interp, linspace, ndarray, quantile
+from numpy.random import Generator, default_rng
+from pandas import DataFrame, Series, concat, read_parquet, to_datetime
+
+
+@dataclass
+class CatalogueProfile:
+    """Empirical distributions of a movie catalogue, fitted from raw snapshots.
+
+    Numeric columns are sampled by inverse transform from their quantiles, which keeps
+    heavy tails and the mass at zero of budget and revenue. Categorical and list columns
+    are sampled from their observed frequencies, lists as a whole so genre combinations
+    stay realistic. Columns are sampled independently.
+
+    Attributes:
+        quantiles: Quantiles of each numeric column.
+        categories: Observed values and probabilities of each categorical column.
+        label_lists: Observed lists and probabilities of each list column.
+        genre_ids: TMDb id of each genre name.
+        texts: Sample of observed texts of each text column.
+    """
+
+    ERR_NO_SNAPSHOTS: ClassVar[str] = "No snapshot files found: {}"
+
+    NUMERIC_COLS: ClassVar[list[str]] = [
+        "popularity",
+        "vote_average",
+        "vote_count",
+        "runtime",
+        "budget",
+        "revenue",
+        "release_day",
+    ]
+    CATEGORICAL_COLS: ClassVar[list[str]] = ["original_language", "status", "adult", "is_popular"]
+    LIST_COLS: ClassVar[list[str]] = ["genres", "spoken_languages"]
+    TEXT_COLS: ClassVar[list[str]] = ["original_title", "overview", "tagline"]
+    QUANTILES: ClassVar[int] = 1001
+    TEXT_SAMPLES: ClassVar[int] = 2000
+
+    quantiles: dict[str, ndarray]
+    categories: dict[str, tuple[list, ndarray]]
+    label_lists: dict[str, tuple[list[tuple], ndarray]]
+    genre_ids: dict[str, int]
+    texts: dict[str, list[str]] = field(default_factory=dict)
+
+    @staticmethod
+    def __frequencies(values: Series) -> tuple[list, ndarray]:
+        counts: Series = values.value_counts(normalize=True)
+        return counts.index.tolist(), counts.to_numpy()
+
+    @classmethod
+    def from_parquet(cls, paths: list[str] | None = None, seed: int = 42) -> "CatalogueProfile":
+        """Fit the distributions from Parquet snapshots, by default those in ``data/01_raw``.
+
+        Args:
+            paths: Snapshot files, deduplicated by id keeping the last file.
+            seed: Seed used to sample the texts.
+
+        Returns:
+            CatalogueProfile: Fitted profile.
+        """
+        files: list[str] = (
+            sorted(str(p) for p in Path("data/01_raw").glob("*.parquet"))
+            if paths is None
+            else paths
+        )
+        if not files:
+            raise FileNotFoundError(cls.ERR_NO_SNAPSHOTS.format(paths))
+
+        logger.info(f"Fitting catalogue profile from {len(files)} snapshots")
+        movies: DataFrame = concat([read_parquet(path) for path in files]).drop_duplicates(
+            subset="id", keep="last"
+        )
+        release_dates: Series = to_datetime(movies["release_date"], errors="coerce")
+        movies["release_day"] = (release_dates - to_datetime(date.today())).dt.days
+
+        genre_ids: dict[str, int] = {}
+        if "genre_ids" in movies.columns:
+            for ids, names in zip(movies["genre_ids"], movies["genres"], strict=True):
+                if len(ids) == len(names):
+                    genre_ids.update(zip(names, (int(i) for i in ids), strict=True))
+
+        rng: Generator = default_rng(seed)
+        return cls(
+            quantiles={
+                col: quantile(
+                    movies[col].dropna().to_numpy(dtype=float), linspace(0, 1, cls.QUANTILES)
+                )
+                for col in cls.NUMERIC_COLS
+            },
+            categories={col: cls.__frequencies(movies[col]) for col in cls.CATEGORICAL_COLS},
+            label_lists={col: cls.__frequencies(movies[col].map(tuple)) for col in cls.LIST_COLS},
+            genre_ids=genre_ids,
+            texts={
+                col: rng.choice(
+                    movies[col].fillna("").to_numpy(dtype=str),
+                    size=min(cls.TEXT_SAMPLES, len(movies)),
+                ).tolist()
+                for col in cls.TEXT_COLS
+            },
+        )
+
+
+class SyntheticMovieGenerator:
+    """Generates TMDb-like movie catalogues of any size from a fitted profile.
+
+    The generated frame holds the ``MoviesAPIData`` fields, the extended info fetched
+    per movie and ``is_popular``. It can be rendered as TMDb discover results and
+    movie details payloads, e.g. for the mock TMDb server.
+
+    Attributes:
+        profile: Fitted distributions to sample from.
+        rng: Random generator, seeded for reproducible catalogues.
+    """
+
+    DISCOVER_FIELDS: ClassVar[list[str]] = [
+        "id",
+        "adult",
+        "original_language",
+        "original_title",
+        "overview",
+        "popularity",
+        "vote_average",
+        "vote_count",
+        "release_date",
+    ]
+
+    def __init__(self, profile: CatalogueProfile, seed: int = 42):
+        self.profile = profile
+        self.rng: Generator = default_rng(seed)
+
+    def __numeric(self, col: str, rows: int) -> ndarray:
+        quantiles: ndarray = self.profile.quantiles[col]
+        return asarray(interp(self.rng.random(rows), linspace(0, 1, len(quantiles)), quantiles))
+
+    def __choice(self, values: list, probabilities: ndarray, rows: int) -> list:
+        return [values[i] for i in self.rng.choice(len(values), size=rows, p=probabilities)]
+
+    def generate(self, rows: int, first_id: int = 1) -> DataFrame:
+        """Sample a catalogue of ``rows`` movies with consecutive ids."""
+        logger.info(f"Generating {rows} synthetic movies")
+        columns: dict[str, Any] = {"id": range(first_id, first_id + rows)}
+        for col in self.profile.CATEGORICAL_COLS:
+            columns[col] = self.__choice(*self.profile.categories[col], rows)
+        for col in self.profile.TEXT_COLS:
+            columns[col] = self.rng.choice(self.profile.texts[col], size=rows)
+        for col in ("popularity", "vote_average"):
+            columns[col] = self.__numeric(col, rows).round(4)
+        for col in ("vote_count", "runtime", "budget", "revenue"):
+            columns[col] = self.__numeric(col, rows).round().astype(int)
+        for col in self.profile.LIST_COLS:
+            columns[col] = [
+                list(labels) for labels in self.__choice(*self.profile.label_lists[col], rows)
+            ]
+
+        today: date = date.today()
+        columns["release_date"] = [
+            (today + timedelta(days=int(days))).isoformat()
+            for days in self.__numeric("release_day", rows).round()
+        ]
+        return DataFrame(columns)
+
+    def discover_results(self, movies: DataFrame) -> list[dict]:
+        """Movies as returned in the ``results`` of ``/discover/movie``."""
+        results: list[dict] = movies[self.DISCOVER_FIELDS].to_dict(orient="records")
+        return results
+
+    def movie_details(self, movie: dict) -> dict:
+        """A movie as returned by ``/movie/{id}``."""
+        return {
+            **{key: value for key, value in movie.items() if key not in self.profile.LIST_COLS},
+            "genres": [
+                {"id": self.profile.genre_ids.get(name, 0), "name": name}
+                for name in movie["genres"]
+            ],
+            "spoken_languages": [{"name": name} for name in movie["spoken_languages"]],
+        }
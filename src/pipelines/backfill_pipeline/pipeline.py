@@ -0,0 +1,212 @@
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from re import search
+from typing import ClassVar
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+from pyarrow.parquet import ParquetFile
+
+from src.utils.sqlite_conn import SQLiteConn
+from src.utils.telemetry import telemetry
+
+
+def raw_snapshots() -> list[str]:
+    """Parquet snapshots of the raw data layer."""
+    return sorted(str(path) for path in Path("data/01_raw").glob("*.parquet"))
+
+
+@dataclass
+class BackfillPipelineConfig:
+    """Configuration for the movie backfill pipeline.
+
+    Attributes:
+        ALLOWED_TYPES: Valid load types for the pipeline.
+        feature_group: Name of the feature group/table.
+        paths: Parquet snapshots to load, by default every snapshot in ``data/01_raw``.
+        type: Load type, ``initial`` rebuilds the feature group and ``incremental``
+            upserts the snapshot movies into it.
+        batch_size: Rows read per Arrow record batch, bounds the memory used.
+
+    Raises:
+        ValueError: If provided load type is not in ALLOWED_TYPES or no snapshot is found.
+    """
+
+    ERR_INVALID_TYPE: ClassVar[str] = "Invalid load type: {}. Must be one of: {}"
+    ERR_NO_SNAPSHOTS: ClassVar[str] = "No snapshot files found: {}"
+
+    ALLOWED_TYPES: ClassVar[list[str]] = ["initial", "incremental"]
+
+    feature_group: str
+    paths: list[str] = field(default_factory=raw_snapshots)
+    type: str = "initial"
+    batch_size: int = 50_000
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if self.type not in self.ALLOWED_TYPES:
+            raise ValueError(self.ERR_INVALID_TYPE.format(self.type, ", ".join(self.ALLOWED_TYPES)))
+        if not self.paths:
+            raise ValueError(self.ERR_NO_SNAPSHOTS.format(self.paths))
+
+
+class MovieBackfillPipeline:
+    """Pipeline rebuilding the movie feature group from Parquet snapshots, without the API.
+
+    Snapshots are read in record batches and converted to the feature store schema with
+    Arrow compute kernels, list columns included, so rows never become pandas or
+    pydantic objects. The feature store deduplicates the loaded movies by id keeping
+    the latest ``extraction_date``, taken from the snapshot file name when the snapshot
+    has no such column.
+
+    Attributes:
+        config: Pipeline configuration parameters.
+    """
+
+    # feature store schema, as written by the feature pipeline
+    COLUMNS: ClassVar[dict[str, pa.DataType]] = {
+        "id": pa.int64(),
+        "adult": pa.int64(),
+        "original_language": pa.string(),
+        "original_title": pa.string(),
+        "overview": pa.string(),
+        "popularity": pa.float64(),
+        "vote_average": pa.float64(),
+        "vote_count": pa.int64(),
+        "release_date": pa.string(),
+        "is_popular": pa.int64(),
+        "runtime": pa.int64(),
+        "budget": pa.int64(),
+        "revenue": pa.int64(),
+        "status": pa.string(),
+        "tagline": pa.string(),
+        "genres": pa.string(),
+        "spoken_languages": pa.string(),
+        "extraction_date": pa.string(),
+    }
+    LIST_COLS: ClassVar[list[str]] = ["genres", "spoken_languages"]
+    DATE_FORMAT: ClassVar[str] = "%Y-%m-%d"
+    TIMESTAMP_FORMAT: ClassVar[str] = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, config: BackfillPipelineConfig):
+        self.config = config
+
+    @classmethod
+    def extraction_date(cls, path: str) -> str:
+        """Snapshot date from the file name, or its modification date if it has none."""
+        match = search(r"\d{4}-\d{2}-\d{2}", Path(path).name)
+        if match:
+            return match.group()
+
+        modified: str = date.fromtimestamp(Path(path).stat().st_mtime).isoformat()
+        logger.warning(f"No date in snapshot name {path}, using its modification date {modified}")
+        return modified
+
+    @staticmethod
+    def __spanned(lists: pa.ListArray) -> tuple[pa.Array, pa.Array]:
+        """Zero-based offsets and the values they span, null lists included."""
+        start, end = lists.offsets[0].as_py(), lists.offsets[-1].as_py()
+        return pc.subtract(lists.offsets, start), lists.values.slice(start, end - start)
+
+    @classmethod
+    def parse_list_strings(cls, column: pa.Array) -> pa.Array:
+        """Parse lists stored as their numpy/python repr, e.g. ``"['Acción' 'Drama']"``."""
+        inner: pa.Array = pc.utf8_trim(column, characters="[]")
+        offsets, values = cls.__spanned(pc.split_pattern_regex(inner, pattern=r"['\"][\s,]+['\"]"))
+        lists: pa.Array = pa.ListArray.from_arrays(
+            offsets,
+            pc.utf8_trim(values, characters="'\""),
+            mask=pc.fill_null(pc.equal(inner, ""), True),
+        )
+        return lists
+
+    @classmethod
+    def to_json_lists(cls, column: pa.Array) -> pa.Array:
+        """Serialize a list of strings column to JSON arrays, missing lists to ``[]``."""
+        lists: pa.Array = (
+            cls.parse_list_strings(column) if pa.types.is_string(column.type) else column
+        )
+        offsets, values = cls.__spanned(lists)
+        for character, escaped in (("\\", "\\\\"), ('"', '\\"'), ("\n", "\\n"), ("\t", "\\t")):
+            values = pc.replace_substring(values, character, escaped)
+
+        quoted: pa.Array = pc.binary_join_element_wise('"', values, '"', "")
+        items: pa.Array = pa.ListArray.from_arrays(offsets, quoted, mask=lists.is_null())
+        arrays: pa.Array = pc.binary_join_element_wise("[", pc.binary_join(items, ", "), "]", "")
+        return pc.fill_null(arrays, "[]")
+
+    @classmethod
+    def to_timestamps(cls, column: pa.Array) -> pa.Array:
+        """Format dates as stored by the feature pipeline, unparseable dates to null."""
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            column = pc.strptime(column, format=cls.DATE_FORMAT, unit="s", error_is_null=True)
+        # whole seconds, nanosecond timestamps would be formatted with fractional seconds
+        return pc.strftime(column.cast(pa.timestamp("s"), safe=False), format=cls.TIMESTAMP_FORMAT)
+
+    @classmethod
+    def to_store_schema(cls, batch: pa.RecordBatch, extraction_date: str) -> pa.RecordBatch:
+        """Convert a snapshot batch to the feature store columns and types."""
+        columns: list[pa.Array] = []
+        for name, data_type in cls.COLUMNS.items():
+            if name not in batch.schema.names:
+                default: str | None = (
+                    extraction_date
+                    if name == "extraction_date"
+                    else "[]"
+                    if name in cls.LIST_COLS
+                    else None
+                )
+                columns.append(pa.repeat(pa.scalar(default, type=data_type), batch.num_rows))
+                continue
+
+            column: pa.Array = batch.column(name)
+            if pa.types.is_dictionary(column.type):
+                column = column.dictionary_decode()
+            if name in cls.LIST_COLS:
+                column = cls.to_json_lists(column)
+            elif name == "release_date":
+                column = cls.to_timestamps(column)
+            elif pa.types.is_floating(column.type) and pa.types.is_integer(data_type):
+                column = pc.round(column)
+            columns.append(column.cast(data_type))
+
+        return pa.RecordBatch.from_arrays(columns, names=list(cls.COLUMNS))
+
+    def __batches(self) -> Iterator[pa.RecordBatch]:
+        for path in self.config.paths:
+            snapshot: ParquetFile = ParquetFile(path)
+            extraction_date: str = self.extraction_date(path)
+            logger.info(
+                f"Reading {snapshot.metadata.num_rows} movies from {path} ({extraction_date})"
+            )
+            for batch in snapshot.iter_batches(
+                batch_size=self.config.batch_size,
+                columns=[name for name in self.COLUMNS if name in snapshot.schema_arrow.names],
+            ):
+                telemetry.count("backfill_rows_read_total", batch.num_rows)
+                yield self.to_store_schema(batch, extraction_date)
+
+    @telemetry.stage("backfill_pipeline.run")
+    def run(self, feature_store: SQLiteConn) -> int:
+        """Load the snapshots into the feature group.
+
+        Args:
+            feature_store: Feature store to load, it must support Arrow bulk loads.
+
+        Returns:
+            int: Number of movies stored.
+        """
+        logger.info(
+            f"\nStarting Backfill Pipeline:\n"
+            f"- Load type: {self.config.type}\n"
+            f"- Snapshots: {len(self.config.paths)}\n"
+            f"- Feature group: {self.config.feature_group}"
+        )
+        return feature_store.bulk_load(
+            self.config.feature_group,
+            self.__batches(),
+            mode="replace" if self.config.type == "initial" else "upsert",
+        )
@@ -0,0 +1,350 @@
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import combinations
+from json import dumps
+from pathlib import Path
+from time import perf_counter
+from typing import Any, ClassVar
+
+from loguru import logger
+from numpy import (
+    arange,
+    argpartition,
+    argsort,
+    array,
+    asarray,
+    concatenate,
+    float64,
+    inf,
+    int64,
+    nanmean,
+    ndarray,
+    ones,
+    percentile,
+    repeat,
+    take_along_axis,
+    unique,
+)
+from numpy.random import default_rng
+from pandas import DataFrame, Index
+from scipy.sparse import csr_matrix, issparse
+from sklearn.preprocessing import normalize
+from sklearn.utils.extmath import row_norms
+
+from src.pipelines.training_pipeline.movie_feature_preprocessor import (
+    MultiLabelBinarizerTransformer,
+)
+from src.utils.embedding_store import Embeddings
+from src.utils.recommender_models import RecommenderModel, RecommenderModelConfig
+from src.utils.telemetry import telemetry
+
+
+@dataclass
+class EvaluationPipelineConfig:
+    """Configuration for the offline model comparison.
+
+    Attributes:
+        models: Configurations of the models to compare, trained on the same movies.
+        feature_group: Feature group holding the movies popularity and genres.
+        k: Number of neighbours per movie.
+        latency_queries: Single movie queries timed per model.
+        seed: Seed of the timed queries sample.
+        report_dir: Directory the evaluation report is written to.
+
+    Raises:
+        ValueError: If no model is given or k is below 2.
+    """
+
+    ERR_NO_MODELS: ClassVar[str] = "At least one model must be evaluated"
+    ERR_INVALID_K: ClassVar[str] = "k must be at least {}, got {}"
+
+    MIN_K: ClassVar[int] = 2  # diversity compares the movies of a list
+
+    models: list[RecommenderModelConfig]
+    feature_group: str = "movies"
+    k: int = 10
+    latency_queries: int = 200
+    seed: int = 42
+    report_dir: str = r"data/08_reporting"
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if not self.models:
+            raise ValueError(self.ERR_NO_MODELS)
+        if self.k < self.MIN_K:
+            raise ValueError(self.ERR_INVALID_K.format(self.MIN_K, self.k))
+
+
+class MovieEvaluationPipeline:
+    """Pipeline comparing recommender models on the whole catalogue, without storing them.
+
+    Every model is fitted and recommends ``k`` neighbours for every movie. The neighbour
+    lists are scored with array operations over the whole catalogue:
+
+    - coverage: share of the catalogue recommended at least once.
+    - intra_list_diversity: mean cosine distance between the movies of a list, in the
+      preprocessed feature space of the first model so every model is judged alike.
+    - popularity_bias: mean popularity percentile of the recommended movies, 0.5 for a
+      model blind to popularity.
+    - genre_overlap_at_k: share of the neighbours sharing a genre with their movie.
+    - neighbour_overlap: share of the neighbours two models agree on, per model pair.
+
+    Each model also reports its fit time, the peak memory allocated while fitting, the
+    size of its output and the latency percentiles of single movie queries.
+
+    Attributes:
+        config: Pipeline configuration parameters.
+        models: Models being compared, by name.
+        report: Metrics of the last run.
+    """
+
+    ERR_DIFFERENT_MOVIES: ClassVar[str] = "Models {} and {} were trained on different movies"
+
+    LATENCY_PERCENTILES: ClassVar[list[int]] = [50, 95, 99]
+    BATCH_ROWS: ClassVar[int] = 1024  # neighbour lists processed at once
+
+    def __init__(self, config: EvaluationPipelineConfig):
+        self.config = config
+        self.models: dict[str, RecommenderModel] = {
+            model_config.model_name: RecommenderModel(model_config)
+            for model_config in config.models
+        }
+        self.report: dict[str, Any] = {}
+
+    @staticmethod
+    def coverage(neighbours: ndarray, catalogue_size: int) -> float:
+        return float(unique(neighbours).size / catalogue_size)
+
+    @classmethod
+    def intra_list_diversity(cls, neighbours: ndarray, vectors: Any) -> float:
+        """Mean pairwise cosine distance within each list of neighbour rows.
+
+        The pairwise similarities of a list of unit vectors add up to the squared norm
+        of their sum minus their own squared norms, so no k x k matrix is built. The sums
+        are a sparse product, sparse vectors, e.g. hashed text, are never densified.
+        """
+        k: int = neighbours.shape[1]
+        squared_norms: ndarray = row_norms(vectors, squared=True)
+        similarities: list[ndarray] = []
+        for start in range(0, len(neighbours), cls.BATCH_ROWS):
+            rows: ndarray = neighbours[start : start + cls.BATCH_ROWS]
+            lists: csr_matrix = csr_matrix(
+                (ones(rows.size), rows.ravel(), arange(0, rows.size + 1, k)),
+                shape=(len(rows), vectors.shape[0]),
+            )
+            sums: Any = lists @ vectors
+            pairs: ndarray = row_norms(sums, squared=True) - squared_norms[rows].sum(axis=1)
+            similarities.append(pairs / (k * (k - 1)))
+        return float(1 - concatenate(similarities).mean())
+
+    @staticmethod
+    def popularity_bias(neighbours: ndarray, percentiles: ndarray) -> float:
+        return float(nanmean(percentiles[neighbours]))
+
+    @staticmethod
+    def genre_overlap(neighbours: ndarray, genres: Any) -> float:
+        """Share of the neighbours sharing a genre with their movie, movies with genres only.
+
+        Args:
+            neighbours: Neighbour rows of every catalogue row, in catalogue order.
+            genres: Sparse genre indicator matrix of the catalogue.
+        """
+        k: int = neighbours.shape[1]
+        queries: ndarray = repeat(arange(len(neighbours)), k)
+        shared: ndarray = (
+            asarray(genres[queries].multiply(genres[neighbours.ravel()]).sum(axis=1)).ravel() > 0
+        ).reshape(-1, k)
+        has_genres: ndarray = genres.getnnz(axis=1) > 0
+        return float(shared[has_genres].mean()) if has_genres.any() else 0.0
+
+    @staticmethod
+    def neighbour_overlap(neighbours: ndarray, other: ndarray) -> float:
+        """Share of the neighbours found in the other list of the same movie."""
+        return float((neighbours[:, :, None] == other[:, None, :]).any(axis=2).mean())
+
+    @classmethod
+    def matrix_top_k(cls, similarities: ndarray, rows: ndarray, k: int) -> ndarray:
+        """Positions of the ``k`` most similar movies of each row, excluding itself."""
+        best_rows: list[ndarray] = []
+        for start in range(0, len(rows), cls.BATCH_ROWS):
+            batch: ndarray = rows[start : start + cls.BATCH_ROWS]
+            scores: ndarray = array(similarities[batch], dtype=float64)
+            scores[arange(len(batch)), batch] = -inf  # a movie is not its own neighbour
+            best: ndarray = argpartition(-scores, k - 1, axis=1)[:, :k]
+            order: ndarray = argsort(-take_along_axis(scores, best, axis=1), axis=1, kind="stable")
+            best_rows.append(take_along_axis(best, order, axis=1))
+        return concatenate(best_rows)
+
+    def __prepare_inputs(self) -> dict[str, tuple[Any, ndarray]]:
+        inputs: dict[str, tuple[Any, ndarray]] = {}
+        for model in self.models.values():
+            if model.input_key not in inputs:
+                inputs[model.input_key] = model.prepare_inputs()
+        return inputs
+
+    @staticmethod
+    def __fit(model: RecommenderModel, inputs: tuple[Any, ndarray]) -> dict[str, float | None]:
+        """Fit the model, timing it and tracing its allocations unless already traced."""
+        traced: bool = not tracemalloc.is_tracing()
+        if traced:
+            tracemalloc.start()
+        start: float = perf_counter()
+        try:
+            model.fit(*inputs)
+        finally:
+            seconds: float = perf_counter() - start
+            peak: int | None = tracemalloc.get_traced_memory()[1] if traced else None
+            if traced:
+                tracemalloc.stop()
+
+        output: Any = next(
+            output
+            for output in (model.embeddings, model.neighbours, model.similarity_matrix)
+            if output is not None
+        )
+        output_bytes: int = (
+            output.vectors.nbytes + output.norms.nbytes
+            if isinstance(output, Embeddings)
+            else int(output.memory_usage(index=False).sum())
+        )
+        return {"fit_seconds": seconds, "fit_peak_bytes": peak, "output_bytes": output_bytes}
+
+    def __recommender(self, model: RecommenderModel, ids: ndarray) -> Callable[[Any], ndarray]:
+        """Function returning the neighbour ids of the given movies, as served by the model."""
+        k: int = min(self.config.k, len(ids) - 1)
+        if model.embeddings is not None:
+            embeddings: Embeddings = model.embeddings
+            kernel: str = model.kernel or "cosine"
+            return lambda movie_ids: embeddings.top_k(movie_ids, k=k, kernel=kernel)[0]
+
+        if model.neighbours is not None:
+            # stored in the order of the ids, the k best first
+            neighbours: ndarray = model.neighbours["recommended_id"].to_numpy(dtype=int64)
+            table: ndarray = neighbours.reshape(len(ids), -1)[:, :k]
+            rows: Index = Index(ids)
+            return lambda movie_ids: table[rows.get_indexer(movie_ids)]
+
+        similarities: ndarray = asarray(model.similarity_matrix)
+        positions: Index = Index(ids)
+        return lambda movie_ids: ids[
+            self.matrix_top_k(similarities, positions.get_indexer(movie_ids), k)
+        ]
+
+    def __latencies(self, recommend: Callable[[Any], ndarray], ids: ndarray) -> dict[str, float]:
+        queries: ndarray = default_rng(self.config.seed).choice(
+            ids, size=min(self.config.latency_queries, len(ids)), replace=False
+        )
+        milliseconds: list[float] = []
+        for movie_id in queries:
+            start: float = perf_counter()
+            recommend([movie_id])
+            milliseconds.append((perf_counter() - start) * 1000)
+        return {
+            f"latency_ms_p{q}": float(value)
+            for q, value in zip(
+                self.LATENCY_PERCENTILES,
+                percentile(milliseconds, self.LATENCY_PERCENTILES),
+                strict=True,
+            )
+        }
+
+    def __catalogue(self, ids: ndarray) -> tuple[ndarray, Any]:
+        """Popularity percentile and genre indicators of the movies, in ``ids`` order."""
+        movies: DataFrame = (
+            self.config.models[0]
+            .feature_store.query_features(self.config.feature_group, ["id", "popularity", "genres"])
+            .set_index("id")
+            .reindex(ids)
+        )
+        percentiles: ndarray = (
+            movies["popularity"].astype(float64).rank(pct=True).to_numpy(dtype=float64)
+        )
+        genres: Any = MultiLabelBinarizerTransformer().fit_transform(movies[["genres"]])
+        return percentiles, genres
+
+    @telemetry.stage("evaluation_pipeline.run")
+    def run(self) -> "MovieEvaluationPipeline":
+        """Fit every model and measure its recommendations over the whole catalogue.
+
+        Returns:
+            MovieEvaluationPipeline: Self reference for method chaining
+        """
+        logger.info(
+            f"\nStarting Evaluation Pipeline:\n"
+            f"- Models: {', '.join(self.models)}\n"
+            f"- Neighbours per movie: {self.config.k}"
+        )
+        inputs: dict[str, tuple[Any, ndarray]] = self.__prepare_inputs()
+        first: RecommenderModel = next(iter(self.models.values()))
+        reference_features, ids = inputs[first.input_key]
+        # every model is judged in the same feature space, the one of the first model
+        vectors: Any = (
+            normalize(reference_features, copy=True)
+            if issparse(reference_features)
+            else Embeddings.normalize(reference_features)[0]
+        )
+        percentiles, genres = self.__catalogue(ids)
+        catalogue: Index = Index(ids)
+
+        metrics: dict[str, dict[str, Any]] = {}
+        neighbour_rows: dict[str, ndarray] = {}
+        for name, model in self.models.items():
+            model_ids: ndarray = inputs[model.input_key][1]
+            if len(model_ids) != len(ids) or (catalogue.get_indexer(model_ids) < 0).any():
+                raise ValueError(self.ERR_DIFFERENT_MOVIES.format(first.name, name))
+
+            with telemetry.stage(f"{name}.evaluate"):
+                metrics[name] = self.__fit(model, inputs[model.input_key])
+                recommend: Callable[[Any], ndarray] = self.__recommender(model, model_ids)
+                rows: ndarray = catalogue.get_indexer(recommend(ids).ravel()).astype(int64)
+                neighbour_rows[name] = rows.reshape(len(ids), -1)
+                metrics[name].update(
+                    {
+                        "coverage": self.coverage(neighbour_rows[name], len(ids)),
+                        "intra_list_diversity": self.intra_list_diversity(
+                            neighbour_rows[name], vectors
+                        ),
+                        "popularity_bias": self.popularity_bias(neighbour_rows[name], percentiles),
+                        "genre_overlap_at_k": self.genre_overlap(neighbour_rows[name], genres),
+                        **self.__latencies(recommend, model_ids),
+                    }
+                )
+
+        self.report = {
+            "feature_group": self.config.feature_group,
+            "movies": len(ids),
+            "k": self.config.k,
+            "models": metrics,
+            "neighbour_overlap": {
+                f"{name} | {other}": self.neighbour_overlap(
+                    neighbour_rows[name], neighbour_rows[other]
+                )
+                for name, other in combinations(neighbour_rows, 2)
+            },
+        }
+        logger.info(f"Model comparison:\n{self.summary().to_string()}")
+        return self
+
+    def summary(self) -> DataFrame:
+        """Metrics of the last run, one row per model."""
+        return DataFrame.from_dict(self.report.get("models", {}), orient="index")
+
+    def write(self) -> tuple[Path, Path]:
+        """Write the report of the last run as JSON and the model metrics as CSV.
+
+        Returns:
+            The JSON and CSV file paths.
+        """
+        path: Path = Path(self.config.report_dir)
+        path.mkdir(parents=True, exist_ok=True)
+
+        name: str = f"model_evaluation_{datetime.now().strftime(telemetry.TIMESTAMP_FORMAT)}"
+        json_path: Path = path / f"{name}.json"
+        json_path.write_text(dumps(self.report, indent=2))
+        csv_path: Path = path / f"{name}.csv"
+        self.summary().to_csv(csv_path, index_label="model")
+
+        logger.info(f"Evaluation report written to {json_path} and {csv_path}")
+        return json_path, csv_path
@@ -0,0 +1,195 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from random import uniform
+from signal import SIGINT, SIGTERM, getsignal, signal
+from threading import Event, current_thread, main_thread
+from typing import ClassVar
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from src.pipelines.feature_pipeline.movies_client import MoviesAPIConfig, NoMoviesError
+from src.pipelines.feature_pipeline.pipeline import FeaturePipelineConfig, MovieFeaturePipeline
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.telemetry import telemetry
+
+
+@dataclass
+class DaemonConfig:
+    """Configuration of the ingest daemon.
+
+    Attributes:
+        interval: Seconds waited between two cycles.
+        jitter: Fraction of the interval randomly added to or removed from each wait, so
+            daemons started together don't request the API at the same time.
+        max_cycles: Cycles run before stopping, run until stopped if None.
+        max_failures: Consecutive failed cycles tolerated, the next failure is raised.
+        popular_pages: Popular list pages requested by each cycle at most, to flag the new
+            movies. The flag of every stored movie is kept up to date by popularity loads.
+        report_dir: Reporting directory, the run report is rewritten after each cycle.
+
+    Raises:
+        ValueError: If the interval, jitter or limits are out of range.
+    """
+
+    ERR_INVALID_INTERVAL: ClassVar[str] = "Daemon interval must be positive, got {}"
+    ERR_INVALID_JITTER: ClassVar[str] = "Daemon jitter must be in [0, 1), got {}"
+    ERR_INVALID_LIMIT: ClassVar[str] = "Daemon {} must be at least 1, got {}"
+
+    interval: float = 900.0
+    jitter: float = 0.1
+    max_cycles: int | None = None
+    max_failures: int = 3
+    popular_pages: int = 1
+    report_dir: str | None = r"data/08_reporting"
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if self.interval <= 0:
+            raise ValueError(self.ERR_INVALID_INTERVAL.format(self.interval))
+        if not 0 <= self.jitter < 1:
+            raise ValueError(self.ERR_INVALID_JITTER.format(self.jitter))
+        if self.max_cycles is not None and self.max_cycles < 1:
+            raise ValueError(self.ERR_INVALID_LIMIT.format("max_cycles", self.max_cycles))
+        if self.max_failures < 1:
+            raise ValueError(self.ERR_INVALID_LIMIT.format("max_failures", self.max_failures))
+        if self.popular_pages < 1:
+            raise ValueError(self.ERR_INVALID_LIMIT.format("popular_pages", self.popular_pages))
+
+
+class FeatureIngestDaemon:
+    """Resident feature pipeline running incremental loads on a schedule.
+
+    The interpreter, imports, HTTP connection pool and feature store connections are set
+    up once and reused by every cycle, and the ids of the stored movies are read once
+    then kept up to date in memory, so a cycle only costs its API requests and writes.
+    A stop request, ``SIGINT``/``SIGTERM`` when serving from the main thread, lets the
+    running cycle complete and stops before the next one.
+
+    Attributes:
+        pipeline: Incremental feature pipeline run by each cycle.
+        daemon_config: Schedule of the cycles.
+        session: HTTP session shared by the cycles.
+        cycles: Cycles run so far.
+    """
+
+    ERR_NOT_INCREMENTAL: ClassVar[str] = "The ingest daemon runs incremental loads, got {}"
+
+    REPORT_PIPELINE: ClassVar[str] = "feature"
+
+    def __init__(
+        self,
+        config: FeaturePipelineConfig,
+        daemon_config: DaemonConfig,
+        feature_store: FeatureStoreInterface,
+    ):
+        if config.type != "incremental":
+            raise ValueError(self.ERR_NOT_INCREMENTAL.format(config.type))
+
+        self.daemon_config = daemon_config
+        self.session: requests.Session = requests.Session()
+        # one kept-alive connection per concurrent popular list request
+        adapter: HTTPAdapter = HTTPAdapter(pool_maxsize=MoviesAPIConfig.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # a cycle only flags its few new movies, not worth the whole popular list
+        popular_pages: int = min(config.popular_pages, daemon_config.popular_pages)
+        self.pipeline: MovieFeaturePipeline = MovieFeaturePipeline(
+            replace(config, popular_pages=popular_pages), session=self.session
+        )
+        self.cycles: int = 0
+        self.__feature_store = feature_store
+        self.__failures: int = 0
+        self.__stopped: Event = Event()
+
+    def run_cycle(self) -> int:
+        """Run an incremental load, a failure is raised once too many cycles failed in a row.
+
+        Returns:
+            int: Number of new movies stored.
+        """
+        if self.pipeline.existing_ids is None:
+            self.pipeline.existing_ids = self.__feature_store.fetch_existing_movie_ids(
+                self.pipeline.config.feature_group
+            )
+        known: int = len(self.pipeline.existing_ids)
+
+        self.cycles += 1
+        failure: Exception | None = None
+        try:
+            with telemetry.stage("feature_daemon.cycle"):
+                self.pipeline.run(self.__feature_store)
+        except NoMoviesError:
+            pass  # no new movies is not a failure
+        except Exception as e:  # the daemon outlives transient failures, e.g. API outages
+            failure = e
+        self.__failures = self.__failures + 1 if failure is not None else 0
+
+        new: int = len(self.pipeline.existing_ids) - known
+        telemetry.count("daemon_cycles_total", status="failed" if failure else "ok")
+        telemetry.count("daemon_new_movies_total", new)
+        if self.daemon_config.report_dir:
+            telemetry.write(self.REPORT_PIPELINE, self.daemon_config.report_dir)
+
+        if failure is not None:
+            if self.__failures >= self.daemon_config.max_failures:
+                raise failure
+            logger.opt(exception=failure).warning(
+                f"Cycle {self.cycles} failed ({self.__failures} in a row), retried next cycle"
+            )
+        else:
+            logger.info(f"Cycle {self.cycles}: {new} new movies, {known + new} stored")
+        return new
+
+    def next_wait(self) -> float:
+        """Seconds until the next cycle, the interval with random jitter."""
+        jitter: float = self.daemon_config.jitter
+        return self.daemon_config.interval * uniform(1 - jitter, 1 + jitter)  # noqa: S311
+
+    @contextmanager
+    def __signals(self) -> Iterator[None]:
+        """Stop on SIGINT/SIGTERM, handlers can only be set from the main thread."""
+        if current_thread() is not main_thread():
+            yield
+            return
+
+        handlers = {signum: getsignal(signum) for signum in (SIGINT, SIGTERM)}
+        for signum in handlers:
+            signal(signum, lambda *_: self.stop())
+        try:
+            yield
+        finally:
+            for signum, handler in handlers.items():
+                signal(signum, handler)
+
+    def serve(self) -> int:
+        """Run cycles until stopped or ``max_cycles`` are run, then close the session.
+
+        Returns:
+            int: Cycles run.
+        """
+        logger.info(
+            f"Ingest daemon started: a cycle every {self.daemon_config.interval}s "
+            f"(±{self.daemon_config.jitter:.0%})"
+        )
+        try:
+            with self.__signals():
+                while not self.__stopped.is_set():
+                    self.run_cycle()
+                    if self.cycles == self.daemon_config.max_cycles:
+                        break
+                    self.__stopped.wait(self.next_wait())
+        finally:
+            self.close()
+        logger.info(f"Ingest daemon stopped after {self.cycles} cycles")
+        return self.cycles
+
+    def stop(self) -> None:
+        """Stop serving once the running cycle, if any, completes."""
+        logger.info("Ingest daemon stopping")
+        self.__stopped.set()
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,5 +1,7 @@
-from dataclasses import dataclass
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from time import sleep
 from typing import ClassVar
 
 import requests
@@ -8,19 +10,46 @@ from pandas import DataFrame
 from pydantic import BaseModel
 
 from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.raw_landing import RawLandingZone
+from src.utils.telemetry import telemetry
 
 
 @dataclass
 class MoviesAPIConfig:
     token: str
     feature_group: str
-    url: str = (
-        "https://api.themoviedb.org/3/discover/movie"
-        "?sort_by=release_date.desc&vote_count.gte=10&page={}"
-    )
+    base_url: str = "https://api.themoviedb.org/3"  # e.g. a mock TMDb server for load tests
     pages: int = 400  # number of pages to read
+    popular_pages: int = 5  # number of popular list pages to read, one request each
+    max_workers: int = 8  # concurrent popular list requests
     timeout: int = 10  # seconds
+    max_retries: int = 3  # retries of throttled (429) requests
+    max_retry_wait: float = 10  # seconds
+    # keeps connections open across requests and clients, a new connection per request if None
+    session: requests.Session | None = field(default=None, repr=False)
+    # newest release date stored, incremental crawls of the discover pages (newest
+    # first) stop at the page reaching this many days before it, movies released
+    # meanwhile may only now reach the vote count of the discover filter
+    watermark: str | None = None
+    watermark_lookback_days: int = 7
+    # incremental crawls also stop after this many consecutive pages of stored movies
+    max_known_pages: int = 3
     HTTP_OKAY: int = 200
+    HTTP_TOO_MANY_REQUESTS: int = 429
+
+    @property
+    def discover_url(self) -> str:
+        return (
+            f"{self.base_url}/discover/movie?sort_by=release_date.desc&vote_count.gte=10&page={{}}"
+        )
+
+    @property
+    def popular_url(self) -> str:
+        return f"{self.base_url}/movie/popular?language=es-ES&page={{}}"
+
+    @property
+    def details_url(self) -> str:
+        return f"{self.base_url}/movie/{{}}?language=es-ES"
 
     @property
     def headers(self) -> dict:
@@ -46,29 +75,89 @@ class MoviesAPIData(BaseModel):
         json_encoders: ClassVar = {datetime: lambda v: v.strftime("%Y-%m-%d")}  # format date Y-m-d
 
 
+class NoMoviesError(ValueError):
+    """No movies were fetched, e.g. an incremental load finding no new movies."""
+
+
 class MoviesAPIClient:
     ERR_NO_MOVIES: ClassVar[str] = "No movies were fetched from the API"
     ERR_NOT_INITIALIZED: ClassVar[str] = "Movies DataFrame not initialized"
     ERR_FETCH_DETAILS: ClassVar[str] = "Error fetching details for movie {}: {}"
     ERR_FETCH_POPULAR: ClassVar[str] = "Error fetching popular movies page {}: {}"
+    ERR_POPULAR_NOT_FETCHED: ClassVar[str] = "Popular movie ids not fetched"
+    ERR_POPULAR_INCOMPLETE: ClassVar[str] = (
+        "Popular movies list incomplete, {} of {} pages failed: popularity not updated"
+    )
 
-    def __init__(self, config: MoviesAPIConfig, existing_ids: set | None = None):
+    # columns that change after release, re-fetched by refreshes
+    REFRESH_COLS: ClassVar[list[str]] = [
+        "popularity",
+        "vote_average",
+        "vote_count",
+        "runtime",
+        "budget",
+        "revenue",
+        "status",
+        "tagline",
+    ]
+
+    def __init__(
+        self,
+        config: MoviesAPIConfig,
+        existing_ids: set | None = None,
+        refresh_ids: list[int] | None = None,
+        popularity_only: bool = False,
+        landing: RawLandingZone | None = None,
+    ):
+        """Fetch the movie base, or the current details of ``refresh_ids`` if given.
+
+        With ``popularity_only`` no movie is fetched, the client only refreshes the
+        popular flags of the stored movies. With a ``landing`` zone, every successful
+        response is also appended there as received.
+        """
         self.config = config
+        self.__landing: RawLandingZone | None = landing
         self.existing_ids: set | None = existing_ids
         self.movies: DataFrame | None = None
-        self.__build_movie_base()
-
+        self.watermark: str | None = config.watermark
+        self.popular_ids: set[int] | None = None
+        self.__failed_popular_pages: int = 0
+        if refresh_ids is not None:
+            self.__build_refreshed_movies(refresh_ids)
+        elif not popularity_only:
+            self.__build_movie_base()
+
+    def __get(self, endpoint: str, url: str) -> requests.Response:
+        """GET a TMDb endpoint, waiting and retrying while the request is throttled."""
+        get = self.config.session.get if self.config.session is not None else requests.get
+        for attempt in range(self.config.max_retries + 1):
+            response = get(url, headers=self.config.headers, timeout=self.config.timeout)
+            telemetry.count("http_requests_total", endpoint=endpoint, status=response.status_code)
+            telemetry.count("http_response_bytes_total", len(response.content), endpoint=endpoint)
+            if (
+                response.status_code != self.config.HTTP_TOO_MANY_REQUESTS
+                or attempt == self.config.max_retries
+            ):
+                break
+
+            retry_after: str | None = response.headers.get("Retry-After")
+            wait: float = float(retry_after) if retry_after else 2**attempt
+            logger.warning(f"Request throttled, retrying in {wait}s: {url}")
+            telemetry.count("http_retries_total", endpoint=endpoint)
+            sleep(min(wait, self.config.max_retry_wait))
+
+        if self.__landing is not None and response.status_code == self.config.HTTP_OKAY:
+            self.__landing.append(endpoint, url, response.content)
+        return response
+
+    @telemetry.stage("tmdb.build_movie_base")
     def __build_movie_base(self) -> "MoviesAPIClient":
         logger.info("Starting base movie fetch...")
 
         movies: list[MoviesAPIData] = list()
-        skipped_count, total_processed = 0, 0
+        skipped_count, total_processed, known_pages = 0, 0, 0
         for page in range(1, self.config.pages + 1):
-            response = requests.get(
-                self.config.url.format(page),
-                headers=self.config.headers,
-                timeout=self.config.timeout,
-            )
+            response = self.__get("discover", self.config.discover_url.format(page))
             if response.status_code != self.config.HTTP_OKAY:
                 continue
                 # error for current page, skip it
@@ -76,12 +165,24 @@ class MoviesAPIClient:
             if not data:
                 continue
             total_processed += len(data)
+            page_movies: int = len(movies)
             for movie in data:
                 if self.existing_ids and movie["id"] in self.existing_ids:
                     skipped_count += 1
                     continue
                 movies.append(MoviesAPIData(**movie))
 
+            released: list[str] = self.__release_dates(data)
+            if released and released[-1] > (self.watermark or ""):
+                self.watermark = released[-1]
+            if self.existing_ids is None:
+                continue  # full loads crawl every page
+            known_pages = known_pages + 1 if len(movies) == page_movies else 0
+            if known_pages == self.config.max_known_pages or self.__crossed_watermark(released):
+                logger.info(f"Incremental crawl stopped at page {page} of {self.config.pages}")
+                telemetry.count("discover_pages_skipped_total", self.config.pages - page)
+                break
+
         movies_dict: list[dict] = [movie.model_dump() for movie in movies]
         self.movies = DataFrame(movies_dict).drop_duplicates(subset="id")
 
@@ -93,45 +194,97 @@ class MoviesAPIClient:
         )
 
         if self.movies.empty:
-            raise ValueError(self.ERR_NO_MOVIES)
+            raise NoMoviesError(self.ERR_NO_MOVIES)
 
         return self
 
+    @staticmethod
+    def __release_dates(data: list[dict]) -> list[str]:
+        """Release dates of a page up to today, oldest first, upcoming releases excluded."""
+        today: str = datetime.now().strftime("%Y-%m-%d")
+        return sorted(
+            released
+            for movie in data
+            if (released := movie.get("release_date") or "") and released <= today
+        )
+
+    def __crossed_watermark(self, released: list[str]) -> bool:
+        """If a page sorted newest first reached the watermark, less the lookback days."""
+        if self.config.watermark is None or not released:
+            return False
+
+        stop_before: str = (
+            datetime.strptime(self.config.watermark, "%Y-%m-%d")
+            - timedelta(days=self.config.watermark_lookback_days)
+        ).strftime("%Y-%m-%d")
+        return released[0] < stop_before
+
+    @telemetry.stage("tmdb.build_refreshed_movies")
+    def __build_refreshed_movies(self, movie_ids: list[int]) -> "MoviesAPIClient":
+        logger.info(f"Starting refresh of {len(movie_ids)} movies...")
+
+        refreshed: list[dict] = list()
+        for movie_id in movie_ids:
+            data: dict | None = self.__fetch_movie_details(movie_id)
+            if data is None:
+                continue  # keep the stored values, the movie stays stale
+            refreshed.append(
+                {
+                    "id": movie_id,
+                    **{col: data.get(col) for col in self.REFRESH_COLS},
+                    "genres": [g["name"] for g in data.get("genres", [])],
+                    "spoken_languages": [lang["name"] for lang in data.get("spoken_languages", [])],
+                }
+            )
+
+        self.movies = DataFrame(refreshed)
+        logger.info(f"Refreshed {len(self.movies)} of {len(movie_ids)} movies")
+        if self.movies.empty:
+            raise NoMoviesError(self.ERR_NO_MOVIES)
+
+        return self
+
+    def __fetch_popular_page(self, page: int) -> list[int] | None:
+        """Movie ids of a popular list page, None if the request failed."""
+        try:
+            response = self.__get("popular", self.config.popular_url.format(page))
+
+            if response.status_code == self.config.HTTP_OKAY:
+                return [movie["id"] for movie in response.json().get("results", [])]
+
+        except Exception as e:
+            logger.error(self.ERR_FETCH_POPULAR.format(page, str(e)))
+
+        return None
+
+    @telemetry.stage("tmdb.fetch_popular_movie_ids")
     def fetch_popular_movie_ids(self) -> "MoviesAPIClient":
         """Fetch IDs of currently popular movies and mark them in DataFrame.
 
-        Args:
-            pages: Number of pages to fetch from popular movies list
+        The ``popular_pages`` pages of the popular list are requested concurrently,
+        by up to ``max_workers`` threads.
 
         Returns:
             MoviesAPIClient: Self reference for method chaining
         """
-        logger.info("Starting popular movies fetch...")
+        logger.info(f"Starting popular movies fetch of {self.config.popular_pages} pages...")
 
-        URL: str = "https://api.themoviedb.org/3/movie/popular?language=es-ES&page={}"
-        popular_ids: set = set()
-
-        for page in range(1, self.config.pages + 1):
-            try:
-                response = requests.get(
-                    URL.format(page),
-                    headers=self.config.headers,
-                    timeout=self.config.timeout,
-                )
+        pages: range = range(1, self.config.popular_pages + 1)
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            results: list[list[int] | None] = list(executor.map(self.__fetch_popular_page, pages))
 
-                if response.status_code == self.config.HTTP_OKAY:
-                    data = response.json().get("results", [])
-                    popular_ids.update(movie["id"] for movie in data)
-            except Exception as e:
-                logger.error(f"Error fetching popular movies page {page}: {e!s}")
-                continue
+        self.popular_ids = {movie_id for ids in results if ids for movie_id in ids}
+        self.__failed_popular_pages = sum(ids is None for ids in results)
+        if self.__failed_popular_pages:
+            logger.warning(f"{self.__failed_popular_pages} popular movies pages failed")
 
         # Mark popular movies in DataFrame
         if self.movies is not None:
-            self.movies["is_popular"] = self.movies["id"].isin(popular_ids)
+            self.movies["is_popular"] = self.movies["id"].isin(self.popular_ids)
 
         return self
 
+    @telemetry.stage("tmdb.fetch_movie_extended_info")
     def fetch_movie_extended_info(self) -> "MoviesAPIClient":
         logger.info("Starting extended movie info fetch...")
 
@@ -145,6 +298,20 @@ class MoviesAPIClient:
         self.movies = self.movies.merge(extended_info_df, on="id", how="left")
         return self
 
+    def __fetch_movie_details(self, movie_id: int) -> dict | None:
+        """Movie details payload from the TMDb API, None if the request failed."""
+        try:
+            response = self.__get("details", self.config.details_url.format(movie_id))
+
+            if response.status_code == self.config.HTTP_OKAY:
+                data: dict = response.json()
+                return data
+
+        except Exception as e:
+            logger.error(self.ERR_FETCH_DETAILS.format(movie_id, str(e)))
+
+        return None
+
     def __fetch_detailed_movie_metadata(self, movie_id: int) -> dict:
         """Fetch detailed metadata for a specific movie from TMDb API.
 
@@ -154,25 +321,18 @@ class MoviesAPIClient:
         Returns:
             dict: Extended movie metadata including runtime, budget, etc.
         """
-        URL: str = f"https://api.themoviedb.org/3/movie/{movie_id}?language=es-ES"
-        try:
-            response = requests.get(URL, headers=self.config.headers, timeout=self.config.timeout)
-
-            if response.status_code == self.config.HTTP_OKAY:
-                data: dict = response.json()
-                return {
-                    "id": movie_id,
-                    "runtime": data.get("runtime"),
-                    "budget": data.get("budget"),
-                    "revenue": data.get("revenue"),
-                    "status": data.get("status"),
-                    "tagline": data.get("tagline"),
-                    "genres": [g["name"] for g in data.get("genres", [])],
-                    "spoken_languages": [lang["name"] for lang in data.get("spoken_languages", [])],
-                }
-
-        except Exception as e:
-            logger.error(self.ERR_FETCH_DETAILS.format(movie_id, str(e)))
+        data: dict | None = self.__fetch_movie_details(movie_id)
+        if data is not None:
+            return {
+                "id": movie_id,
+                "runtime": data.get("runtime"),
+                "budget": data.get("budget"),
+                "revenue": data.get("revenue"),
+                "status": data.get("status"),
+                "tagline": data.get("tagline"),
+                "genres": [g["name"] for g in data.get("genres", [])],
+                "spoken_languages": [lang["name"] for lang in data.get("spoken_languages", [])],
+            }
 
         # Return default values if request fails
         return {
@@ -204,3 +364,33 @@ class MoviesAPIClient:
             self.add_extraction_date()
         feature_store.insert(self.config.feature_group, self.movies)
         return self
+
+    def update_movies_features(self, feature_store: FeatureStoreInterface) -> "MoviesAPIClient":
+        """Upsert the refreshed columns of the fetched movies, stamped as fresh."""
+        if self.movies is None:
+            raise ValueError(self.ERR_NOT_INITIALIZED)
+
+        if "extraction_date" not in self.movies.columns:
+            self.add_extraction_date()
+        feature_store.update_features(self.config.feature_group, self.movies)
+        return self
+
+    def update_popular_movies(self, feature_store: FeatureStoreInterface) -> "MoviesAPIClient":
+        """Flag the stored movies in the fetched popular list as popular, the rest as not.
+
+        Nothing is updated if a popular page failed, as its movies would lose the flag.
+        """
+        if self.popular_ids is None:
+            raise ValueError(self.ERR_POPULAR_NOT_FETCHED)
+
+        if self.__failed_popular_pages:
+            raise ValueError(
+                self.ERR_POPULAR_INCOMPLETE.format(
+                    self.__failed_popular_pages, self.config.popular_pages
+                )
+            )
+        updated: int = feature_store.update_popular_movies(
+            self.config.feature_group, self.popular_ids
+        )
+        logger.info(f"Popularity refreshed, {updated} movies changed their popular flag")
+        return self
@@ -1,6 +1,9 @@
+from contextlib import nullcontext
 from dataclasses import dataclass
+from datetime import date, timedelta
 from typing import ClassVar
 
+import requests
 from loguru import logger
 
 from src.pipelines.feature_pipeline.movies_client import (
@@ -8,6 +11,8 @@ from src.pipelines.feature_pipeline.movies_client import (
     MoviesAPIConfig,
 )
 from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.raw_landing import RawLandingZone
+from src.utils.telemetry import telemetry
 
 
 @dataclass
@@ -15,15 +20,20 @@ class FeaturePipelineConfig:
     """Configuration for movie feature pipeline.
 
     Handles configuration validation and defaults for the movie feature pipeline.
-    Supports both initial and incremental loading modes.
+    Supports initial, incremental, refresh and popularity loading modes.
 
     Attributes:
         ALLOWED_TYPES: Valid load types for the pipeline.
         api_token: TMDb API authentication token.
         feature_group: Name of the feature group/table.
-        type: Load type (initial/incremental).
+        type: Load type (initial/incremental/refresh/popularity).
         pages: Number of pages to fetch from API.
+        popular_pages: Number of popular list pages fetched to flag popular movies.
+        base_url: TMDb API base URL, e.g. a mock TMDb server for load tests.
         timeout: API request timeout in seconds.
+        max_age_days: Refresh movies extracted more than this many days ago.
+        request_budget: Maximum movies re-fetched by a refresh, one request each.
+        raw_dir: Landing zone of the raw API responses, not kept if None.
         HTTP_OKAY: Success HTTP status code.
 
     Raises:
@@ -32,13 +42,18 @@ class FeaturePipelineConfig:
 
     ERR_INVALID_TYPE: ClassVar[str] = "Invalid load type: {}. Must be one of: {}"
 
-    ALLOWED_TYPES: ClassVar[list[str]] = ["initial", "incremental"]
+    ALLOWED_TYPES: ClassVar[list[str]] = ["initial", "incremental", "refresh", "popularity"]
 
     api_token: str
     feature_group: str
     type: str
     pages: int = 400  # number of pages to read
+    popular_pages: int = 5  # one request each, up to 400 for the whole popular list
+    base_url: str = "https://api.themoviedb.org/3"
     timeout: int = 10  # seconds
+    max_age_days: int = 7
+    request_budget: int = 500
+    raw_dir: str | None = None
     HTTP_OKAY: int = 200
 
     def __post_init__(self) -> None:
@@ -51,23 +66,46 @@ class MovieFeaturePipeline:
     """Pipeline for loading movie features from TMDb API.
 
     Handles fetching, transforming and storing movie data in feature store.
-    Supports both initial and incremental loading patterns.
+    Supports initial and incremental loading patterns, and refreshes of the stale
+    movies: the oldest extractions, popular and most popular first, are re-fetched
+    within the request budget and their changing columns updated. Popularity loads
+    only fetch the popular list and update the popular flag of every stored movie,
+    cheap enough to run hourly with a few pages.
+
+    Incremental loads crawl the discover pages, newest releases first, only until the
+    release date watermark stored by the previous load or a few pages of stored movies
+    in a row, rather than every page.
+
+    A pipeline run repeatedly, e.g. by the ingest daemon, reuses the connections of its
+    HTTP session and keeps the ids of the stored movies and the watermark in memory:
+    they are read from the feature store by the first incremental run only, then
+    updated with the movies each run stores.
 
     Attributes:
         config: Pipeline configuration parameters.
+        session: HTTP session of the API requests, a new connection per request if None.
+        existing_ids: Ids of the stored movies, None until an incremental run reads them.
+        watermark: Newest release date stored, None until a run reads or stores it.
     """
 
-    def __init__(self, config: FeaturePipelineConfig):
+    # newest release date stored, where incremental crawls of the discover pages stop
+    WATERMARK: ClassVar[str] = "release_date"
+
+    def __init__(self, config: FeaturePipelineConfig, session: requests.Session | None = None):
         self.config = config
+        self.session = session
+        self.existing_ids: set[int] | None = None
+        self.watermark: str | None = None
 
+    @telemetry.stage("feature_pipeline.run")
     def run(self, feature_store: FeatureStoreInterface) -> None:
         """Execute the feature pipeline.
 
         Orchestrates the complete pipeline execution:
-        1. Checks for existing movies (incremental mode)
+        1. Checks for existing movies (incremental mode) or stale movies (refresh mode)
         2. Configures API client
         3. Fetches movies and their details
-        4. Stores results in feature store
+        4. Stores results in feature store, updating them in refresh mode
 
         Args:
             feature_store: Storage implementation for features.
@@ -82,20 +120,98 @@ class MovieFeaturePipeline:
             f"- Feature group: {self.config.feature_group}"
         )
 
-        existing_ids: set[int] | None = (
-            feature_store.fetch_existing_movie_ids(self.config.feature_group)
-            if self.config.type == "incremental"
-            else None
-        )
         api_config: MoviesAPIConfig = MoviesAPIConfig(
             token=self.config.api_token,
             feature_group=self.config.feature_group,
+            base_url=self.config.base_url,
             pages=self.config.pages,  # Adjust as needed
+            popular_pages=self.config.popular_pages,
+            session=self.session,
         )
 
-        _: MoviesAPIClient = (
-            MoviesAPIClient(api_config, existing_ids)
+        landing: RawLandingZone | nullcontext[None] = (
+            RawLandingZone(self.config.raw_dir) if self.config.raw_dir else nullcontext()
+        )
+        with landing as raw_landing:
+            if self.config.type == "refresh":
+                self.__refresh(feature_store, api_config, raw_landing)
+                return
+            if self.config.type == "popularity":
+                self.__refresh_popularity(feature_store, api_config, raw_landing)
+                return
+
+            self.__load(feature_store, api_config, raw_landing)
+
+    def __load(
+        self,
+        feature_store: FeatureStoreInterface,
+        api_config: MoviesAPIConfig,
+        landing: RawLandingZone | None,
+    ) -> None:
+        if self.config.type == "incremental":
+            if self.existing_ids is None:
+                self.existing_ids = feature_store.fetch_existing_movie_ids(
+                    self.config.feature_group
+                )
+            if self.watermark is None:
+                self.watermark = feature_store.fetch_watermark(
+                    self.config.feature_group, self.WATERMARK
+                )
+            api_config.watermark = self.watermark
+
+        client: MoviesAPIClient = (
+            MoviesAPIClient(
+                api_config,
+                self.existing_ids if self.config.type == "incremental" else None,
+                landing=landing,
+            )
             .fetch_popular_movie_ids()
             .fetch_movie_extended_info()
             .store_movies_features(feature_store)
         )
+        if self.existing_ids is not None and client.movies is not None:
+            self.existing_ids.update(client.movies["id"].tolist())
+        # saved once the movies are stored, a failed run is crawled again
+        if client.watermark is not None and client.watermark != self.watermark:
+            feature_store.store_watermark(
+                self.config.feature_group, self.WATERMARK, client.watermark
+            )
+            self.watermark = client.watermark
+
+    def __refresh(
+        self,
+        feature_store: FeatureStoreInterface,
+        api_config: MoviesAPIConfig,
+        landing: RawLandingZone | None,
+    ) -> None:
+        extracted_before: str = (
+            date.today() - timedelta(days=self.config.max_age_days)
+        ).isoformat()
+        stale_ids: list[int] = feature_store.fetch_stale_movie_ids(
+            self.config.feature_group, extracted_before, limit=self.config.request_budget
+        )
+        if not stale_ids:
+            logger.info(f"No movies extracted before {extracted_before}, nothing to refresh")
+            return
+
+        try:
+            _: MoviesAPIClient = MoviesAPIClient(
+                api_config, refresh_ids=stale_ids, landing=landing
+            ).update_movies_features(feature_store)
+        finally:
+            # movies failing to refresh are not retried before the refreshed ones
+            feature_store.store_refresh_attempts(
+                self.config.feature_group, stale_ids, date.today().isoformat()
+            )
+
+    def __refresh_popularity(
+        self,
+        feature_store: FeatureStoreInterface,
+        api_config: MoviesAPIConfig,
+        landing: RawLandingZone | None,
+    ) -> None:
+        _: MoviesAPIClient = (
+            MoviesAPIClient(api_config, popularity_only=True, landing=landing)
+            .fetch_popular_movie_ids()
+            .update_popular_movies(feature_store)
+        )
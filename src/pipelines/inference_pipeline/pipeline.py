@@ -0,0 +1,311 @@
+from dataclasses import dataclass, field
+from typing import Any, ClassVar
+
+from loguru import logger
+from numpy import arange, asarray, empty, float32, int64, isin, ndarray, repeat, tile
+from pandas import DataFrame
+
+from src.pipelines.training_pipeline.movie_feature_preprocessor import MovieFeaturePreprocessor
+from src.utils.embedding_store import (
+    Embeddings,
+    EmbeddingStore,
+    FittedPreprocessor,
+    RecommendationCache,
+)
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.model_registry import ModelRegistry, RegistryWatcher
+from src.utils.telemetry import telemetry
+
+
+@dataclass
+class InferencePipelineConfig:
+    """Configuration for the movie inference pipeline.
+
+    Attributes:
+        embedding_group: Embeddings stored by the training pipeline.
+        kernel: Similarity used to score the embeddings (cosine/linear).
+        k: Number of recommendations per movie.
+        embedding_store: Storage of the embedding groups.
+        feature_store: Store the recommended movies metadata is read from, if any.
+        feature_group: Feature group holding the movies metadata.
+        metadata_columns: Columns added to each recommendation.
+        warm_cache: Serve the recommendations precomputed at train time, when available.
+        registry: Model registry serving the current version, instead of ``embedding_store``.
+        reload_seconds: Seconds between checks for a new registry version, None to never
+            switch versions.
+
+    Raises:
+        ValueError: If the kernel is not one of ``Embeddings.KERNELS``.
+    """
+
+    ERR_INVALID_KERNEL: ClassVar[str] = Embeddings.ERR_INVALID_KERNEL
+
+    embedding_group: str
+    kernel: str = "cosine"
+    k: int = 10
+    embedding_store: EmbeddingStore = field(default_factory=EmbeddingStore)
+    feature_store: FeatureStoreInterface | None = None
+    feature_group: str = "movies"
+    metadata_columns: list[str] = field(default_factory=lambda: ["original_title"])
+    warm_cache: bool = True
+    registry: ModelRegistry | None = None
+    reload_seconds: float | None = 5.0
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if self.kernel not in Embeddings.KERNELS:
+            raise ValueError(
+                self.ERR_INVALID_KERNEL.format(self.kernel, ", ".join(Embeddings.KERNELS))
+            )
+
+
+@dataclass
+class ServedModel:
+    """Embeddings and warm cache served together, swapped as a whole.
+
+    Attributes:
+        version: Registry version, None if not served from a registry.
+        embeddings: Loaded embeddings.
+        cache: Warm recommendations of the embeddings, if any.
+        preprocessor: Preprocessor the embeddings were computed with, if stored.
+    """
+
+    version: str | None
+    embeddings: Embeddings
+    cache: RecommendationCache | None = None
+    preprocessor: FittedPreprocessor | None = None
+
+
+class MovieInferencePipeline:
+    """Pipeline serving similar movies from the stored embeddings.
+
+    Nothing pairwise is stored: every request is scored at query time with a single
+    matrix product against the memory-mapped embeddings, except for the movies warmed
+    at train time, answered from the cache. With a feature store, the metadata of the
+    recommended movies is read by id, not the whole feature group.
+
+    With a registry, the current version is served and a background thread maps every
+    newly published version, touching its pages with a first query before switching to
+    it. Requests in flight finish on the version they started with.
+
+    Movies not in the embeddings, ingested since the last training or described by raw
+    feature records, are preprocessed with the pipeline fitted at train time and scored
+    against the embeddings like the stored movies, without retraining.
+
+    Attributes:
+        config: Pipeline configuration parameters.
+    """
+
+    ERR_NO_PREPROCESSOR: ClassVar[str] = (
+        "No fitted preprocessor stored with {} embeddings, retrain to score new movies"
+    )
+
+    def __init__(self, config: InferencePipelineConfig):
+        self.config = config
+        self.__watcher: RegistryWatcher | None = None
+        if self.config.registry is None:
+            self.__served: ServedModel = self.__load(self.config.embedding_store, None)
+            return
+
+        self.__served = self.__load(
+            self.config.registry.embedding_store(), self.config.registry.current()
+        )
+        if self.config.reload_seconds is not None:
+            self.__watcher = RegistryWatcher(
+                self.config.registry,
+                self.switch,
+                version=self.__served.version,
+                interval=self.config.reload_seconds,
+            ).start()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.__served.embeddings
+
+    @property
+    def cache(self) -> RecommendationCache | None:
+        return self.__served.cache
+
+    @property
+    def version(self) -> str | None:
+        return self.__served.version
+
+    def __load(self, embedding_store: EmbeddingStore, version: str | None) -> ServedModel:
+        served: ServedModel = ServedModel(
+            version=version, embeddings=embedding_store.load(self.config.embedding_group)
+        )
+        if self.config.warm_cache:
+            served.cache = embedding_store.load_cache(
+                self.config.embedding_group, self.config.kernel
+            )
+        if served.cache is not None and served.cache.k < self.config.k:
+            logger.warning(f"Warm cache holds {served.cache.k} < {self.config.k} recommendations")
+            served.cache = None
+        served.preprocessor = embedding_store.load_preprocessor(self.config.embedding_group)
+        return served
+
+    def switch(self, version: str) -> "MovieInferencePipeline":
+        """Serve a registry version, mapped and warmed before requests see it.
+
+        Returns:
+            MovieInferencePipeline: Self reference for method chaining
+        """
+        if self.config.registry is None:
+            return self
+
+        with telemetry.stage("inference_pipeline.switch"):
+            served: ServedModel = self.__load(
+                self.config.registry.embedding_store(version), version
+            )
+            # one query reads every row, page faults are taken here and not by requests
+            served.embeddings.top_k(served.embeddings.ids[:1], k=1, kernel=self.config.kernel)
+            self.__served = served
+        logger.info(f"Serving model version {version}")
+        return self
+
+    def close(self) -> None:
+        """Stop watching the registry for new versions."""
+        if self.__watcher is not None:
+            self.__watcher.stop()
+
+    def __enter__(self) -> "MovieInferencePipeline":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def __score_features(
+        self, served: ServedModel, features: DataFrame, movie_ids: Any
+    ) -> tuple[ndarray, ndarray]:
+        """Neighbours and scores of raw feature records, preprocessed as at train time."""
+        if served.preprocessor is None:
+            raise ValueError(self.ERR_NO_PREPROCESSOR.format(self.config.embedding_group))
+
+        telemetry.count("recommendation_cold_start_total", len(features))
+        # records built from JSON leave the columns without any value untyped
+        preprocessed: Any = served.preprocessor.transform(MovieFeaturePreprocessor.typed(features))
+        return served.embeddings.top_k_features(
+            preprocessed, k=self.config.k, kernel=self.config.kernel, movie_ids=movie_ids
+        )
+
+    def __cold_top_k(self, served: ServedModel, movie_ids: ndarray) -> tuple[ndarray, ndarray]:
+        """Neighbours and scores of movies not in the embeddings, from their stored features."""
+        if self.config.feature_store is None or served.preprocessor is None:
+            raise KeyError(Embeddings.ERR_UNKNOWN_IDS.format(movie_ids.tolist()))
+
+        features: DataFrame = self.config.feature_store.get_features_by_ids(
+            self.config.feature_group, movie_ids.tolist(), served.preprocessor.columns
+        )
+        missing: ndarray = movie_ids[~isin(movie_ids, features["id"].to_numpy(dtype=int64))]
+        if len(missing):
+            raise KeyError(Embeddings.ERR_UNKNOWN_IDS.format(missing.tolist()))
+
+        features = features.set_index("id").loc[movie_ids].reset_index()
+        return self.__score_features(served, features, movie_ids)
+
+    def __top_k(self, served: ServedModel, movie_ids: list[int]) -> tuple[ndarray, ndarray]:
+        """Neighbours and scores of each movie, scored from the features if not stored."""
+        ids: ndarray = asarray(movie_ids, dtype=int64)
+        _, stored = served.embeddings.lookup(ids)
+        if stored.all():
+            return self.__stored_top_k(served, movie_ids)
+
+        k: int = max(0, min(self.config.k, len(served.embeddings.ids) - 1))
+        neighbours: ndarray = empty((len(ids), k), dtype=int64)
+        scores: ndarray = empty((len(ids), k), dtype=float32)
+        cold_neighbours, cold_scores = self.__cold_top_k(served, ids[~stored])
+        # new movies have every stored movie as candidate, one more than the stored ones
+        neighbours[~stored], scores[~stored] = cold_neighbours[:, :k], cold_scores[:, :k]
+        if stored.any():
+            neighbours[stored], scores[stored] = self.__stored_top_k(served, ids[stored].tolist())
+        return neighbours, scores
+
+    def __stored_top_k(self, served: ServedModel, movie_ids: list[int]) -> tuple[ndarray, ndarray]:
+        """Neighbours and scores of each stored movie, from the cache for the warmed movies."""
+        embeddings, cache = served.embeddings, served.cache
+        if cache is None:
+            return embeddings.top_k(movie_ids, k=self.config.k, kernel=self.config.kernel)
+
+        rows, hits = cache.lookup(movie_ids)
+        telemetry.count("recommendation_cache_hits_total", int(hits.sum()))
+        telemetry.count("recommendation_cache_misses_total", int((~hits).sum()))
+        k: int = max(0, min(self.config.k, len(embeddings.ids) - 1))
+        neighbours: ndarray = empty((len(movie_ids), k), dtype=int64)
+        scores: ndarray = empty((len(movie_ids), k), dtype=float32)
+        neighbours[hits] = cache.neighbours[rows[hits], :k]
+        scores[hits] = cache.scores[rows[hits], :k]
+        if not hits.all():
+            misses: ndarray = ~hits
+            neighbours[misses], scores[misses] = embeddings.top_k(
+                [movie_id for movie_id, hit in zip(movie_ids, hits, strict=True) if not hit],
+                k=self.config.k,
+                kernel=self.config.kernel,
+            )
+        return neighbours, scores
+
+    def recommend(self, movie_ids: list[int]) -> DataFrame:
+        """Top ``k`` similar movies for each movie.
+
+        Movies not in the embeddings are scored from their features in the feature store,
+        when the fitted preprocessor was stored with the embeddings.
+
+        Args:
+            movie_ids: Movies to recommend for.
+
+        Returns:
+            DataFrame: One row per recommendation with movie_id, rank, recommended_id and score,
+                followed by the metadata columns of the recommended movie.
+        """
+        logger.info(f"Recommending {self.config.k} movies for {len(movie_ids)} movies")
+        # a single read, the whole request is answered by the same version
+        neighbours, scores = self.__top_k(self.__served, movie_ids)
+        return self.__recommendations(movie_ids, neighbours, scores)
+
+    def recommend_features(self, records: DataFrame | list[dict[str, Any]]) -> DataFrame:
+        """Top ``k`` similar movies for raw feature records, e.g. of movies not yet trained on.
+
+        The records are preprocessed by the pipeline fitted at train time and scored against
+        the embeddings in one vectorized pass, a stored movie is not its own neighbour.
+
+        Args:
+            records: Features of the movies, one record per movie holding the model required
+                features and optionally the movie ``id``.
+
+        Returns:
+            DataFrame: Recommendations as returned by ``recommend``, the movie_id of each
+                record being its position unless every record has an id.
+        """
+        features: DataFrame = DataFrame(records).reset_index(drop=True)
+        identified: bool = "id" in features and bool(features["id"].notna().all())
+        movie_ids: list[int] = (
+            features["id"].astype(int64).tolist() if identified else features.index.tolist()
+        )
+        logger.info(f"Recommending {self.config.k} movies for {len(features)} feature records")
+        neighbours, scores = self.__score_features(
+            self.__served, features, movie_ids if identified else None
+        )
+        return self.__recommendations(movie_ids, neighbours, scores)
+
+    def __recommendations(
+        self, movie_ids: list[int], neighbours: ndarray, scores: ndarray
+    ) -> DataFrame:
+        """Recommendations frame of the neighbours of each movie, with their metadata."""
+        recommendations: DataFrame = DataFrame(
+            {
+                "movie_id": repeat(movie_ids, neighbours.shape[1]),
+                "rank": tile(arange(1, neighbours.shape[1] + 1), len(movie_ids)),
+                "recommended_id": neighbours.ravel(),
+                "score": scores.ravel(),
+            }
+        )
+        if self.config.feature_store is None:
+            return recommendations
+
+        metadata: DataFrame = self.config.feature_store.get_features_by_ids(
+            self.config.feature_group,
+            recommendations["recommended_id"].unique().tolist(),
+            self.config.metadata_columns,
+        )
+        return recommendations.merge(
+            metadata.rename(columns={"id": "recommended_id"}), on="recommended_id", how="left"
+        )
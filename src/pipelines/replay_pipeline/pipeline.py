@@ -0,0 +1,224 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass
+from gzip import GzipFile
+from io import BytesIO
+from os import cpu_count
+from pathlib import Path
+from typing import ClassVar
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+from pyarrow.json import ParseOptions, read_json
+
+from src.pipelines.backfill_pipeline.pipeline import MovieBackfillPipeline
+from src.utils.raw_landing import RawLandingZone
+from src.utils.sqlite_conn import SQLiteConn
+from src.utils.telemetry import telemetry
+
+
+@dataclass
+class ReplayPipelineConfig:
+    """Configuration for the raw response replay pipeline.
+
+    Attributes:
+        ALLOWED_TYPES: Valid load types for the pipeline.
+        feature_group: Name of the feature group/table.
+        raw_dir: Landing zone of the raw TMDb responses.
+        type: Load type, ``initial`` rebuilds the feature group and ``incremental``
+            upserts the replayed movies into it.
+        max_workers: Files parsed in parallel, by default the number of CPUs.
+
+    Raises:
+        ValueError: If provided load type is not in ALLOWED_TYPES or no raw file is found.
+    """
+
+    ERR_INVALID_TYPE: ClassVar[str] = "Invalid load type: {}. Must be one of: {}"
+    ERR_NO_FILES: ClassVar[str] = "No raw response files found in {}"
+
+    ALLOWED_TYPES: ClassVar[list[str]] = ["initial", "incremental"]
+
+    feature_group: str
+    raw_dir: str = r"data/01_raw/tmdb"
+    type: str = "initial"
+    max_workers: int | None = None
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if self.type not in self.ALLOWED_TYPES:
+            raise ValueError(self.ERR_INVALID_TYPE.format(self.type, ", ".join(self.ALLOWED_TYPES)))
+        if not RawLandingZone(self.raw_dir).files():
+            raise ValueError(self.ERR_NO_FILES.format(self.raw_dir))
+
+
+class MovieReplayPipeline:
+    """Pipeline rebuilding the movie feature group from the landed raw API responses.
+
+    Response files are parsed in parallel threads by the Arrow JSON reader, which
+    releases the GIL, and converted to the feature store schema with Arrow compute
+    kernels, without any network call. Details responses hold every movie column and
+    take precedence over discover results of the same movie, whatever their dates.
+    ``is_popular`` is membership in the popular lists of the latest partition landing
+    any, and ``extraction_date`` is the date of the partition of the response.
+
+    Attributes:
+        config: Pipeline configuration parameters.
+    """
+
+    # columns of a movie in discover and popular results
+    MOVIE_FIELDS: ClassVar[list[pa.Field]] = [
+        pa.field("id", pa.int64()),
+        pa.field("adult", pa.bool_()),
+        pa.field("original_language", pa.string()),
+        pa.field("original_title", pa.string()),
+        pa.field("overview", pa.string()),
+        pa.field("popularity", pa.float64()),
+        pa.field("vote_average", pa.float64()),
+        pa.field("vote_count", pa.int64()),
+        pa.field("release_date", pa.string()),
+    ]
+    NAMES: ClassVar[pa.DataType] = pa.list_(pa.struct([pa.field("name", pa.string())]))
+    DETAILS_FIELDS: ClassVar[list[pa.Field]] = [
+        *MOVIE_FIELDS,
+        pa.field("runtime", pa.int64()),
+        pa.field("budget", pa.int64()),
+        pa.field("revenue", pa.int64()),
+        pa.field("status", pa.string()),
+        pa.field("tagline", pa.string()),
+        pa.field("genres", NAMES),
+        pa.field("spoken_languages", NAMES),
+    ]
+    RESULTS_BODY: ClassVar[pa.DataType] = pa.struct(
+        [pa.field("results", pa.list_(pa.struct(MOVIE_FIELDS)))]
+    )
+    BODIES: ClassVar[dict[str, pa.DataType]] = {
+        "discover": RESULTS_BODY,
+        "popular": RESULTS_BODY,
+        "details": pa.struct(DETAILS_FIELDS),
+    }
+
+    def __init__(self, config: ReplayPipelineConfig):
+        self.config = config
+        self.landing = RawLandingZone(config.raw_dir)
+
+    @classmethod
+    def read(cls, path: Path) -> pa.Table:
+        """Response bodies of a file, the complete lines of a truncated file included.
+
+        Returns:
+            pa.Table: One ``body`` struct per response, of the schema of its endpoint.
+        """
+        options: ParseOptions = ParseOptions(
+            explicit_schema=pa.schema(
+                [pa.field("body", cls.BODIES[RawLandingZone.endpoint(path)])]
+            ),
+            unexpected_field_behavior="ignore",
+        )
+        try:
+            return read_json(path, parse_options=options)
+        except OSError as e:  # left truncated by an interrupted run
+            lines: list[bytes] = []
+            with GzipFile(path) as file, suppress(EOFError):
+                lines.extend(file)  # lines read before the end of the stream are kept
+            complete: list[bytes] = [line for line in lines if line.endswith(b"\n")]
+            logger.warning(f"Recovered {len(complete)} responses from truncated {path}: {e}")
+            return read_json(BytesIO(b"".join(complete)), parse_options=options)
+
+    @classmethod
+    def movies(cls, responses: pa.Table) -> pa.Table:
+        """Movies of the responses of a file, list of names columns as lists of strings."""
+        bodies: pa.ChunkedArray = responses.column("body")
+        if "results" in bodies.type.names:
+            results: pa.Array = pc.list_flatten(pc.struct_field(bodies, "results"))
+            return pa.Table.from_struct_array(results)
+
+        movies: pa.Table = pa.Table.from_struct_array(bodies)
+        for name in ("genres", "spoken_languages"):
+            lists: pa.ListArray = movies.column(name).combine_chunks()
+            names: pa.Array = pa.ListArray.from_arrays(
+                lists.offsets, pc.struct_field(lists.values, "name"), mask=lists.is_null()
+            )
+            movies = movies.set_column(movies.schema.get_field_index(name), name, names)
+        return movies
+
+    def __parse(self, paths: list[Path]) -> Iterator[tuple[Path, pa.Table]]:
+        """Movies of the files, parsed in parallel a window of files at a time."""
+        workers: int = self.config.max_workers or cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(paths), workers):
+                window: list[Path] = paths[start : start + workers]
+                for path, responses in zip(window, executor.map(self.read, window), strict=True):
+                    telemetry.count(
+                        "replay_responses_read_total",
+                        responses.num_rows,
+                        endpoint=self.landing.endpoint(path),
+                    )
+                    yield path, self.movies(responses)
+
+    def __popular_ids(self) -> pa.Array | None:
+        """Ids of the popular movies of the latest partition landing popular lists."""
+        files: list[Path] = self.landing.files("popular")
+        if not files:
+            logger.warning("No popular lists landed, is_popular is left unknown")
+            return None
+
+        latest: str = self.landing.partition(files[-1])
+        ids: list[pa.Array] = [
+            chunk
+            for _, movies in self.__parse([f for f in files if self.landing.partition(f) == latest])
+            for chunk in movies.column("id").chunks
+        ]
+        return pc.unique(pa.chunked_array(ids, type=pa.int64()))
+
+    def __batches(self) -> Iterator[pa.RecordBatch]:
+        popular_ids: pa.Array | None = self.__popular_ids()
+        detailed_ids: set[int] = set()
+
+        def batches(path: Path, movies: pa.Table) -> Iterable[pa.RecordBatch]:
+            is_popular: pa.Array = (
+                pc.is_in(movies.column("id"), value_set=popular_ids).cast(pa.int64())
+                if popular_ids is not None
+                else pa.nulls(movies.num_rows, pa.int64())
+            )
+            movies = movies.append_column("is_popular", is_popular)
+            telemetry.count("replay_rows_read_total", movies.num_rows)
+            return (
+                MovieBackfillPipeline.to_store_schema(batch, self.landing.partition(path))
+                for batch in movies.to_batches()
+            )
+
+        for path, movies in self.__parse(self.landing.files("details")):
+            detailed_ids.update(movies.column("id").to_pylist())
+            yield from batches(path, movies)
+
+        # discover results only hold the base columns, replayed for movies without details
+        detailed: pa.Array = pa.array(detailed_ids, type=pa.int64())
+        for path, movies in self.__parse(self.landing.files("discover")):
+            undetailed: pa.Table = movies.filter(
+                pc.invert(pc.is_in(movies.column("id"), value_set=detailed))
+            )
+            yield from batches(path, undetailed)
+
+    @telemetry.stage("replay_pipeline.run")
+    def run(self, feature_store: SQLiteConn) -> int:
+        """Load the replayed movies into the feature group.
+
+        Args:
+            feature_store: Feature store to load, it must support Arrow bulk loads.
+
+        Returns:
+            int: Number of movies stored.
+        """
+        logger.info(
+            f"\nStarting Replay Pipeline:\n"
+            f"- Load type: {self.config.type}\n"
+            f"- Raw files: {len(self.landing.files())} in {self.config.raw_dir}\n"
+            f"- Feature group: {self.config.feature_group}"
+        )
+        return feature_store.bulk_load(
+            self.config.feature_group,
+            self.__batches(),
+            mode="replace" if self.config.type == "initial" else "upsert",
+        )
@@ -1,19 +1,54 @@
+from collections import Counter
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from itertools import chain
 from typing import Any, ClassVar
 
-from numpy import nan, ndarray
-from pandas import DataFrame
+from numpy import (
+    arange,
+    array,
+    asarray,
+    bincount,
+    concatenate,
+    cumsum,
+    empty,
+    flatnonzero,
+    float32,
+    float64,
+    fromiter,
+    int64,
+    isnan,
+    median,
+    memmap,
+    nan,
+    ndarray,
+    ones,
+    repeat,
+    searchsorted,
+    split,
+    unique,
+    zeros,
+)
+from numpy.lib.format import open_memmap
+from pandas import ArrowDtype, DataFrame, Index, Series, factorize, isna, to_numeric
+from pyarrow import types
+from scipy.sparse import csr_matrix
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import (
     FunctionTransformer,
-    MultiLabelBinarizer,
     OneHotEncoder,
 )
 
 
 class MovieFeaturePreprocessor:
+    ERR_NO_ROWS: ClassVar[str] = "No rows to preprocess"
+    ERR_ROWS_CHANGED: ClassVar[str] = (
+        "Rows changed between the passes of the chunked fit: {} counted, {} transformed"
+    )
+
     NUM_COLS: ClassVar[list[str]] = [
         "popularity",
         "vote_average",
@@ -192,17 +227,17 @@ class MovieFeaturePreprocessor:
         cls,
         X: DataFrame,
         col: str,
-        mappings: dict[str, str],
+        mappings: Mapping[Any, str],
     ) -> DataFrame:
         """
         Map language codes to broader categories.
         """
-        X = X.copy()
-        if X[col].dtype.name == "object":  # if it's a list
-            X[col] = X[col].apply(lambda x: [mappings.get(item, "Unknown/Other") for item in x])
-            return X
-        X[col] = X[col].map(mappings)
-        return X
+        if MultiLabelBinarizerTransformer.is_lists(X[col]):
+            lengths, items = MultiLabelBinarizerTransformer.explode(X[col])
+            mapped: ndarray = MultiLabelBinarizerTransformer.lookup(items, mappings)
+            groups: list[ndarray] = split(mapped, cumsum(lengths)[:-1])
+            return X.assign(**{col: Series([g.tolist() for g in groups], index=X.index)})
+        return X.assign(**{col: X[col].map(mappings)})
 
     @classmethod
     def get_preprocessor(cls) -> ColumnTransformer:
@@ -222,26 +257,20 @@ class MovieFeaturePreprocessor:
                     ),
                 ),
                 ("imputer", SimpleImputer(strategy="most_frequent")),
-                ("one-hot", OneHotEncoder(drop="first")),
+                # groups unseen at fit time, e.g. of a new movie, are encoded as the dropped one
+                ("one-hot", OneHotEncoder(drop="first", handle_unknown="ignore")),
             ]
         )
 
         multi_label_genres_pipe = Pipeline(steps=[("binarizer", MultiLabelBinarizerTransformer())])
 
+        # languages are mapped on the exploded labels, inside the binarizer
         multi_label_spoken_languages_pipe = Pipeline(
             steps=[
                 (
-                    "language mapper",
-                    FunctionTransformer(
-                        cls.map_lang,
-                        kw_args={
-                            "col": "spoken_languages",
-                            "mappings": cls.SPOKEN_LANGUAGES_MAPPINGS,
-                        },
-                        feature_names_out=cls.get_features_names,
-                    ),
+                    "binarizer",
+                    MultiLabelBinarizerTransformer(mappings=cls.SPOKEN_LANGUAGES_MAPPINGS),
                 ),
-                ("binarizer", MultiLabelBinarizerTransformer()),
             ]
         )
 
@@ -256,25 +285,286 @@ class MovieFeaturePreprocessor:
                     ["spoken_languages"],
                 ),
             ],
+            # the binarizers return CSR blocks, the stacked output stays a dense array
+            sparse_threshold=0,
         )
         return preprocessor
 
+    @classmethod
+    def typed(cls, chunk: DataFrame) -> DataFrame:
+        """Type the numeric and language columns left untyped, as the whole data types them.
+
+        Feature stores type every column, but a chunk of another source holding only
+        missing values in a column has no type to infer.
+        """
+        untyped: set[str] = {col for col in chunk.columns if chunk[col].dtype == object}
+        return chunk.astype(
+            {col: "float64" for col in cls.NUM_COLS if col in untyped}
+            | {col: "string" for col in cls.CAT_COLS if col in untyped}
+        )
+
+    @classmethod
+    def summary_frame(cls, statistics: "FeatureStatistics") -> DataFrame:
+        """Small frame fitting the preprocessor to the same state as the whole data.
+
+        Numeric columns hold the median only, the language column every code seen with
+        the most frequent language in the majority, and the multi-label columns every
+        label seen in their first row.
+        """
+        codes: list[str] = sorted(statistics.languages)
+        most_frequent: str | None = statistics.most_frequent_language(
+            cls.ORIGINAL_LANGUAGE_MAPPINGS
+        )
+        majority: list[str | None] = [most_frequent] * (len(codes) + 1)
+        rows: int = len(codes) + len(majority)
+
+        columns: dict[str, list[Any]] = {col: [None] * rows for col in statistics.columns}
+        for col in cls.NUM_COLS:
+            columns[col] = [statistics.median(col)] * rows
+        columns[cls.CAT_COLS[0]] = [*codes, *majority]
+        for col, labels in (("genres", statistics.genres), ("spoken_languages", statistics.spoken)):
+            columns[col] = [sorted(labels, key=str), *([[]] * (rows - 1))]
+        return cls.typed(DataFrame(columns, columns=statistics.columns))
+
+    @classmethod
+    def fit_chunked(
+        cls,
+        preprocessor: ColumnTransformer,
+        chunks: Callable[[], Iterable[DataFrame]],
+        path: str,
+        id_col: str = "id",
+    ) -> tuple[ndarray, ndarray]:
+        """Fit and transform the features in two passes over chunks, out of core.
+
+        The first pass collects the statistics the preprocessor learns, which fit it on
+        their summary frame. The second pass transforms each chunk into a float32 matrix
+        mapped to ``path``. The result equals the in-memory ``fit_transform`` as float32,
+        only one chunk and the statistics are held in memory.
+
+        Args:
+            preprocessor: Preprocessor returned by ``get_preprocessor``.
+            chunks: Returns the feature chunks, called once per pass, in the same order.
+            path: File of the memory-mapped matrix (.npy).
+            id_col: Column identifying the rows.
+
+        Returns:
+            The memory-mapped preprocessed matrix and the id of each row.
+        """
+        statistics: FeatureStatistics = FeatureStatistics()
+        for chunk in chunks():
+            statistics.update(chunk)
+        if not statistics.rows:
+            raise ValueError(cls.ERR_NO_ROWS)
+
+        preprocessor.fit(cls.summary_frame(statistics))
+
+        matrix: memmap | None = None
+        ids: ndarray = empty(statistics.rows, dtype=int64)
+        start: int = 0
+        for chunk in chunks():
+            end: int = start + len(chunk)
+            if end > statistics.rows:
+                raise ValueError(cls.ERR_ROWS_CHANGED.format(statistics.rows, end))
+
+            transformed: ndarray = preprocessor.transform(cls.typed(chunk))
+            if matrix is None:
+                matrix = open_memmap(
+                    path, mode="w+", dtype=float32, shape=(statistics.rows, transformed.shape[1])
+                )
+            matrix[start:end] = transformed
+            ids[start:end] = chunk[id_col].to_numpy(dtype=int64)
+            start = end
+
+        if matrix is None or start != statistics.rows:
+            raise ValueError(cls.ERR_ROWS_CHANGED.format(statistics.rows, start))
+        matrix.flush()
+        return matrix, ids
+
+
+@dataclass
+class FeatureStatistics:
+    """Statistics learned by the movie preprocessor, collected chunk by chunk.
+
+    Numeric columns are kept as counts of their distinct values, so memory grows with the
+    distinct values rather than the rows.
+
+    Attributes:
+        rows: Rows seen.
+        columns: Columns of the chunks.
+        values: Sorted distinct values of each numeric column and their counts.
+        languages: Counts of the original language codes.
+        genres: Genres seen.
+        spoken: Spoken languages seen, before mapping.
+    """
+
+    rows: int = 0
+    columns: list[str] = field(default_factory=list)
+    values: dict[str, tuple[ndarray, ndarray]] = field(default_factory=dict)
+    languages: Counter[str] = field(default_factory=Counter)
+    genres: set[Any] = field(default_factory=set)
+    spoken: set[Any] = field(default_factory=set)
+
+    def __count(self, col: str, column: Series) -> None:
+        numbers: ndarray = to_numeric(column).to_numpy(dtype=float64, na_value=nan)
+        chunk_values, chunk_counts = unique(numbers[~isnan(numbers)], return_counts=True)
+        if col in self.values:
+            seen_values, seen_counts = self.values[col]
+            chunk_values, inverse = unique(
+                concatenate([seen_values, chunk_values]), return_inverse=True
+            )
+            chunk_counts = bincount(inverse, weights=concatenate([seen_counts, chunk_counts]))
+        self.values[col] = (chunk_values, chunk_counts.astype(int64))
+
+    @staticmethod
+    def __labels(column: Series) -> set[Any]:
+        _, items = MultiLabelBinarizerTransformer.explode(column)
+        return set(factorize(items, use_na_sentinel=False)[1])
+
+    def update(self, chunk: DataFrame) -> "FeatureStatistics":
+        """Add a chunk of features to the statistics.
+
+        Returns:
+            FeatureStatistics: Self reference for method chaining
+        """
+        self.rows += len(chunk)
+        self.columns = self.columns or chunk.columns.tolist()
+        for col in MovieFeaturePreprocessor.NUM_COLS:
+            self.__count(col, chunk[col])
+        codes: Series = chunk[MovieFeaturePreprocessor.CAT_COLS[0]]
+        self.languages.update(codes[codes.notna()].astype(str))
+        self.genres |= self.__labels(chunk["genres"])
+        self.spoken |= self.__labels(chunk["spoken_languages"])
+        return self
+
+    def median(self, col: str) -> float | None:
+        """Median of the values of a numeric column, None if all are missing."""
+        values, counts = self.values.get(col, (empty(0), empty(0, dtype=int64)))
+        n: int = int(counts.sum())
+        if not n:
+            return None
+
+        # the two middle values of the sorted column, equal for an odd count
+        cumulative: ndarray = cumsum(counts)
+        middle: ndarray = values[searchsorted(cumulative, [(n - 1) // 2, n // 2], side="right")]
+        return float(median(middle))
+
+    def most_frequent_language(self, mappings: dict[str, str]) -> str | None:
+        """A code of the most frequent mapped language, the smallest one on ties."""
+        mapped: Counter[str] = Counter()
+        for code, count in self.languages.items():
+            if code in mappings:
+                mapped[mappings[code]] += count
+        if not mapped:
+            return None
+
+        top: int = max(mapped.values())
+        language: str = min(language for language, count in mapped.items() if count == top)
+        return min(code for code in self.languages if mappings.get(code) == language)
+
 
 class MultiLabelBinarizerTransformer(BaseEstimator, TransformerMixin):
-    """A custom transformer to apply MultiLabelBinarizer within a scikit-learn pipeline.
+    """A custom transformer to binarize multi-label data within a scikit-learn pipeline.
 
     This transformer is designed to be used with `ColumnTransformer` on a single
     column of a pandas DataFrame that contains lists of labels (multi-label data).
-    It wraps the functionality of `sklearn.preprocessing.MultiLabelBinarizer` and
-    provides a `get_feature_names_out` method compatible with scikit-learn pipelines.
+    It gives the same output as `sklearn.preprocessing.MultiLabelBinarizer`, without
+    iterating the rows in Python: the lists are exploded once, mapped through a
+    categorical lookup of their unique labels, and the codes build the indicator
+    matrix directly as CSR.
+
+    Attributes:
+        mappings: Optional mapping applied to the labels before binarizing.
+        default: Label used for values missing from ``mappings``.
+        classes_: Sorted labels learned on fit.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, mappings: dict[Any, str] | None = None, default: str = "Unknown/Other"
+    ) -> None:
         """Initializes the MultiLabelBinarizerTransformer."""
-        self.mlb = MultiLabelBinarizer()
+        self.mappings = mappings
+        self.default = default
+
+    @staticmethod
+    def is_lists(labels: Series) -> bool:
+        """Whether the column holds lists, as Python objects or as an Arrow list array."""
+        return labels.dtype == object or (
+            isinstance(labels.dtype, ArrowDtype) and types.is_list(labels.dtype.pyarrow_dtype)
+        )
+
+    @staticmethod
+    def explode(labels: Series) -> tuple[ndarray, ndarray]:
+        """Flatten a column of label lists.
 
-    def fit(self, X: DataFrame, y: Any = None) -> MultiLabelBinarizer:
-        """Fits the MultiLabelBinarizer on the input data.
+        Args:
+            labels: Column containing lists of labels, missing values count as empty lists.
+
+        Returns:
+            The number of labels of each row and the flattened labels.
+        """
+        if isinstance(labels.dtype, ArrowDtype):  # flattened by Arrow, no list per row
+            return (
+                labels.list.len().fillna(0).to_numpy(dtype=int64),
+                labels.list.flatten().to_numpy(dtype=object),
+            )
+
+        lists: ndarray = labels.to_numpy(dtype=object)
+        missing: ndarray = isna(lists)
+        if missing.any():
+            lists = lists.copy()
+            for row in flatnonzero(missing):
+                lists[row] = []
+
+        lengths: ndarray = fromiter(map(len, lists), dtype=int64, count=len(lists))
+        items: ndarray = fromiter(
+            chain.from_iterable(lists), dtype=object, count=int(lengths.sum())
+        )
+        return lengths, items
+
+    @staticmethod
+    def lookup(
+        items: ndarray, mappings: Mapping[Any, str], default: str = "Unknown/Other"
+    ) -> ndarray:
+        """Map flattened labels, looking up each unique label once."""
+        codes, uniques = factorize(items, use_na_sentinel=False)
+        mapped: ndarray = array([mappings.get(label, default) for label in uniques], dtype=object)
+        labels: ndarray = mapped[codes]
+        return labels
+
+    def __encode(self, X: DataFrame) -> tuple[ndarray, ndarray, ndarray]:
+        """Explode the column once and factorize the (mapped) labels.
+
+        Returns:
+            The number of labels of each row, the code of each label and the unique labels.
+        """
+        lengths, items = self.explode(X.iloc[:, 0])
+        codes, uniques = factorize(items, use_na_sentinel=False)
+        labels: ndarray = asarray(uniques, dtype=object)
+        if self.mappings is not None:
+            labels = array(
+                [self.mappings.get(label, self.default) for label in labels], dtype=object
+            )
+        return lengths, codes, labels
+
+    def __indicators(self, lengths: ndarray, codes: ndarray, labels: ndarray) -> csr_matrix:
+        # class of each unique label, labels not seen on fit are ignored (-1)
+        classes: ndarray = Index(self.classes_).get_indexer(labels)
+        indices: ndarray = classes[codes]
+        rows: ndarray = repeat(arange(len(lengths)), lengths)
+        known: ndarray = indices >= 0
+
+        indptr: ndarray = zeros(len(lengths) + 1, dtype=int64)
+        cumsum(bincount(rows[known], minlength=len(lengths)), out=indptr[1:])
+        indicators: csr_matrix = csr_matrix(
+            (ones(known.sum(), dtype=int64), indices[known], indptr),
+            shape=(len(lengths), len(self.classes_)),
+        )
+        indicators.sum_duplicates()
+        indicators.data[:] = 1  # repeated labels in a row
+        return indicators
+
+    def fit(self, X: DataFrame, y: Any = None) -> "MultiLabelBinarizerTransformer":
+        """Learns the sorted labels of the input data.
 
         Args:
             X: A pandas DataFrame slice with one column containing lists of labels.
@@ -283,20 +573,28 @@ class MultiLabelBinarizerTransformer(BaseEstimator, TransformerMixin):
         Returns:
             self: Returns the instance itself.
         """
-        self.mlb.fit(X.iloc[:, 0])
+        _, _, labels = self.__encode(X)
+        self.classes_: ndarray = array(sorted(set(labels)), dtype=object)
         return self
 
-    def transform(self, X: DataFrame) -> Any:  # TODO: Fix Any
-        """Transforms the input data using the fitted MultiLabelBinarizer.
+    def transform(self, X: DataFrame) -> csr_matrix:
+        """Transforms the input data into a label indicator matrix.
+
+        Labels not seen on fit are ignored, as `MultiLabelBinarizer` does.
 
         Args:
             X: A pandas DataFrame slice with one column containing lists of labels.
 
         Returns:
-            numpy.ndarray: A sparse matrix representing the binarized labels.
+            scipy.sparse.csr_matrix: A sparse matrix representing the binarized labels.
         """
-        # Transform the values of the column
-        return self.mlb.transform(X.iloc[:, 0])
+        return self.__indicators(*self.__encode(X))
+
+    def fit_transform(self, X: DataFrame, y: Any = None, **fit_params: Any) -> csr_matrix:
+        """Fit and transform exploding the column only once."""
+        lengths, codes, labels = self.__encode(X)
+        self.classes_ = array(sorted(set(labels)), dtype=object)
+        return self.__indicators(lengths, codes, labels)
 
     def get_feature_names_out(self, _: Any = None) -> Any:  # TODO: Fix Any
         """Gets the output feature names after binarization.
@@ -307,5 +605,4 @@ class MultiLabelBinarizerTransformer(BaseEstimator, TransformerMixin):
         Returns:
             list: A list of strings representing the output feature names (the labels).
         """
-        # Return the classes learned by the fitted MultiLabelBinarizer
-        return self.mlb.classes_.tolist()
+        return self.classes_.tolist()
@@ -1,22 +1,195 @@
-from typing import ClassVar
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from os import cpu_count
+from time import perf_counter
+from typing import Any, ClassVar
 
+from joblib import hash as joblib_hash
+from loguru import logger
+from numpy import asarray, ndarray
+from threadpoolctl import threadpool_limits
+
+from src.utils.embedding_store import EmbeddingStore
+from src.utils.model_registry import ModelRegistry
 from src.utils.recommender_models import RecommenderModel
 
 
 class MovieTrainPipeline:
+    """Pipeline that fits the recommender models and stores their outputs.
+
+    The inputs of every step are prepared first, once per distinct ``input_key``, so
+    models trained on the same features share one read-only matrix. The model steps are
+    then independent and run one after another (``sequential``) or concurrently in a
+    thread pool (``thread``). Threads share the input matrix without copying it, and
+    numpy/BLAS release the GIL while computing the similarities. Only the fits run in
+    the pool, the outputs are stored from the calling thread, which owns the feature
+    store connection.
+
+    With ``warm_cache_k``, every embedding model also stores the top recommendations of
+    the popular movies and the ``hot_ids``, served from memory from the first request.
+
+    With a ``registry``, the embeddings of a run are written to a new model version,
+    described by a manifest (data hash, fingerprints, metrics) and published at once
+    when every step succeeded. Similarity matrices are still stored in the feature store.
+
+    Attributes:
+        executor: How the model steps are run (sequential/thread).
+        max_workers: Number of worker threads, defaults to one per step up to the CPU count.
+        warm_cache_k: Recommendations precomputed per popular or hot movie, 0 disables it.
+        hot_ids: Movies precomputed besides the popular ones.
+        registry: Model registry the embeddings are published to, if any.
+        steps: Models to train, by name.
+        run_metadata: Executor, workers and time spent in each step of the last run.
+    """
+
     ERR_NO_STEPS: ClassVar[str] = "No training steps have been added to the pipeline"
+    ERR_INVALID_EXECUTOR: ClassVar[str] = "Invalid executor: {}. Must be one of: {}"
+
+    ALLOWED_EXECUTORS: ClassVar[list[str]] = ["sequential", "thread"]
+
+    def __init__(
+        self,
+        executor: str = "sequential",
+        max_workers: int | None = None,
+        warm_cache_k: int = 0,
+        hot_ids: list[int] | None = None,
+        registry: ModelRegistry | None = None,
+    ) -> None:
+        if executor not in self.ALLOWED_EXECUTORS:
+            raise ValueError(
+                self.ERR_INVALID_EXECUTOR.format(executor, ", ".join(self.ALLOWED_EXECUTORS))
+            )
 
-    def __init__(self) -> None:
+        self.executor = executor
+        self.max_workers = max_workers
+        self.warm_cache_k = warm_cache_k
+        self.hot_ids: list[int] = hot_ids or []
+        self.registry = registry
         self.steps: dict[str, RecommenderModel] = {}
+        self.run_metadata: dict[str, Any] = {}
 
     def add_training_step(self, model: RecommenderModel) -> "MovieTrainPipeline":
         self.steps[model.name] = model
         return self
 
+    def __prepare_inputs(self) -> dict[str, tuple[Any, ndarray]]:
+        inputs: dict[str, tuple[Any, ndarray]] = {}
+        fitted: dict[str, RecommenderModel] = {}
+        for name, model in self.steps.items():
+            if model.input_key in inputs:
+                # equal pipelines, every model stores the one fitted preparing the inputs
+                model.config.transformation_pipeline = fitted[
+                    model.input_key
+                ].config.transformation_pipeline
+                continue
+            fitted[model.input_key] = model
+            start: float = perf_counter()
+            preprocessed_features, ids = model.prepare_inputs()
+            if hasattr(preprocessed_features, "flags"):  # dense matrix, shared read-only
+                preprocessed_features.flags.writeable = False
+            inputs[model.input_key] = (preprocessed_features, ids)
+            self.run_metadata["steps"][name]["prepare_seconds"] = perf_counter() - start
+
+        return inputs
+
+    def __fit_step(self, model: RecommenderModel, inputs: tuple[Any, ndarray]) -> None:
+        start: float = perf_counter()
+        model.fit(*inputs)
+        self.run_metadata["steps"][model.name]["fit_seconds"] = perf_counter() - start
+
+    def __store_step(self, model: RecommenderModel, embedding_store: EmbeddingStore | None) -> None:
+        start: float = perf_counter()
+        model.store_outputs(embedding_store)
+        stored: float = perf_counter()
+
+        if self.warm_cache_k:
+            model.store_warm_cache(self.warm_cache_k, self.hot_ids)
+
+        self.run_metadata["steps"][model.name].update(
+            {"store_seconds": stored - start, "warm_cache_seconds": perf_counter() - stored}
+        )
+
+    def __workers(self) -> int:
+        if self.executor == "sequential":
+            return 1
+        return self.max_workers or min(len(self.steps), cpu_count() or 1)
+
+    def __run_steps(
+        self,
+        inputs: dict[str, tuple[Any, ndarray]],
+        workers: int,
+        embedding_store: EmbeddingStore | None,
+    ) -> None:
+        if self.executor == "sequential":
+            for model in self.steps.values():
+                self.__fit_step(model, inputs[model.input_key])
+                self.__store_step(model, embedding_store)
+        else:
+            # split the cores between the workers to avoid BLAS oversubscription
+            blas_threads: int = max(1, (cpu_count() or 1) // workers)
+            with (
+                threadpool_limits(limits=blas_threads, user_api="blas"),
+                ThreadPoolExecutor(max_workers=workers) as pool,
+            ):
+                futures: dict[Future[None], RecommenderModel] = {
+                    pool.submit(self.__fit_step, model, inputs[model.input_key]): model
+                    for model in self.steps.values()
+                }
+                # the feature store connection belongs to this thread, models are
+                # stored here as their fits complete while the others keep fitting
+                for future in as_completed(futures):
+                    future.result()
+                    self.__store_step(futures[future], embedding_store)
+
+    def __manifest(self, inputs: dict[str, tuple[Any, ndarray]]) -> dict[str, Any]:
+        """Data, outputs and metrics of the run, as recorded in the model version."""
+        # hashed by content, chunked inputs are memory-mapped
+        data_hashes: dict[str, str] = {
+            key: str(
+                joblib_hash((ids, asarray(features) if isinstance(features, ndarray) else features))
+            )
+            for key, (features, ids) in inputs.items()
+        }
+        return {
+            "executor": self.executor,
+            "workers": self.run_metadata["workers"],
+            "models": {
+                name: {
+                    "feature_group": model.config.training_feature_group,
+                    "features": model.config.required_features,
+                    "data_hash": data_hashes[model.input_key],
+                    "movies": len(inputs[model.input_key][1]),
+                    "kernel": model.kernel,
+                    "embedding_group": model.config.embedding_group,
+                    "precision": model.config.precision,
+                    "fingerprint": model.fingerprint,
+                    "quantization_drift": model.quantization_drift,
+                    **self.run_metadata["steps"][name],
+                }
+                for name, model in self.steps.items()
+            },
+        }
+
     def save_model_outputs(self) -> "MovieTrainPipeline":
         if not self.steps:
             raise ValueError(self.ERR_NO_STEPS)
-        for _, model in self.steps.items():
-            model.fit()
-            model.store_outputs()
+
+        workers: int = self.__workers()
+        self.run_metadata = {
+            "executor": self.executor,
+            "workers": workers,
+            "steps": {name: {"prepare_seconds": 0.0} for name in self.steps},
+        }
+        start: float = perf_counter()
+
+        inputs: dict[str, tuple[Any, ndarray]] = self.__prepare_inputs()
+        if self.registry is None:
+            self.__run_steps(inputs, workers, None)
+        else:
+            with self.registry.new_version() as version:
+                self.__run_steps(inputs, workers, version.embedding_store)
+                version.manifest.update(self.__manifest(inputs))
+            self.run_metadata["version"] = version.version
+
+        self.run_metadata["wall_seconds"] = perf_counter() - start
+        logger.info(f"Training run summary: {self.run_metadata}")
         return self
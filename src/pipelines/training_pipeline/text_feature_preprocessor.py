@@ -0,0 +1,158 @@
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any, ClassVar
+
+from numpy import asarray, concatenate, empty, float32, int32, int64, memmap, ndarray, zeros
+from pandas import DataFrame, Series
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.random_projection import SparseRandomProjection
+
+
+class TextFeaturePreprocessor:
+    """Stateless text features of the movies, hashed from their overview and tagline.
+
+    Terms are hashed into a fixed number of columns, so nothing is learned from the data:
+    there is no vocabulary to hold and every chunk is transformed on its own. The sparse
+    hashed rows can be projected on a few dense components by a sparse random projection,
+    which only depends on the number of columns and the seed and approximately preserves
+    the cosine similarities.
+    """
+
+    ERR_NO_ROWS: ClassVar[str] = "No rows to preprocess"
+
+    TEXT_COLS: ClassVar[list[str]] = ["overview", "tagline"]
+    N_FEATURES: ClassVar[int] = 2**18
+    RAW_SUFFIX: ClassVar[str] = ".f32"
+    DATA_SUFFIX: ClassVar[str] = ".data.f32"
+    INDICES_SUFFIX: ClassVar[str] = ".indices.i32"
+
+    @classmethod
+    def join_text(cls, X: DataFrame) -> Series:
+        """One document per movie, its text columns joined, missing text left empty."""
+        columns: list[Series] = [X[col].astype("string").fillna("") for col in cls.TEXT_COLS]
+        text: Series = columns[0]
+        for column in columns[1:]:
+            text = text + " " + column
+        return text
+
+    @classmethod
+    def get_preprocessor(
+        cls,
+        n_features: int = N_FEATURES,
+        n_components: int | None = None,
+        stop_words: str | None = "english",
+        seed: int = 42,
+    ) -> Pipeline:
+        """Hash the movie text into l2 normalized term counts, projected if ``n_components``.
+
+        Args:
+            n_features: Hashed columns, collisions get rarer as they grow.
+            n_components: Dense components of the random projection, no projection if None.
+            stop_words: Stop words removed before hashing, see ``HashingVectorizer``.
+            seed: Seed of the random projection.
+        """
+        steps: list[tuple[str, Any]] = [
+            ("text", FunctionTransformer(cls.join_text)),
+            (
+                "hashing",
+                HashingVectorizer(
+                    n_features=n_features,
+                    stop_words=stop_words,
+                    alternate_sign=False,
+                    dtype=float32,
+                ),
+            ),
+        ]
+        if n_components is not None:
+            steps.append(
+                (
+                    "projection",
+                    SparseRandomProjection(
+                        n_components=n_components, dense_output=True, random_state=seed
+                    ),
+                )
+            )
+        return Pipeline(steps=steps)
+
+    @classmethod
+    def __sparse_memmap(cls, raw_path: Path, indptr: ndarray, width: int) -> csr_matrix:
+        """Sparse rows whose values and columns are memory-mapped from their raw files."""
+        data, indices = (
+            memmap(path, dtype=dtype, mode="r")
+            if indptr[-1]
+            else empty(0, dtype=dtype)  # an empty file can't be mapped
+            for path, dtype in (
+                (raw_path.with_suffix(cls.DATA_SUFFIX), float32),
+                (raw_path.with_suffix(cls.INDICES_SUFFIX), int32),
+            )
+        )
+        return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, width), copy=False)
+
+    @classmethod
+    def fit_chunked(
+        cls,
+        preprocessor: Pipeline,
+        chunks: Callable[[], Iterable[DataFrame]],
+        path: str,
+        id_col: str = "id",
+    ) -> tuple[ndarray | csr_matrix, ndarray]:
+        """Fit and transform the features in a single pass over chunks.
+
+        The preprocessor learns nothing from the data, it is fitted on the first chunk for
+        the shape of its output. Only one chunk is held in memory: dense projected rows are
+        appended as raw float32 rows to ``path`` with the ``.f32`` suffix, and the values
+        and columns of sparse hashed rows to ``.data.f32`` and ``.indices.i32`` files, all
+        memory-mapped once written.
+
+        Args:
+            preprocessor: Preprocessor returned by ``get_preprocessor``.
+            chunks: Returns the feature chunks, called once.
+            path: File of the memory-mapped matrix of projected rows.
+            id_col: Column identifying the rows.
+
+        Returns:
+            The preprocessed matrix, sparse or dense, memory-mapped, and the id of each row.
+        """
+        raw_path: Path = Path(path).with_suffix(cls.RAW_SUFFIX)
+        paths: list[Path] = [
+            raw_path,
+            raw_path.with_suffix(cls.DATA_SUFFIX),
+            raw_path.with_suffix(cls.INDICES_SUFFIX),
+        ]
+        ids: list[ndarray] = []
+        indptr: list[ndarray] = [zeros(1, dtype=int64)]
+        width: int = 0
+        with (
+            paths[0].open("wb") as file,
+            paths[1].open("wb") as data,
+            paths[2].open("wb") as indices,
+        ):
+            for chunk in chunks():
+                if not ids:
+                    preprocessor.fit(chunk)
+                transformed: Any = preprocessor.transform(chunk)
+                width = transformed.shape[1]
+                if hasattr(transformed, "tocsr"):
+                    rows: csr_matrix = transformed.tocsr()
+                    data.write(asarray(rows.data, dtype=float32).tobytes())
+                    indices.write(asarray(rows.indices, dtype=int32).tobytes())
+                    indptr.append(rows.indptr[1:] + indptr[-1][-1])
+                else:
+                    file.write(asarray(transformed, dtype=float32, order="C").tobytes())
+                ids.append(chunk[id_col].to_numpy(dtype=int64))
+
+        sparse: bool = len(indptr) > 1
+        kept: list[Path] = paths[1:] if sparse else paths[:1] if ids else []
+        for unused in paths:
+            if unused not in kept:
+                unused.unlink()
+        if not ids:
+            raise ValueError(cls.ERR_NO_ROWS)
+
+        row_ids: ndarray = concatenate(ids)
+        if sparse:
+            return cls.__sparse_memmap(raw_path, concatenate(indptr), width), row_ids
+        return memmap(raw_path, dtype=float32, mode="r", shape=(len(row_ids), width)), row_ids
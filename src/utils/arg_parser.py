@@ -7,7 +7,33 @@ class PipelineArgs:
     pipeline_type: str
     load_type: str
     pages: int
+    popular_pages: int
+    max_age_days: int
+    request_budget: int
+    daemon: bool
+    interval: float
+    jitter: float
+    cycles: int | None
     api_token: str | None
+    base_url: str
+    snapshots: list[str] | None
+    raw_dir: str
+    executor: str
+    movie_ids: list[int] | None
+    features_file: str | None
+    top_k: int
+    kernel: str
+    models: list[str]
+    warm_cache_k: int
+    hot_ids: list[int] | None
+    keep_versions: int
+    version: str | None
+    precision: str
+    chunk_size: int | None
+    text_components: int | None
+    text_chunk_size: int
+    profile: str | None
+    profile_stage: str | None
 
 
 class ArgParser:
@@ -18,17 +44,77 @@ class ArgParser:
         parser.add_argument(
             "--pipeline",
             type=str,
-            choices=["feature", "train"],
+            choices=["feature", "backfill", "replay", "train", "inference", "evaluate", "rollback"],
             required=True,
-            help="Pipeline to execute (feature)",
+            help="Pipeline to execute (feature/backfill/replay/train/inference/evaluate/rollback)",
         )
 
         parser.add_argument(
             "--type",
             type=str,
-            choices=["initial", "incremental"],
+            choices=["initial", "incremental", "refresh", "popularity"],
             required=False,
-            help="Load type (initial/incremental) - Required for feature pipeline",
+            help=(
+                "Load type (initial/incremental/refresh/popularity) - Required for feature pipeline"
+            ),
+        )
+
+        parser.add_argument(
+            "--max-age-days",
+            type=int,
+            default=7,
+            help="Refresh movies extracted more than this many days ago (default: 7)",
+        )
+
+        parser.add_argument(
+            "--request-budget",
+            type=int,
+            default=500,
+            help="Maximum movies re-fetched by a refresh (default: 500)",
+        )
+
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Stay resident and run incremental feature loads on a schedule",
+        )
+
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=900,
+            help="Seconds between two daemon cycles (default: 900)",
+        )
+
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=0.1,
+            help="Fraction of the interval randomly added to or removed from each daemon wait "
+            "(default: 0.1)",
+        )
+
+        parser.add_argument(
+            "--cycles",
+            type=int,
+            required=False,
+            help="Daemon cycles run before exiting (default: run until SIGINT/SIGTERM)",
+        )
+
+        parser.add_argument(
+            "--snapshots",
+            type=str,
+            nargs="+",
+            required=False,
+            help="Parquet snapshots loaded by the backfill pipeline (default: data/01_raw)",
+        )
+
+        parser.add_argument(
+            "--raw-dir",
+            type=str,
+            default="data/01_raw/tmdb",
+            help="Landing zone of the raw API responses, written by the feature pipeline and "
+            "read by the replay pipeline (default: data/01_raw/tmdb)",
         )
 
         parser.add_argument(
@@ -38,6 +124,16 @@ class ArgParser:
             help="Number of pages to fetch (default: 400)",
         )
 
+        parser.add_argument(
+            "--popular-pages",
+            type=int,
+            default=5,
+            help=(
+                "Number of popular list pages to fetch, 20 movies each (default: 5). "
+                "Flagging the whole popular list takes up to 400 requests, e.g. --popular-pages 400"
+            ),
+        )
+
         parser.add_argument(
             "--api-token",
             type=str,
@@ -45,16 +141,184 @@ class ArgParser:
             help="TMDb API token - Required for feature pipeline",
         )
 
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            default="https://api.themoviedb.org/3",
+            help="TMDb API base URL, e.g. a local mock TMDb server (default: TMDb)",
+        )
+
+        parser.add_argument(
+            "--executor",
+            type=str,
+            choices=["sequential", "thread"],
+            default="sequential",
+            help="How the training steps are run (default: sequential)",
+        )
+
+        parser.add_argument(
+            "--warm-cache-k",
+            type=int,
+            default=50,
+            help="Recommendations precomputed per popular movie at train time, 0 disables "
+            "the warm cache (default: 50)",
+        )
+
+        parser.add_argument(
+            "--hot-ids",
+            type=int,
+            nargs="+",
+            required=False,
+            help="Movies precomputed at train time besides the popular ones",
+        )
+
+        parser.add_argument(
+            "--keep-versions",
+            type=int,
+            default=5,
+            help="Model versions kept in the registry after a train run (default: 5)",
+        )
+
+        parser.add_argument(
+            "--version",
+            type=str,
+            required=False,
+            help="Model version published by a rollback (default: the previous version)",
+        )
+
+        parser.add_argument(
+            "--movie-ids",
+            type=int,
+            nargs="+",
+            required=False,
+            help="Movies to recommend for, stored or ingested since the last training - "
+            "Required for inference pipeline unless --features-file is given",
+        )
+
+        parser.add_argument(
+            "--features-file",
+            type=str,
+            required=False,
+            help="JSON list of raw feature records of movies to recommend for, e.g. not yet "
+            "ingested, in the shape of the model required features",
+        )
+
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=10,
+            help="Number of recommendations per movie, and of text neighbours stored by the "
+            "train pipeline (default: 10)",
+        )
+
+        parser.add_argument(
+            "--kernel",
+            type=str,
+            choices=["cosine", "linear"],
+            default="cosine",
+            help="Similarity used by the inference pipeline (default: cosine)",
+        )
+
+        parser.add_argument(
+            "--models",
+            type=str,
+            nargs="+",
+            choices=["cosine", "linear", "euclidean", "text"],
+            default=["cosine", "linear", "euclidean"],
+            help="Models compared by the evaluate pipeline (default: all)",
+        )
+
+        parser.add_argument(
+            "--precision",
+            type=str,
+            choices=["float32", "float16", "int8"],
+            default="float32",
+            help=(
+                "Storage precision of the trained embeddings, similarity matrices and "
+                "neighbours are stored at full precision (default: float32)"
+            ),
+        )
+
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            required=False,
+            help="Preprocess the training features out of core, this many rows at a time",
+        )
+
+        parser.add_argument(
+            "--text-components",
+            type=int,
+            required=False,
+            help="Project the hashed overview and tagline on this many random components, "
+            "the text model uses the sparse hashed terms if not given",
+        )
+
+        parser.add_argument(
+            "--text-chunk-size",
+            type=int,
+            default=2_000,
+            help="Rows of overview and tagline preprocessed at a time, and of neighbours "
+            "scored at once, by the text model, always out of core (default: 2000)",
+        )
+
+        parser.add_argument(
+            "--profile",
+            type=str,
+            choices=["cprofile", "sampling", "tracemalloc"],
+            required=False,
+            help="Profile the run, results are written to data/08_reporting/profiles",
+        )
+
+        parser.add_argument(
+            "--profile-stage",
+            type=str,
+            required=False,
+            help="Only profile this stage, e.g. fit or fetch_movie_extended_info",
+        )
+
         args: Namespace = parser.parse_args()
         if args.pipeline == "feature":
             if not args.type:
                 parser.error("--type is required when pipeline is 'feature'")
             if not args.api_token:
                 parser.error("--api-token is required when pipeline is 'feature'")
+        if args.daemon and (args.pipeline != "feature" or args.type != "incremental"):
+            parser.error("--daemon requires --pipeline feature --type incremental")
+        if args.pipeline == "inference" and not (args.movie_ids or args.features_file):
+            parser.error("--movie-ids or --features-file is required when pipeline is 'inference'")
+        if args.profile_stage and not args.profile:
+            parser.error("--profile is required when --profile-stage is given")
 
         return PipelineArgs(
             pipeline_type=args.pipeline,
             load_type=args.type,
             pages=args.pages,
+            popular_pages=args.popular_pages,
+            max_age_days=args.max_age_days,
+            request_budget=args.request_budget,
+            daemon=args.daemon,
+            interval=args.interval,
+            jitter=args.jitter,
+            cycles=args.cycles,
             api_token=args.api_token,
+            base_url=args.base_url,
+            snapshots=args.snapshots,
+            raw_dir=args.raw_dir,
+            executor=args.executor,
+            movie_ids=args.movie_ids,
+            features_file=args.features_file,
+            top_k=args.top_k,
+            kernel=args.kernel,
+            models=args.models,
+            warm_cache_k=args.warm_cache_k,
+            hot_ids=args.hot_ids,
+            keep_versions=args.keep_versions,
+            version=args.version,
+            precision=args.precision,
+            chunk_size=args.chunk_size,
+            text_components=args.text_components,
+            text_chunk_size=args.text_chunk_size,
+            profile=args.profile,
+            profile_stage=args.profile_stage,
         )
@@ -0,0 +1,129 @@
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable, Iterator
+from threading import Lock
+from typing import Any, ClassVar
+
+from pandas import DataFrame
+
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.telemetry import telemetry
+
+
+class CachedFeatureStore(FeatureStoreInterface):
+    """Feature store with a bounded LRU cache of the rows read by id.
+
+    Point lookups are answered from the cache and only the missing ids are read from
+    the wrapped store, in a single lookup. Rows are cached per feature group and
+    requested columns. Every write of a feature group through this store drops its
+    cached rows, so lookups never return features older than the last write.
+
+    Attributes:
+        feature_store: Wrapped feature store.
+        max_rows: Maximum cached rows, the least recently used are evicted first.
+    """
+
+    ERR_INVALID_SIZE: ClassVar[str] = "Cache size must be positive, got {}"
+
+    def __init__(self, feature_store: FeatureStoreInterface, max_rows: int = 10_000):
+        if max_rows < 1:
+            raise ValueError(self.ERR_INVALID_SIZE.format(max_rows))
+
+        self.feature_store = feature_store
+        self.max_rows = max_rows
+        self.__rows: OrderedDict[tuple[str, tuple[str, ...] | None, int], dict[str, Any]] = (
+            OrderedDict()
+        )
+        # bumped on every write, rows read before a write are not cached after it
+        self.__generations: defaultdict[str, int] = defaultdict(int)
+        self.__lock: Lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def invalidate(self, feature_group: str) -> None:
+        """Drop the cached rows of a feature group."""
+        with self.__lock:
+            self.__generations[feature_group] += 1
+            for key in [key for key in self.__rows if key[0] == feature_group]:
+                del self.__rows[key]
+
+    def insert(self, feature_group: str, features: DataFrame, mode: str = "append") -> None:
+        self.feature_store.insert(feature_group, features, mode)
+        self.invalidate(feature_group)
+
+    def fetch_existing_movie_ids(self, feature_group: str) -> set:
+        return self.feature_store.fetch_existing_movie_ids(feature_group)
+
+    def fetch_watermark(self, feature_group: str, name: str) -> str | None:
+        return self.feature_store.fetch_watermark(feature_group, name)
+
+    def store_watermark(self, feature_group: str, name: str, value: str) -> None:
+        self.feature_store.store_watermark(feature_group, name, value)
+
+    def query_features(
+        self, feature_group: str, columns: list[str] | None = None, as_of: str | None = None
+    ) -> DataFrame:
+        return self.feature_store.query_features(feature_group, columns, as_of)
+
+    def iter_features(
+        self, feature_group: str, columns: list[str] | None = None, chunk_size: int = 50_000
+    ) -> Iterator[DataFrame]:
+        return self.feature_store.iter_features(feature_group, columns, chunk_size)
+
+    def fetch_stale_movie_ids(
+        self, feature_group: str, extracted_before: str, limit: int
+    ) -> list[int]:
+        return self.feature_store.fetch_stale_movie_ids(feature_group, extracted_before, limit)
+
+    def store_refresh_attempts(self, feature_group: str, ids: list[int], attempted_on: str) -> None:
+        self.feature_store.store_refresh_attempts(feature_group, ids, attempted_on)
+
+    def update_features(self, feature_group: str, features: DataFrame, key: str = "id") -> int:
+        updated: int = self.feature_store.update_features(feature_group, features, key)
+        self.invalidate(feature_group)
+        return updated
+
+    def update_popular_movies(self, feature_group: str, popular_ids: set[int]) -> int:
+        updated: int = self.feature_store.update_popular_movies(feature_group, popular_ids)
+        self.invalidate(feature_group)
+        return updated
+
+    def get_features_by_ids(
+        self, feature_group: str, ids: Iterable[int], columns: list[str] | None = None
+    ) -> DataFrame:
+        keys: list[int] = list(dict.fromkeys(int(i) for i in ids))
+        selection: tuple[str, ...] | None = tuple(columns) if columns else None
+
+        found: dict[int, dict[str, Any]] = {}
+        with self.__lock:
+            generation: int = self.__generations[feature_group]
+            for movie_id in keys:
+                row: dict[str, Any] | None = self.__rows.get((feature_group, selection, movie_id))
+                if row is not None:
+                    self.__rows.move_to_end((feature_group, selection, movie_id))
+                    found[movie_id] = row
+
+        missing: list[int] = [movie_id for movie_id in keys if movie_id not in found]
+        telemetry.count("feature_store_cache_hits_total", len(found), feature_group=feature_group)
+        telemetry.count(
+            "feature_store_cache_misses_total", len(missing), feature_group=feature_group
+        )
+        fetched: DataFrame | None = None
+        if missing:
+            fetched = self.feature_store.get_features_by_ids(feature_group, missing, columns)
+            rows: list[dict[str, Any]] = fetched.to_dict(orient="records")
+            with self.__lock:
+                cache: bool = generation == self.__generations[feature_group]
+                for row in rows:
+                    found[int(row["id"])] = row
+                    if cache:
+                        self.__rows[(feature_group, selection, int(row["id"]))] = row
+                while len(self.__rows) > self.max_rows:
+                    self.__rows.popitem(last=False)
+
+        if not found and fetched is not None:
+            return fetched
+        return DataFrame(
+            [found[movie_id] for movie_id in keys if movie_id in found],
+            columns=["id", *(column for column in columns if column != "id")] if columns else None,
+        )
@@ -0,0 +1,596 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from os import replace
+from pathlib import Path
+from secrets import token_hex
+from shutil import rmtree
+from typing import Any, ClassVar
+
+from joblib import dump as joblib_dump
+from joblib import hash as joblib_hash
+from joblib import load as joblib_load
+from loguru import logger
+from numpy import abs as np_abs
+from numpy import (
+    arange,
+    argpartition,
+    argsort,
+    array,
+    asarray,
+    empty,
+    float16,
+    float32,
+    inf,
+    int8,
+    int64,
+    isin,
+    load,
+    memmap,
+    ndarray,
+    rint,
+    save,
+    savez,
+    searchsorted,
+    sqrt,
+    take_along_axis,
+    unique,
+    where,
+    zeros,
+)
+from numpy import sum as np_sum
+from numpy.lib.format import open_memmap
+from numpy.random import default_rng
+
+
+def top_k_columns(scores: ndarray, k: int) -> tuple[ndarray, ndarray]:
+    """Columns of the ``k`` best scores of each row and the scores, best first."""
+    best: ndarray = argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores: ndarray = take_along_axis(scores, best, axis=1)
+    order: ndarray = argsort(-best_scores, axis=1, kind="stable")
+    return take_along_axis(best, order, axis=1), take_along_axis(best_scores, order, axis=1)
+
+
+@dataclass
+class Embeddings:
+    """Pre-normalized embedding matrix of a preprocessing configuration.
+
+    Rows are stored with unit norm next to their original norms, so every supported
+    kernel is a single matrix product against ``vectors``:
+
+    - cosine: ``q̂ · v̂``
+    - linear: ``(q̂ · v̂) * |q| * |v|``, the dot product of the raw features
+
+    Rows can be quantized to float16, or to int8 with a scale factor per row, to cut
+    the artifact size and serving memory by 2-4x. Quantized rows are dequantized on
+    demand, one block of rows at a time when scoring.
+
+    Attributes:
+        ids: Movie id of each row.
+        vectors: Unit-norm rows, float32 or quantized (float16/int8).
+        norms: Norm of each row before normalization.
+        scales: Scale factor of each int8 row, None for float rows.
+    """
+
+    ERR_INVALID_KERNEL: ClassVar[str] = "Invalid kernel: {}. Must be one of: {}"
+    ERR_UNKNOWN_IDS: ClassVar[str] = "Movie ids not found in embeddings: {}"
+    ERR_INVALID_PRECISION: ClassVar[str] = "Invalid precision: {}. Must be one of: {}"
+    ERR_INVALID_WIDTH: ClassVar[str] = "Feature rows have {} columns, the embeddings {}"
+
+    KERNELS: ClassVar[list[str]] = ["cosine", "linear"]
+    PRECISIONS: ClassVar[list[str]] = ["float32", "float16", "int8"]
+    INT8_MAX: ClassVar[int] = 127
+    BLOCK_ROWS: ClassVar[int] = 65_536  # rows dequantized at once when scoring
+    NORMALIZE_BLOCK_BYTES: ClassVar[int] = 2**25  # float32 rows normalized at once to a file
+
+    ids: ndarray
+    vectors: ndarray
+    norms: ndarray
+    scales: ndarray | None = None
+
+    @classmethod
+    def normalize(cls, features: Any, path: str | None = None) -> tuple[ndarray, ndarray]:
+        """Split a feature matrix (dense or sparse) into unit-norm float32 rows and norms.
+
+        With a ``path``, the rows are normalized a block at a time into a memory-mapped
+        ``.npy`` file, so a memory-mapped or sparse input is never held in memory at once.
+        """
+        if path is not None:
+            rows, width = features.shape
+            mapped: memmap = open_memmap(path, mode="w+", dtype=float32, shape=(rows, width))
+            mapped_norms: ndarray = empty(rows, dtype=float32)
+            block: int = max(1, cls.NORMALIZE_BLOCK_BYTES // max(1, width * mapped.itemsize))
+            for start in range(0, rows, block):
+                end: int = start + block
+                mapped[start:end], mapped_norms[start:end] = cls.normalize(features[start:end])
+            mapped.flush()
+            return mapped, mapped_norms
+
+        # always a new array, the input may be shared read-only between models
+        vectors: ndarray = array(
+            features.toarray() if hasattr(features, "toarray") else features, dtype=float32
+        )
+        norms: ndarray = sqrt(np_sum(vectors * vectors, axis=1))
+        vectors /= where(norms == 0, 1, norms)[:, None]  # zero rows score 0, as in sklearn
+        return vectors, norms
+
+    @classmethod
+    def from_features(cls, ids: Any, features: Any, path: str | None = None) -> "Embeddings":
+        """Embeddings of a feature matrix, memory-mapped from ``path`` if given."""
+        vectors, norms = cls.normalize(features, path)
+        return cls(ids=asarray(ids, dtype=int64), vectors=vectors, norms=norms)
+
+    @property
+    def precision(self) -> str:
+        return str(self.vectors.dtype)
+
+    def fingerprint(self) -> str:
+        """Hash of the stored content, changes whenever the embeddings are retrained."""
+        # plain arrays, joblib hashes memory-mapped arrays apart from in-memory ones
+        return str(
+            joblib_hash(
+                [
+                    None if values is None else asarray(values)
+                    for values in (self.ids, self.vectors, self.norms, self.scales)
+                ]
+            )
+        )
+
+    def dense(self, rows: Any = slice(None)) -> ndarray:
+        """Unit-norm float32 rows, dequantized if stored quantized."""
+        vectors: ndarray = asarray(self.vectors[rows], dtype=float32)
+        if self.scales is not None and self.vectors.dtype == int8:
+            vectors = vectors * self.scales[rows, None]
+        return vectors
+
+    def quantize(self, precision: str) -> "Embeddings":
+        """Embeddings with the rows stored in ``precision``, float32 to dequantize them.
+
+        int8 rows are scaled by their largest absolute value, so each row uses the whole
+        int8 range whatever its sparsity.
+        """
+        if precision not in self.PRECISIONS:
+            raise ValueError(
+                self.ERR_INVALID_PRECISION.format(precision, ", ".join(self.PRECISIONS))
+            )
+
+        vectors: ndarray = self.dense()
+        if precision != "int8":
+            return Embeddings(
+                ids=self.ids,
+                vectors=vectors.astype(float16 if precision == "float16" else float32),
+                norms=self.norms,
+            )
+
+        scales: ndarray = np_abs(vectors).max(axis=1, initial=0) / self.INT8_MAX
+        scales[scales == 0] = 1  # zero rows stay zero
+        return Embeddings(
+            ids=self.ids,
+            vectors=rint(vectors / scales[:, None]).astype(int8),
+            norms=self.norms,
+            scales=scales.astype(float32),
+        )
+
+    def top_k_drift(
+        self,
+        reference: "Embeddings",
+        k: int = 10,
+        kernel: str = "cosine",
+        sample: int = 1000,
+        seed: int = 42,
+    ) -> dict[str, float]:
+        """How far the top ``k`` neighbours drift from a reference, e.g. full precision.
+
+        Args:
+            reference: Embeddings of the same movies to compare with.
+            k: Number of neighbours per movie.
+            kernel: Similarity to compute (cosine/linear).
+            sample: Movies compared, sampled at random.
+            seed: Seed of the sample.
+
+        Returns:
+            Share of the reference neighbours found (``recall_at_k``) and share of the
+            movies with the very same neighbours in the same order (``exact_order``).
+        """
+        movie_ids: ndarray = default_rng(seed).choice(
+            reference.ids, size=min(sample, len(reference.ids)), replace=False
+        )
+        neighbours, _ = self.top_k(movie_ids, k=k, kernel=kernel)
+        expected, _ = reference.top_k(movie_ids, k=k, kernel=kernel)
+        if neighbours.size == 0:
+            return {"recall_at_k": 1.0, "exact_order": 1.0}
+
+        found: ndarray = (neighbours[:, :, None] == expected[:, None, :]).any(axis=2)
+        return {
+            "recall_at_k": float(found.mean()),
+            "exact_order": float((neighbours == expected).all(axis=1).mean()),
+        }
+
+    def lookup(self, movie_ids: Any) -> tuple[ndarray, ndarray]:
+        """Position of each movie id in the matrix and whether the movie is stored."""
+        ids: ndarray = asarray(movie_ids, dtype=int64)
+        if len(self.ids) == 0:
+            return zeros(len(ids), dtype=int64), zeros(len(ids), dtype=bool)
+
+        order: ndarray = argsort(self.ids)
+        positions: ndarray = searchsorted(self.ids, ids, sorter=order).clip(max=len(order) - 1)
+        rows: ndarray = order[positions]
+        return rows, self.ids[rows] == ids
+
+    def rows(self, movie_ids: Any) -> ndarray:
+        """Position of each movie id in the matrix."""
+        rows, found = self.lookup(movie_ids)
+        if not found.all():
+            missing: ndarray = asarray(movie_ids, dtype=int64)[~found]
+            raise KeyError(self.ERR_UNKNOWN_IDS.format(missing.tolist()))
+        return rows
+
+    def score(self, vectors: ndarray, norms: ndarray, kernel: str = "cosine") -> ndarray:
+        """Score unit-norm query rows against every row with a single matrix product.
+
+        Args:
+            vectors: Unit-norm query rows, one per query.
+            norms: Norm of each query row.
+            kernel: Similarity to compute (cosine/linear).
+
+        Returns:
+            ndarray: Queries x movies similarity scores.
+        """
+        if kernel not in self.KERNELS:
+            raise ValueError(self.ERR_INVALID_KERNEL.format(kernel, ", ".join(self.KERNELS)))
+
+        if self.precision == "float32":
+            scores: ndarray = vectors @ self.vectors.T
+        else:
+            scores = empty((len(vectors), len(self.ids)), dtype=float32)
+            for start in range(0, len(self.ids), self.BLOCK_ROWS):
+                block: slice = slice(start, start + self.BLOCK_ROWS)
+                scores[:, block] = vectors @ self.dense(block).T
+        if kernel == "linear":
+            scores *= norms[:, None] * self.norms[None, :]
+        return scores
+
+    def top_k(
+        self,
+        movie_ids: Any,
+        k: int = 10,
+        kernel: str = "cosine",
+        batch_size: int = 1024,
+    ) -> tuple[ndarray, ndarray]:
+        """Most similar movies to each of the given stored movies, excluding themselves.
+
+        Args:
+            movie_ids: Movies to recommend for.
+            k: Number of neighbours per movie.
+            kernel: Similarity to compute (cosine/linear).
+            batch_size: Queries scored per matrix product, bounds the memory used.
+
+        Returns:
+            The neighbour ids and their scores, queries x k, best first.
+        """
+        rows: ndarray = self.rows(movie_ids)
+        k = max(0, min(k, len(self.ids) - 1))
+        neighbours: ndarray = empty((len(rows), k), dtype=int64)
+        scores: ndarray = empty((len(rows), k), dtype=float32)
+        if k == 0:
+            return neighbours, scores
+
+        for start in range(0, len(rows), batch_size):
+            batch: ndarray = rows[start : start + batch_size]
+            batch_scores: ndarray = self.score(self.dense(batch), self.norms[batch], kernel)
+            batch_scores[arange(len(batch)), batch] = -inf  # a movie is not its own neighbour
+            block: slice = slice(start, start + len(batch))
+            self.__best(batch_scores, neighbours[block], scores[block])
+        return neighbours, scores
+
+    def top_k_features(
+        self,
+        features: Any,
+        k: int = 10,
+        kernel: str = "cosine",
+        movie_ids: Any = None,
+        batch_size: int = 1024,
+    ) -> tuple[ndarray, ndarray]:
+        """Most similar stored movies to preprocessed feature rows, stored or not.
+
+        Rows are normalized as the embeddings were, so a movie not in the embeddings,
+        e.g. ingested since the last training, is scored like the stored ones.
+
+        Args:
+            features: Feature rows (dense or sparse), preprocessed as the embeddings were.
+            k: Number of neighbours per row.
+            kernel: Similarity to compute (cosine/linear).
+            movie_ids: Movie id of each row, excluded from its own neighbours if stored.
+            batch_size: Rows scored per matrix product, bounds the memory used.
+
+        Returns:
+            The neighbour ids and their scores, rows x k, best first.
+        """
+        vectors, norms = self.normalize(features)
+        if vectors.shape[1] != self.vectors.shape[1]:
+            raise ValueError(self.ERR_INVALID_WIDTH.format(vectors.shape[1], self.vectors.shape[1]))
+
+        rows, stored = (
+            self.lookup(movie_ids)
+            if movie_ids is not None
+            else (zeros(len(vectors), dtype=int64), zeros(len(vectors), dtype=bool))
+        )
+        k = max(0, min(k, len(self.ids) - int(stored.any())))
+        neighbours: ndarray = empty((len(vectors), k), dtype=int64)
+        scores: ndarray = empty((len(vectors), k), dtype=float32)
+        if k == 0:
+            return neighbours, scores
+
+        for start in range(0, len(vectors), batch_size):
+            batch: slice = slice(start, start + batch_size)
+            batch_scores: ndarray = self.score(vectors[batch], norms[batch], kernel)
+            own: ndarray = stored[batch].nonzero()[0]
+            batch_scores[own, rows[batch][own]] = -inf  # a movie is not its own neighbour
+            self.__best(batch_scores, neighbours[batch], scores[batch])
+        return neighbours, scores
+
+    def __best(self, batch_scores: ndarray, neighbours: ndarray, scores: ndarray) -> None:
+        """Write the best scored movies of each query, as many as ``neighbours`` columns."""
+        best, scores[:] = top_k_columns(batch_scores, neighbours.shape[1])
+        neighbours[:] = self.ids[best]
+
+
+@dataclass
+class RecommendationCache:
+    """Top-k recommendations precomputed for the most requested movies.
+
+    Built at train time from the stored embeddings and tagged with their fingerprint,
+    so it is only served with the very embeddings it was computed from.
+
+    Attributes:
+        fingerprint: Fingerprint of the embeddings the cache was computed from.
+        kernel: Similarity the recommendations were scored with.
+        ids: Cached movie ids, sorted.
+        neighbours: Neighbour ids of each cached movie, best first.
+        scores: Score of each neighbour.
+    """
+
+    fingerprint: str
+    kernel: str
+    ids: ndarray
+    neighbours: ndarray
+    scores: ndarray
+
+    @classmethod
+    def build(
+        cls, embeddings: Embeddings, movie_ids: Any, k: int, kernel: str = "cosine"
+    ) -> "RecommendationCache":
+        """Precompute the top ``k`` recommendations of the movies found in the embeddings."""
+        ids: ndarray = unique(asarray(movie_ids, dtype=int64))
+        ids = ids[isin(ids, embeddings.ids)]
+        neighbours, scores = embeddings.top_k(ids, k=k, kernel=kernel)
+        return cls(
+            fingerprint=embeddings.fingerprint(),
+            kernel=kernel,
+            ids=ids,
+            neighbours=neighbours,
+            scores=scores,
+        )
+
+    @property
+    def k(self) -> int:
+        return int(self.neighbours.shape[1])
+
+    def lookup(self, movie_ids: Any) -> tuple[ndarray, ndarray]:
+        """Row of each movie in the cache and whether the movie is cached."""
+        ids: ndarray = asarray(movie_ids, dtype=int64)
+        if len(self.ids) == 0:
+            return zeros(len(ids), dtype=int64), zeros(len(ids), dtype=bool)
+
+        rows: ndarray = searchsorted(self.ids, ids).clip(max=len(self.ids) - 1)
+        return rows, self.ids[rows] == ids
+
+
+@dataclass
+class FittedPreprocessor:
+    """Transformation pipeline the embeddings were computed with, fitted at train time.
+
+    Stored next to the embeddings and tagged with their fingerprint, so raw features of
+    movies not in the embeddings are preprocessed exactly as the stored rows were.
+
+    Attributes:
+        fingerprint: Fingerprint of the embeddings computed with the pipeline.
+        columns: Raw feature columns read by the pipeline, the model required features.
+        pipeline: Fitted transformation pipeline.
+    """
+
+    ERR_MISSING_COLUMNS: ClassVar[str] = "Feature records are missing the columns: {}"
+
+    fingerprint: str
+    columns: list[str]
+    pipeline: Any
+
+    def transform(self, features: Any) -> Any:
+        """Preprocess raw feature records, a frame holding at least ``columns``."""
+        missing: list[str] = [col for col in self.columns if col not in features.columns]
+        if missing:
+            raise ValueError(self.ERR_MISSING_COLUMNS.format(missing))
+        return self.pipeline.transform(features[self.columns])
+
+
+class EmbeddingStore:
+    """Stores embedding matrices as ``.npy`` files, one directory per embedding group.
+
+    Each save writes a new version directory of the group, then makes it current by
+    replacing a pointer file, so readers see either the previous or the new set of
+    files, never a mix of both. The warm cache and preprocessor are written into the
+    current version, each file moved into place once complete. The version each save
+    replaced is kept for readers still opening its files, older ones are deleted.
+
+    Layout::
+
+        <root>/<group>/CURRENT              current version id
+        <root>/<group>/<version>/           embeddings, fingerprint, cache, preprocessor
+
+    Attributes:
+        root: Directory holding the embedding groups.
+    """
+
+    ERR_MISSING_GROUP: ClassVar[str] = "Embedding group name must be provided"
+    ERR_GROUP_NOT_EXISTS: ClassVar[str] = "Embedding group {} does not exist in {}"
+
+    FILES: ClassVar[tuple[str, ...]] = ("ids", "vectors", "norms")
+    OPTIONAL_FILES: ClassVar[tuple[str, ...]] = ("scales",)
+    FINGERPRINT_FILE: ClassVar[str] = "fingerprint.txt"
+    CACHE_FILE: ClassVar[str] = "warm_cache_{}.npz"
+    PREPROCESSOR_FILE: ClassVar[str] = "preprocessor.joblib"
+    POINTER_FILE: ClassVar[str] = "CURRENT"
+    STAGING_PREFIX: ClassVar[str] = "."
+    VERSION_FORMAT: ClassVar[str] = "%Y%m%dT%H%M%S%f"  # sortable, saves may share a second
+
+    def __init__(self, root: str = r"data/06_models/embeddings"):
+        self.root = Path(root)
+
+    def __path(self, embedding_group: str) -> Path:
+        """Directory of the current version, the group itself if saved before versioning."""
+        path: Path = self.root / embedding_group
+        pointer: Path = path / self.POINTER_FILE
+        return path / pointer.read_text().strip() if pointer.exists() else path
+
+    @classmethod
+    def __write(cls, path: Path, write: Callable[[Path], Any]) -> None:
+        """Write a file next to ``path`` and move it over, readers see all of it or none."""
+        temporary: Path = path.with_name(f"{cls.STAGING_PREFIX}{path.name}.tmp")
+        try:
+            write(temporary)
+            replace(temporary, path)
+        finally:
+            temporary.unlink(missing_ok=True)
+
+    def __prune(self, embedding_group: str, keep: set[str]) -> None:
+        """Delete the versions of the group but ``keep``, staged saves left to their writer."""
+        for path in (self.root / embedding_group).iterdir():
+            if (
+                path.is_dir()
+                and path.name not in keep
+                and not path.name.startswith(self.STAGING_PREFIX)
+            ):
+                rmtree(path, ignore_errors=True)
+
+    def save(self, embedding_group: str, embeddings: Embeddings) -> str:
+        """Store an embedding group as a new version, made current once complete.
+
+        Returns:
+            str: Fingerprint of the stored embeddings.
+        """
+        if not embedding_group:
+            raise ValueError(self.ERR_MISSING_GROUP)
+
+        logger.info(
+            f"Storing {embeddings.vectors.shape} embeddings in {embedding_group} embedding group"
+        )
+        path: Path = self.root / embedding_group
+        path.mkdir(parents=True, exist_ok=True)
+        previous: Path = self.__path(embedding_group)
+        version: str = f"{datetime.now().strftime(self.VERSION_FORMAT)}-{token_hex(3)}"
+        staging: Path = path / f"{self.STAGING_PREFIX}{version}"
+        staging.mkdir()
+        try:
+            for name in (*self.FILES, *self.OPTIONAL_FILES):
+                if getattr(embeddings, name) is not None:
+                    save(staging / f"{name}.npy", getattr(embeddings, name))
+            fingerprint: str = embeddings.fingerprint()
+            (staging / self.FINGERPRINT_FILE).write_text(fingerprint)
+            staging.rename(path / version)
+        except BaseException:
+            rmtree(staging, ignore_errors=True)
+            raise
+
+        self.__write(path / self.POINTER_FILE, lambda temporary: temporary.write_text(version))
+        self.__prune(embedding_group, keep={version, previous.name})
+        return fingerprint
+
+    def fingerprint(self, embedding_group: str) -> str | None:
+        """Fingerprint of the stored embedding group, None if stored without one."""
+        path: Path = self.__path(embedding_group) / self.FINGERPRINT_FILE
+        return path.read_text() if path.exists() else None
+
+    def save_cache(self, embedding_group: str, cache: RecommendationCache) -> None:
+        logger.info(
+            f"Storing {cache.neighbours.shape} {cache.kernel} warm recommendations "
+            f"in {embedding_group} embedding group"
+        )
+
+        def write(path: Path) -> None:
+            with path.open("wb") as file:
+                savez(
+                    file,
+                    fingerprint=array(cache.fingerprint),
+                    ids=cache.ids,
+                    neighbours=cache.neighbours,
+                    scores=cache.scores,
+                )
+
+        self.__write(self.__path(embedding_group) / self.CACHE_FILE.format(cache.kernel), write)
+
+    def load_cache(self, embedding_group: str, kernel: str) -> RecommendationCache | None:
+        """Warm recommendations of the embedding group, read at once.
+
+        Returns:
+            The cache, or None if there is none or it was computed from other embeddings.
+        """
+        path: Path = self.__path(embedding_group) / self.CACHE_FILE.format(kernel)
+        if not path.exists():
+            return None
+
+        with load(path) as arrays:
+            cache: RecommendationCache = RecommendationCache(
+                fingerprint=str(arrays["fingerprint"]),
+                kernel=kernel,
+                ids=arrays["ids"],
+                neighbours=arrays["neighbours"],
+                scores=arrays["scores"],
+            )
+        if cache.fingerprint != self.fingerprint(embedding_group):
+            logger.warning(f"Ignoring stale {kernel} warm recommendations of {embedding_group}")
+            return None
+
+        logger.info(f"Loaded {len(cache.ids)} {kernel} warm recommendations of {embedding_group}")
+        return cache
+
+    def save_preprocessor(self, embedding_group: str, preprocessor: FittedPreprocessor) -> None:
+        logger.info(f"Storing the fitted preprocessor in {embedding_group} embedding group")
+        path: Path = self.__path(embedding_group) / self.PREPROCESSOR_FILE
+        try:
+            self.__write(path, lambda temporary: joblib_dump(preprocessor, temporary))
+        except Exception:
+            path.unlink(missing_ok=True)  # never leave a previous preprocessor
+            raise
+
+    def load_preprocessor(self, embedding_group: str) -> FittedPreprocessor | None:
+        """Fitted preprocessor of the embedding group.
+
+        Returns:
+            The preprocessor, or None if there is none or it fitted other embeddings.
+        """
+        path: Path = self.__path(embedding_group) / self.PREPROCESSOR_FILE
+        if not path.exists():
+            return None
+
+        preprocessor: FittedPreprocessor = joblib_load(path)
+        if preprocessor.fingerprint != self.fingerprint(embedding_group):
+            logger.warning(f"Ignoring stale preprocessor of {embedding_group}")
+            return None
+        return preprocessor
+
+    def load(self, embedding_group: str, mmap: bool = True) -> Embeddings:
+        """Load an embedding group, memory-mapped by default so serving shares the pages."""
+        if not embedding_group:
+            raise ValueError(self.ERR_MISSING_GROUP)
+
+        path: Path = self.__path(embedding_group)
+        if not path.exists():
+            raise FileNotFoundError(self.ERR_GROUP_NOT_EXISTS.format(embedding_group, self.root))
+
+        logger.info(f"Loading embeddings from {embedding_group} embedding group")
+        arrays: dict[str, ndarray] = {
+            name: load(path / f"{name}.npy", mmap_mode="r" if mmap else None) for name in self.FILES
+        }
+        if arrays["vectors"].dtype == int8:  # only int8 rows are scaled
+            arrays["scales"] = load(path / "scales.npy", mmap_mode="r" if mmap else None)
+        return Embeddings(**arrays)
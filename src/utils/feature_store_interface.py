@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
 
 from pandas import DataFrame
 
@@ -27,4 +28,109 @@ class FeatureStoreInterface(ABC):
         ...
 
     @abstractmethod
-    def query_features(self, feature_group: str, columns: list[str] | None = None) -> DataFrame: ...
+    def fetch_watermark(self, feature_group: str, name: str) -> str | None:
+        """Last value stored of a watermark of a feature group, None if never stored.
+
+        Args:
+            feature_group: Name of the feature group/table
+            name: Name of the watermark, e.g. the column it tracks
+        """
+        ...
+
+    @abstractmethod
+    def store_watermark(self, feature_group: str, name: str, value: str) -> None:
+        """Store the value of a watermark of a feature group, replacing the previous one.
+
+        Args:
+            feature_group: Name of the feature group/table
+            name: Name of the watermark, e.g. the column it tracks
+            value: Watermark value
+        """
+        ...
+
+    @abstractmethod
+    def query_features(
+        self, feature_group: str, columns: list[str] | None = None, as_of: str | None = None
+    ) -> DataFrame:
+        """Read the current features of a feature group, one row per movie.
+
+        Args:
+            feature_group: Name of the feature group/table
+            columns: Columns to read, all of them if None
+            as_of: Read the features as they were on this extraction date (YYYY-MM-DD)
+        """
+        ...
+
+    @abstractmethod
+    def iter_features(
+        self, feature_group: str, columns: list[str] | None = None, chunk_size: int = 50_000
+    ) -> Iterator[DataFrame]:
+        """Read the current features of a feature group in chunks, always in the same order.
+
+        Args:
+            feature_group: Name of the feature group/table
+            columns: Columns to read, all of them if None
+            chunk_size: Maximum rows per chunk
+        """
+        ...
+
+    @abstractmethod
+    def fetch_stale_movie_ids(
+        self, feature_group: str, extracted_before: str, limit: int
+    ) -> list[int]:
+        """Ids of the movies extracted before a date, popular and most popular first.
+
+        Movies whose last refresh was attempted on or after that date are skipped, so a
+        movie failing to refresh waits as long as a refreshed one.
+
+        Args:
+            feature_group: Name of the feature group/table
+            extracted_before: Extraction date (YYYY-MM-DD) from which movies are fresh
+            limit: Maximum number of ids returned
+        """
+        ...
+
+    @abstractmethod
+    def store_refresh_attempts(self, feature_group: str, ids: list[int], attempted_on: str) -> None:
+        """Record the movies a refresh requested, whether they were fetched or not.
+
+        Args:
+            feature_group: Name of the feature group/table
+            ids: Ids of the requested movies
+            attempted_on: Date (YYYY-MM-DD) of the refresh
+        """
+        ...
+
+    @abstractmethod
+    def update_features(self, feature_group: str, features: DataFrame, key: str = "id") -> int:
+        """Update the given columns of the stored rows matching the features key.
+
+        Args:
+            feature_group: Name of the feature group/table
+            features: DataFrame with the key and the columns to update
+            key: Column identifying a row
+        """
+        ...
+
+    @abstractmethod
+    def update_popular_movies(self, feature_group: str, popular_ids: set[int]) -> int:
+        """Flag the stored movies in ``popular_ids`` as popular and every other one as not.
+
+        Args:
+            feature_group: Name of the feature group/table
+            popular_ids: Ids of the currently popular movies
+        """
+        ...
+
+    @abstractmethod
+    def get_features_by_ids(
+        self, feature_group: str, ids: Iterable[int], columns: list[str] | None = None
+    ) -> DataFrame:
+        """Read the current features of the given movies only.
+
+        Args:
+            feature_group: Name of the feature group/table
+            ids: Movie ids to read, unknown ids are skipped
+            columns: Columns to read besides the id, all of them if None
+        """
+        ...
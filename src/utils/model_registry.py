@@ -0,0 +1,233 @@
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from json import dumps, loads
+from os import replace
+from pathlib import Path
+from secrets import token_hex
+from shutil import rmtree
+from threading import Event, Thread
+from typing import Any, ClassVar
+
+from loguru import logger
+
+from src.utils.embedding_store import EmbeddingStore
+
+
+@dataclass
+class ModelVersion:
+    """A model version being written, published once complete.
+
+    Attributes:
+        version: Version id, ordered by creation time.
+        path: Directory of the version artifacts.
+        manifest: Description of the version, written next to its artifacts.
+    """
+
+    version: str
+    path: Path
+    manifest: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def embedding_store(self) -> EmbeddingStore:
+        return EmbeddingStore(str(self.path))
+
+
+class ModelRegistry:
+    """Immutable, versioned model artifacts with an atomically updated current version.
+
+    Each version is written to a staging directory and renamed into ``versions/`` once
+    complete, so a version directory is never seen half written nor changed afterwards.
+    The current version is a pointer file replaced atomically: readers see either the
+    previous or the new version, and rolling back is publishing an older one. After each
+    publish, the oldest versions beyond ``keep`` are deleted, never the current one.
+
+    Layout::
+
+        <root>/CURRENT                      current version id
+        <root>/versions/<version>/          artifacts and manifest.json
+
+    Attributes:
+        root: Directory of the registry.
+        keep: Number of most recent versions kept.
+    """
+
+    ERR_INVALID_KEEP: ClassVar[str] = "Registry must keep at least one version, got {}"
+    ERR_VERSION_NOT_FOUND: ClassVar[str] = "Model version {} not found in {}"
+    ERR_NO_VERSION: ClassVar[str] = "No model version published in {}"
+    ERR_NO_PREVIOUS: ClassVar[str] = "No version published before {} in {}"
+
+    POINTER_FILE: ClassVar[str] = "CURRENT"
+    MANIFEST_FILE: ClassVar[str] = "manifest.json"
+    VERSIONS_DIR: ClassVar[str] = "versions"
+    STAGING_PREFIX: ClassVar[str] = "."
+    VERSION_FORMAT: ClassVar[str] = "%Y%m%dT%H%M%S%f"  # sortable, runs may share a second
+
+    def __init__(self, root: str = r"data/06_models/registry", keep: int = 5):
+        if keep < 1:
+            raise ValueError(self.ERR_INVALID_KEEP.format(keep))
+
+        self.root = Path(root)
+        self.keep = keep
+
+    @property
+    def versions_path(self) -> Path:
+        return self.root / self.VERSIONS_DIR
+
+    def versions(self) -> list[str]:
+        """Versions in the registry, oldest first."""
+        if not self.versions_path.exists():
+            return []
+        return sorted(
+            path.name
+            for path in self.versions_path.iterdir()
+            if path.is_dir() and not path.name.startswith(self.STAGING_PREFIX)
+        )
+
+    def current(self) -> str | None:
+        """Current version, None if none was published."""
+        pointer: Path = self.root / self.POINTER_FILE
+        return pointer.read_text().strip() if pointer.exists() else None
+
+    def path(self, version: str | None = None) -> Path:
+        """Directory of a version, the current one by default."""
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(self.ERR_NO_VERSION.format(self.root))
+
+        path: Path = self.versions_path / version
+        if not path.is_dir():
+            raise FileNotFoundError(self.ERR_VERSION_NOT_FOUND.format(version, self.root))
+        return path
+
+    def manifest(self, version: str | None = None) -> dict[str, Any]:
+        manifest: dict[str, Any] = loads((self.path(version) / self.MANIFEST_FILE).read_text())
+        return manifest
+
+    def embedding_store(self, version: str | None = None) -> EmbeddingStore:
+        """Embedding store of a version, the current one by default."""
+        return EmbeddingStore(str(self.path(version)))
+
+    @contextmanager
+    def new_version(self) -> Iterator[ModelVersion]:
+        """Version to write, published when the block ends without error.
+
+        Yields:
+            ModelVersion: The staged version, its manifest can be completed in the block.
+        """
+        created_at: datetime = datetime.now()
+        version: str = f"{created_at.strftime(self.VERSION_FORMAT)}-{token_hex(3)}"
+        staging: Path = self.versions_path / f"{self.STAGING_PREFIX}{version}"
+        staging.mkdir(parents=True)
+        model_version: ModelVersion = ModelVersion(
+            version=version,
+            path=staging,
+            manifest={"version": version, "created_at": created_at.isoformat(timespec="seconds")},
+        )
+        try:
+            yield model_version
+            (staging / self.MANIFEST_FILE).write_text(dumps(model_version.manifest, indent=2))
+            staging.rename(self.versions_path / version)
+        except BaseException:
+            rmtree(staging, ignore_errors=True)
+            raise
+
+        model_version.path = self.versions_path / version
+        self.publish(version)
+        self.prune()
+
+    def publish(self, version: str) -> None:
+        """Make a version current, atomically."""
+        self.path(version)  # only existing versions are published
+        pointer: Path = self.root / self.POINTER_FILE
+        temporary: Path = pointer.with_name(f"{self.STAGING_PREFIX}{self.POINTER_FILE}.tmp")
+        temporary.write_text(version)
+        replace(temporary, pointer)
+        logger.info(f"Published model version {version} in {self.root}")
+
+    def rollback(self, version: str | None = None) -> str:
+        """Publish an older version, by default the one before the current version.
+
+        Returns:
+            str: Version published.
+        """
+        if version is None:
+            current: str | None = self.current()
+            older: list[str] = [v for v in self.versions() if current is None or v < current]
+            if not older:
+                raise FileNotFoundError(self.ERR_NO_PREVIOUS.format(current, self.root))
+            version = older[-1]
+
+        self.publish(version)
+        return version
+
+    def prune(self) -> list[str]:
+        """Delete the versions older than the ``keep`` most recent ones, except the current.
+
+        Serving processes keep reading a deleted version they mapped until they switch.
+
+        Returns:
+            list[str]: Versions deleted.
+        """
+        current: str | None = self.current()
+        expired: list[str] = [
+            version for version in self.versions()[: -self.keep] if version != current
+        ]
+        for version in expired:
+            rmtree(self.versions_path / version, ignore_errors=True)
+        if expired:
+            logger.info(f"Deleted {len(expired)} expired model versions: {expired}")
+        return expired
+
+
+class RegistryWatcher:
+    """Calls back from a background thread whenever another version becomes current.
+
+    Attributes:
+        registry: Registry being watched.
+        interval: Seconds between checks of the current version.
+        version: Last version notified.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        on_publish: Callable[[str], Any],
+        version: str | None = None,
+        interval: float = 5.0,
+    ):
+        self.registry = registry
+        self.interval = interval
+        self.version = version
+        self.__on_publish = on_publish
+        self.__stopped: Event = Event()
+        self.__thread: Thread = Thread(target=self.__watch, daemon=True)
+
+    def check(self) -> bool:
+        """Notify the current version if it changed since the last check."""
+        current: str | None = self.registry.current()
+        if current is None or current == self.version:
+            return False
+
+        try:
+            self.__on_publish(current)
+        except (OSError, ValueError) as e:  # e.g. pruned meanwhile, retried next check
+            logger.warning(f"Could not switch to model version {current}: {e}")
+            return False
+        self.version = current
+        return True
+
+    def __watch(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            self.check()
+
+    def start(self) -> "RegistryWatcher":
+        self.__thread.start()
+        return self
+
+    def stop(self) -> "RegistryWatcher":
+        self.__stopped.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+        return self
@@ -0,0 +1,190 @@
+import sys
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from cProfile import Profile
+from pathlib import Path
+from threading import Event, Lock, Thread, get_ident
+from types import FrameType
+from typing import ClassVar
+
+from loguru import logger
+
+
+class StackSampler:
+    """Samples the call stack of one thread at a fixed interval.
+
+    Stacks are kept collapsed, root first and ``;`` separated with one count per
+    stack, which is the input format of flamegraph.pl and speedscope.
+
+    Attributes:
+        interval: Seconds between samples.
+        stacks: Number of samples of each collapsed stack.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.__thread_id = thread_id
+        self.__stopped: Event = Event()
+        self.__thread: Thread = Thread(target=self.__sample, daemon=True)
+
+    @staticmethod
+    def collapse(frame: FrameType | None) -> str:
+        functions: list[str] = []
+        while frame is not None:
+            code = frame.f_code
+            functions.append(
+                f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(functions))
+
+    def __sample(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            frame: FrameType | None = sys._current_frames().get(self.__thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    def start(self) -> "StackSampler":
+        self.__thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self.__stopped.set()
+        self.__thread.join()
+        return self
+
+
+class StageProfiler:
+    """Profiles the pipeline stages whose name matches ``stage``.
+
+    Hooked into the telemetry stages, so only the selected stage pays the profiling
+    overhead. A stage matches by its full name or its last component, e.g. ``fit``
+    matches every ``<model>.fit`` stage. Calls of the same stage accumulate.
+
+    Modes:
+        - cprofile: deterministic profile (``.pstats``) plus sampled stacks.
+        - sampling: sampled stacks only, the lowest overhead.
+        - tracemalloc: allocations by line (``.tracemalloc.txt``) plus sampled stacks.
+
+    Attributes:
+        mode: Profiler to run (cprofile/sampling/tracemalloc).
+        stage: Name of the stages to profile.
+        profiles: Deterministic profile of each profiled stage.
+        stacks: Sampled collapsed stacks of each profiled stage.
+        allocations: Allocation statistics of each profiled stage.
+    """
+
+    ERR_INVALID_MODE: ClassVar[str] = "Invalid profile mode: {}. Must be one of: {}"
+
+    MODES: ClassVar[list[str]] = ["cprofile", "sampling", "tracemalloc"]
+    TOP_ALLOCATIONS: ClassVar[int] = 50
+
+    def __init__(self, mode: str, stage: str, interval: float = 0.005):
+        if mode not in self.MODES:
+            raise ValueError(self.ERR_INVALID_MODE.format(mode, ", ".join(self.MODES)))
+
+        self.mode = mode
+        self.stage = stage
+        self.interval = interval
+        self.profiles: dict[str, Profile] = {}
+        self.stacks: dict[str, Counter[str]] = {}
+        self.allocations: dict[str, list[str]] = {}
+        self.__lock: Lock = Lock()
+
+    def matches(self, name: str) -> bool:
+        return name == self.stage or name.rsplit(".", 1)[-1] == self.stage
+
+    @contextmanager
+    def __deterministic(self, name: str) -> Iterator[None]:
+        with self.__lock:
+            profile: Profile = self.profiles.setdefault(name, Profile())
+        enabled: bool = True
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is already active
+            logger.warning(f"Profiler busy, stage {name} is only sampled")
+            enabled = False
+        try:
+            yield
+        finally:
+            if enabled:
+                profile.disable()
+
+    @contextmanager
+    def __allocations(self, name: str) -> Iterator[None]:
+        if tracemalloc.is_tracing():  # a concurrent stage is already traced
+            yield
+            return
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with self.__lock:
+                self.allocations.setdefault(name, []).extend(
+                    [
+                        f"# peak traced memory: {peak} bytes",
+                        *(
+                            str(stat)
+                            for stat in snapshot.statistics("lineno")[: self.TOP_ALLOCATIONS]
+                        ),
+                    ]
+                )
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block if ``name`` is a selected stage."""
+        if not self.matches(name):
+            yield
+            return
+
+        sampler: StackSampler = StackSampler(get_ident(), self.interval).start()
+        try:
+            if self.mode == "cprofile":
+                with self.__deterministic(name):
+                    yield
+            elif self.mode == "tracemalloc":
+                with self.__allocations(name):
+                    yield
+            else:
+                yield
+        finally:
+            sampler.stop()
+            with self.__lock:
+                self.stacks.setdefault(name, Counter()).update(sampler.stacks)
+
+    def write(self, directory: str) -> list[Path]:
+        """Write the results of every profiled stage, one file per stage and format.
+
+        Args:
+            directory: Directory of the profiles, created if needed.
+
+        Returns:
+            list[Path]: Files written.
+        """
+        path: Path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+
+        files: list[Path] = []
+        with self.__lock:
+            for name, profile in self.profiles.items():
+                files.append(path / f"{name}.pstats")
+                profile.dump_stats(files[-1])
+            for name, stacks in self.stacks.items():
+                files.append(path / f"{name}.collapsed")
+                files[-1].write_text(
+                    "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+                )
+            for name, allocations in self.allocations.items():
+                files.append(path / f"{name}.tracemalloc.txt")
+                files[-1].write_text("\n".join(allocations) + "\n")
+
+        if not files:
+            logger.warning(f"No stage matched {self.stage}, nothing was profiled")
+        logger.info(f"Profiles written to {path}")
+        return files
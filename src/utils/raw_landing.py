@@ -0,0 +1,113 @@
+from datetime import datetime
+from gzip import GzipFile
+from json import dumps
+from pathlib import Path
+from secrets import token_hex
+from threading import Lock
+from typing import ClassVar
+
+from loguru import logger
+
+from src.utils.telemetry import telemetry
+
+
+class RawLandingZone:
+    """Raw API responses, appended to gzip compressed NDJSON files partitioned by date.
+
+    Each response is a line holding the endpoint, the request URL, the fetch time and
+    the response body as returned by the API, so fields not parsed today can be
+    replayed later without fetching them again. Every run appends to its own file per
+    endpoint and day, so concurrent runs never interleave their writes, and the
+    complete lines of a file left by an interrupted run can still be read.
+
+    Layout::
+
+        <root>/date=<YYYY-MM-DD>/<endpoint>-<run>.ndjson.gz
+
+    Attributes:
+        root: Directory of the landing zone.
+        run: Id of the run, in the name of the files it writes.
+    """
+
+    ERR_CLOSED: ClassVar[str] = "Raw landing zone {} is closed"
+
+    PARTITION_PREFIX: ClassVar[str] = "date="
+    FILE_SUFFIX: ClassVar[str] = ".ndjson.gz"
+    DATE_FORMAT: ClassVar[str] = "%Y-%m-%d"
+
+    def __init__(self, root: str = r"data/01_raw/tmdb", compresslevel: int = 6):
+        self.root = Path(root)
+        self.run: str = f"{datetime.now():%H%M%S%f}-{token_hex(3)}"
+        self.__compresslevel = compresslevel
+        self.__files: dict[tuple[str, str], GzipFile] = {}
+        self.__lock: Lock = Lock()
+        self.__closed: bool = False
+
+    def __file(self, partition: str, endpoint: str) -> GzipFile:
+        file: GzipFile | None = self.__files.get((partition, endpoint))
+        if file is None:
+            path: Path = self.root / f"{self.PARTITION_PREFIX}{partition}"
+            path.mkdir(parents=True, exist_ok=True)
+            file = self.__files[(partition, endpoint)] = GzipFile(
+                path / f"{endpoint}-{self.run}{self.FILE_SUFFIX}",
+                mode="ab",
+                compresslevel=self.__compresslevel,
+            )
+        return file
+
+    def append(self, endpoint: str, url: str, body: bytes) -> None:
+        """Append a response to the file of its endpoint, in the partition of today.
+
+        Args:
+            endpoint: API endpoint of the response, e.g. discover or details.
+            url: Requested URL.
+            body: JSON body of the response, as received.
+        """
+        fetched_at: datetime = datetime.now()
+        # the body is embedded as received, newlines of valid JSON are whitespace only
+        line: bytes = b"".join(
+            [
+                dumps(
+                    {"endpoint": endpoint, "url": url, "fetched_at": fetched_at.isoformat()}
+                ).encode()[:-1],  # the envelope is closed after the body
+                b', "body": ',
+                body.replace(b"\r", b" ").replace(b"\n", b" "),
+                b"}\n",
+            ]
+        )
+        with self.__lock:
+            if self.__closed:
+                raise RuntimeError(self.ERR_CLOSED.format(self.root))
+            self.__file(fetched_at.strftime(self.DATE_FORMAT), endpoint).write(line)
+        telemetry.count("raw_responses_landed_total", endpoint=endpoint)
+
+    def files(self, endpoint: str | None = None) -> list[Path]:
+        """Files of the landing zone, oldest partition first, of an endpoint if given."""
+        pattern: str = f"{endpoint or '*'}-*{self.FILE_SUFFIX}"
+        return sorted(self.root.glob(f"{self.PARTITION_PREFIX}*/{pattern}"))
+
+    @classmethod
+    def partition(cls, path: Path) -> str:
+        """Date of the partition of a file."""
+        return path.parent.name.removeprefix(cls.PARTITION_PREFIX)
+
+    @classmethod
+    def endpoint(cls, path: Path) -> str:
+        """Endpoint of the responses of a file."""
+        return path.name.split("-", 1)[0]
+
+    def close(self) -> None:
+        """Close the files of the run, the landing zone can't be appended afterwards."""
+        with self.__lock:
+            self.__closed = True
+            for file in self.__files.values():
+                file.close()
+            if self.__files:
+                logger.info(f"Landed raw responses in {len(self.__files)} files of {self.root}")
+            self.__files.clear()
+
+    def __enter__(self) -> "RawLandingZone":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
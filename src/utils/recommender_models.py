@@ -1,15 +1,55 @@
-from collections.abc import Callable
-from dataclasses import dataclass
-from typing import ClassVar
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from pickle import PicklingError
+from typing import Any, ClassVar
 
+from joblib import hash as joblib_hash
+from loguru import logger
+from numpy import (
+    arange,
+    array,
+    asarray,
+    empty,
+    float32,
+    hstack,
+    inf,
+    int64,
+    ndarray,
+    repeat,
+    take_along_axis,
+    tile,
+)
 from pandas import DataFrame
+from scipy.sparse import spmatrix
+from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances, linear_kernel
 from sklearn.pipeline import Pipeline
+from sklearn.utils.extmath import row_norms
 
+from src.pipelines.training_pipeline.movie_feature_preprocessor import MovieFeaturePreprocessor
+from src.utils.embedding_store import (
+    Embeddings,
+    EmbeddingStore,
+    FittedPreprocessor,
+    RecommendationCache,
+    top_k_columns,
+)
 from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.telemetry import telemetry
+
+
+def euclidean_similarity(X: Any, Y: Any = None) -> ndarray:
+    """Euclidean distances as similarities in (0, 1], the closest movies score highest."""
+    similarities: ndarray = 1 / (1 + euclidean_distances(X, Y))
+    return similarities
 
 
 @dataclass
 class RecommenderModelConfig:
+    ERR_INVALID_PRECISION: ClassVar[str] = Embeddings.ERR_INVALID_PRECISION
+    ERR_INVALID_CHUNK_SIZE: ClassVar[str] = "Chunk size must be positive, got {}"
+    ERR_INVALID_TOP_K: ClassVar[str] = "Top k must be positive, got {}"
+
     model_name: str
     feature_store: FeatureStoreInterface
     training_feature_group: str  # TODO: Improve this, with feature group object
@@ -17,6 +57,34 @@ class RecommenderModelConfig:
     required_features: list[str]
     transformation_pipeline: Pipeline
     model: Callable
+    # when set, kernel models store the embeddings instead of the pairwise matrix
+    embedding_group: str | None = None
+    embedding_store: EmbeddingStore = field(default_factory=EmbeddingStore)
+    # storage precision of the embeddings (float32/float16/int8), the pairwise matrices
+    # and top k neighbours of the other models are stored at full precision
+    precision: str = "float32"
+    # when set, the features are preprocessed out of core, this many rows at a time, into
+    # a memory-mapped matrix of the model input directory
+    chunk_size: int | None = None
+    model_input_dir: str = r"data/05_model_input"
+    # fits and transforms the chunks, e.g. TextFeaturePreprocessor.fit_chunked for text
+    chunked_fit: Callable[..., tuple[ndarray | spmatrix, ndarray]] = (
+        MovieFeaturePreprocessor.fit_chunked
+    )
+    # when set, models without embeddings store the top k neighbours of each movie,
+    # computed a chunk of rows at a time, instead of the pairwise matrix
+    top_k: int | None = None
+
+    def __post_init__(self) -> None:
+        """Validate configuration after initialization."""
+        if self.precision not in Embeddings.PRECISIONS:
+            raise ValueError(
+                self.ERR_INVALID_PRECISION.format(self.precision, ", ".join(Embeddings.PRECISIONS))
+            )
+        if self.chunk_size is not None and self.chunk_size < 1:
+            raise ValueError(self.ERR_INVALID_CHUNK_SIZE.format(self.chunk_size))
+        if self.top_k is not None and self.top_k < 1:
+            raise ValueError(self.ERR_INVALID_TOP_K.format(self.top_k))
 
 
 class RecommenderModel:
@@ -24,6 +92,18 @@ class RecommenderModel:
     ERR_NOT_FITTED: ClassVar[str] = (
         "Model has not been fitted yet. Call fit() before storing outputs"
     )
+    ERR_NOT_STORED: ClassVar[str] = (
+        "Embeddings have not been stored yet. Call store_outputs() before the warm cache"
+    )
+
+    NEIGHBOURS_BLOCK_ROWS: ClassVar[int] = 1024  # similarity rows computed at once by default
+    NEIGHBOURS_BLOCK_COLUMNS: ClassVar[int] = 8192  # candidate columns scored at once
+
+    # models served as a single product against the stored embeddings
+    KERNELS: ClassVar[dict[Callable, str]] = {
+        cosine_similarity: "cosine",
+        linear_kernel: "linear",
+    }
 
     def __init__(
         self,
@@ -32,41 +112,275 @@ class RecommenderModel:
         self.config = config
         self.name = self.config.model_name
         self.similarity_matrix: DataFrame | None = None
+        # top k neighbours of each movie: movie_id, rank, recommended_id and score
+        self.neighbours: DataFrame | None = None
+        self.embeddings: Embeddings | None = None
+        # top-k drift of the stored embeddings from full precision, when quantized
+        self.quantization_drift: dict[str, float] | None = None
+        # fingerprint of the stored embeddings
+        self.fingerprint: str | None = None
+        self.__stored: tuple[Embeddings, EmbeddingStore] | None = None
+        self.kernel: str | None = (
+            self.KERNELS.get(self.config.model) if self.config.embedding_group else None
+        )
+        # computed before fitting, the transformation pipeline hash changes once fitted
+        self.input_key: str = self.__input_key()
+
+    def __input_key(self) -> str:
+        """Identify the inputs of the model: feature group, features and preprocessing."""
+        try:
+            return str(
+                joblib_hash(
+                    (
+                        self.config.training_feature_group,
+                        self.config.required_features,
+                        self.config.transformation_pipeline,
+                    )
+                )
+            )
+        except PicklingError:
+            # e.g. lambdas in the pipeline, the inputs of this model are not shared
+            return f"{self.name}-{id(self.config.transformation_pipeline)}"
 
     def __fetch_features(self) -> DataFrame:
+        # the id is dropped by the transformation pipeline, it identifies the embeddings
         features: DataFrame = self.config.feature_store.query_features(
             feature_group=self.config.training_feature_group,
-            columns=self.config.required_features,
+            columns=["id", *self.config.required_features],
         )
         if features.empty:
             raise ValueError(self.ERR_NO_FEATURES.format(model_name=self.config.model_name))
 
         return features
 
-    def fit(self) -> "RecommenderModel":
+    def __prepare_chunked_inputs(self, chunk_size: int) -> tuple[ndarray | spmatrix, ndarray]:
+        """Preprocess the features in streamed passes, dense rows into a memory-mapped matrix."""
+        path: Path = Path(self.config.model_input_dir) / f"{self.input_key}.npy"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return self.config.chunked_fit(
+            self.config.transformation_pipeline,
+            lambda: self.config.feature_store.iter_features(
+                self.config.training_feature_group,
+                columns=["id", *self.config.required_features],
+                chunk_size=chunk_size,
+            ),
+            str(path),
+        )
+
+    def prepare_inputs(self) -> tuple[ndarray | spmatrix, ndarray]:
+        """Fetch the training features and run them through the transformation pipeline.
+
+        Models sharing the same ``input_key`` produce the same matrix, so the training
+        pipeline calls this once per key and hands the result to every model. With a
+        ``chunk_size``, the features never are in memory at once: the preprocessor is
+        fitted out of core and the matrix is float32, memory-mapped from disk.
+
+        Returns:
+            The preprocessed feature matrix and the movie id of each row.
+        """
         # this use of feature goups is tech debt, better to create an object for each feature group
-        features: DataFrame = self.__fetch_features()
-        features.drop_duplicates(
-            inplace=True, subset=features.select_dtypes(exclude=["object"]).columns
+        with telemetry.stage(f"{self.name}.prepare_inputs"):
+            if self.config.chunk_size is not None:
+                return self.__prepare_chunked_inputs(self.config.chunk_size)
+
+            # the feature store reads the current version of each movie, no duplicates, and
+            # types them once when read, so they are transformed as they come
+            features: DataFrame = self.__fetch_features()
+
+            return (
+                self.config.transformation_pipeline.fit_transform(features),
+                features["id"].to_numpy(dtype=int64),
+            )
+
+    def fit(self, preprocessed_features: Any = None, ids: Any = None) -> "RecommenderModel":
+        """Compute the embeddings, or the top k neighbours or similarity matrix of other models.
+
+        Args:
+            preprocessed_features: Matrix returned by ``prepare_inputs``. It is only read,
+                so the same matrix can be shared by models fitted concurrently. When not
+                provided, the inputs are prepared by this model.
+            ids: Movie id of each row of ``preprocessed_features``.
+
+        Returns:
+            RecommenderModel: Self reference for method chaining
+        """
+        if preprocessed_features is None:
+            preprocessed_features, ids = self.prepare_inputs()
+
+        with telemetry.stage(f"{self.name}.fit"):
+            if self.kernel:
+                # out of core inputs are normalized into a memory-mapped matrix
+                path: Path | None = (
+                    None
+                    if self.config.chunk_size is None
+                    else Path(self.config.model_input_dir) / f"{self.input_key}.{self.name}.npy"
+                )
+                self.embeddings = Embeddings.from_features(
+                    ids, preprocessed_features, None if path is None else str(path)
+                )
+                return self
+            if self.config.top_k is not None:
+                self.neighbours = self.__top_k_neighbours(preprocessed_features, ids)
+                return self
+
+            self.similarity_matrix = DataFrame(
+                self.config.model(preprocessed_features, preprocessed_features)
+            )
+
+        return self
+
+    def __block_model(self, features: Any) -> Callable[[slice, slice], ndarray]:
+        """Similarities of a block of rows to a block of columns of the features.
+
+        Cosine similarities are dot products divided by the row norms, computed once
+        rather than by sklearn renormalizing the features for every block.
+        """
+        if self.config.model is not cosine_similarity:
+            return lambda rows, columns: asarray(
+                self.config.model(features[rows], features[columns])
+            )
+
+        norms: ndarray = row_norms(features)
+        norms[norms == 0] = 1  # zero rows score 0, as in sklearn
+        return lambda rows, columns: asarray(
+            linear_kernel(features[rows], features[columns])
+            / norms[rows, None]
+            / norms[None, columns]
         )
-        dtype_optimized_features: DataFrame = features.convert_dtypes()
 
-        preprocessed_features: DataFrame = self.config.transformation_pipeline.fit_transform(
-            dtype_optimized_features
+    def __top_k_neighbours(self, features: Any, ids: Any) -> DataFrame:
+        """Top k neighbours of each movie, the similarities computed a block at a time.
+
+        A block of rows is scored against a block of candidate columns at a time, keeping
+        a running top k per row, so only a block x block slice of the similarities is
+        held at once, never a row of the pairwise matrix.
+        """
+        ids = asarray(ids, dtype=int64)
+        k: int = max(0, min(self.config.top_k or 0, len(ids) - 1))
+        block_rows: int = self.config.chunk_size or self.NEIGHBOURS_BLOCK_ROWS
+        similarity: Callable[[slice, slice], ndarray] = self.__block_model(features)
+        neighbours: ndarray = empty((len(ids), k), dtype=int64)
+        scores: ndarray = empty((len(ids), k), dtype=float32)
+        for start in range(0, len(ids) if k else 0, block_rows):
+            rows: slice = slice(start, min(start + block_rows, len(ids)))
+            best: ndarray = empty((rows.stop - start, 0), dtype=int64)
+            best_scores: ndarray = empty((rows.stop - start, 0), dtype=float32)
+            for column in range(0, len(ids), self.NEIGHBOURS_BLOCK_COLUMNS):
+                columns: slice = slice(
+                    column, min(column + self.NEIGHBOURS_BLOCK_COLUMNS, len(ids))
+                )
+                similarities: ndarray = array(similarity(rows, columns), dtype=float32)
+                own: ndarray = arange(max(start, column), min(rows.stop, columns.stop))
+                similarities[own - start, own - column] = -inf  # not its own neighbour
+                candidates: ndarray = hstack(
+                    (best, repeat(arange(columns.start, columns.stop)[None], len(best), axis=0))
+                )
+                kept, best_scores = top_k_columns(
+                    hstack((best_scores, similarities)), min(k, candidates.shape[1])
+                )
+                best = take_along_axis(candidates, kept, axis=1)
+            neighbours[rows], scores[rows] = ids[best], best_scores
+
+        return DataFrame(
+            {
+                "movie_id": repeat(ids, k),
+                "rank": tile(arange(1, k + 1), len(ids)),
+                "recommended_id": neighbours.ravel(),
+                "score": scores.ravel(),
+            }
         )
-        self.similarity_matrix = DataFrame(
-            self.config.model(preprocessed_features, preprocessed_features)
+
+    def __stored_embeddings(self, embeddings: Embeddings) -> Embeddings:
+        if self.config.precision == embeddings.precision:
+            return embeddings
+
+        quantized: Embeddings = embeddings.quantize(self.config.precision)
+        self.quantization_drift = quantized.top_k_drift(embeddings, kernel=self.kernel or "cosine")
+        logger.info(
+            f"{self.name} embeddings quantized to {self.config.precision}, "
+            f"top-k drift from full precision: {self.quantization_drift}"
         )
+        return quantized
 
+    def __store_preprocessor(self, store: EmbeddingStore, fingerprint: str) -> None:
+        """Store the fitted pipeline with the embeddings, to preprocess movies added later."""
+        try:
+            store.save_preprocessor(
+                str(self.config.embedding_group),
+                FittedPreprocessor(
+                    fingerprint=fingerprint,
+                    columns=self.config.required_features,
+                    pipeline=self.config.transformation_pipeline,
+                ),
+            )
+        except (PicklingError, AttributeError) as e:
+            # e.g. lambdas in the pipeline, only the stored movies can be recommended for
+            logger.warning(f"{self.name} preprocessor not stored, new movies can't be scored: {e}")
+
+    def store_outputs(self, embedding_store: EmbeddingStore | None = None) -> "RecommenderModel":
+        """Store the embeddings, or the top k neighbours or similarity matrix of other models.
+
+        Args:
+            embedding_store: Where the embeddings are stored instead of the configured
+                store, e.g. a model registry version.
+
+        Returns:
+            RecommenderModel: Self reference for method chaining
+        """
+        with telemetry.stage(f"{self.name}.store_outputs"):
+            if self.embeddings is not None and self.config.embedding_group:
+                store: EmbeddingStore = embedding_store or self.config.embedding_store
+                stored: Embeddings = self.__stored_embeddings(self.embeddings)
+                self.fingerprint = store.save(self.config.embedding_group, stored)
+                self.__store_preprocessor(store, self.fingerprint)
+                self.__stored = (stored, store)
+                return self
+
+            outputs: DataFrame | None = (
+                self.neighbours if self.neighbours is not None else self.similarity_matrix
+            )
+            if outputs is None:
+                raise ValueError(self.ERR_NOT_FITTED)
+            if self.config.precision != "float32":
+                logger.warning(
+                    f"{self.name} has no embeddings, its scores are stored at full precision "
+                    f"instead of {self.config.precision}"
+                )
+
+            self.config.feature_store.insert(
+                feature_group=self.config.similarity_matrix_group,
+                features=outputs,
+                mode="replace",
+            )
         return self
 
-    def store_outputs(self) -> "RecommenderModel":
-        if self.similarity_matrix is None:
-            raise ValueError(self.ERR_NOT_FITTED)
+    def store_warm_cache(self, k: int, hot_ids: Iterable[int] = ()) -> "RecommenderModel":
+        """Precompute the top ``k`` recommendations of the popular and hot movies.
 
-        self.config.feature_store.insert(
-            feature_group=self.config.similarity_matrix_group,
-            features=self.similarity_matrix,
-            mode="replace",
-        )
+        Computed from the stored embeddings, quantized or not, so cached answers are the
+        ones served, and stored next to them. Models without embeddings have nothing to
+        warm.
+
+        Args:
+            k: Number of recommendations cached per movie.
+            hot_ids: Movies cached besides the popular ones.
+
+        Returns:
+            RecommenderModel: Self reference for method chaining
+        """
+        if not self.kernel or not self.config.embedding_group:
+            return self
+        if self.__stored is None:
+            raise ValueError(self.ERR_NOT_STORED)
+
+        with telemetry.stage(f"{self.name}.store_warm_cache"):
+            movies: DataFrame = self.config.feature_store.query_features(
+                feature_group=self.config.training_feature_group, columns=["id", "is_popular"]
+            )
+            popular: list[int] = movies.loc[movies["is_popular"].fillna(0) == 1, "id"].tolist()
+            stored, store = self.__stored
+            store.save_cache(
+                self.config.embedding_group,
+                RecommendationCache.build(stored, [*popular, *hot_ids], k=k, kernel=self.kernel),
+            )
         return self
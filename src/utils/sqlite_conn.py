@@ -1,67 +1,276 @@
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager
 from json import dumps, loads
 from pathlib import Path
-from sqlite3 import Connection, connect
-from typing import Any, ClassVar, Optional
+from sqlite3 import Connection, Cursor
+from typing import Any, ClassVar
 
 from loguru import logger
-from pandas import DataFrame, Index
+from pandas import DataFrame, Index, Series, concat
+from pandas.arrays import ArrowExtensionArray
+from pyarrow import (
+    Array,
+    ArrowInvalid,
+    ArrowNotImplementedError,
+    ArrowTypeError,
+    DataType,
+    RecordBatch,
+    array,
+    float64,
+    int64,
+    list_,
+    string,
+    types,
+)
 
 from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.sqlite_pool import SQLitePool
+from src.utils.telemetry import telemetry
 
 
 class SQLiteConn(FeatureStoreInterface):
     ERR_NO_DB_PATH: ClassVar[str] = "Database path must be provided to initialize connection"
     ERR_DB_NOT_EXISTS: ClassVar[str] = "Database file {} does not exist"
-    ERR_CONN_NOT_INITIALIZED: ClassVar[str] = "Connection not initialized"
     ERR_MISSING_FEATURE_GROUP: ClassVar[str] = "Feature group name must be provided"
     ERR_EMPTY_FEATURES: ClassVar[str] = "Feature group name and features must be provided"
+    ERR_INVALID_MODE: ClassVar[str] = "Invalid bulk load mode: {}. Must be one of: {}"
+    ERR_NOT_VERSIONED: ClassVar[str] = "Feature group {} has no {} and {} columns to version"
+    ERR_INVALID_KEEP_VERSIONS: ClassVar[str] = "At least one version must be kept, got {}"
+
+    BULK_LOAD_MODES: ClassVar[list[str]] = ["replace", "upsert"]
+    # rows staged per statement, bounds the Python values of a bulk load
+    STAGING_ROWS: ClassVar[int] = 10_000
+    # larger lookups join a temporary table instead of binding one parameter per id
+    MAX_LOOKUP_PARAMS: ClassVar[int] = 512
+
+    # feature groups with both columns are versioned, their latest rows are materialized
+    KEY_COL: ClassVar[str] = "id"
+    VERSION_COL: ClassVar[str] = "extraction_date"
+    LATEST_SUFFIX: ClassVar[str] = "_latest"
+    REPLACING_SUFFIX: ClassVar[str] = "_replacing"  # staging table of a replacing insert
 
     DESEARIALIZE_COLS: ClassVar[list[str]] = [
         "genres",
         "spoken_languages",
     ]  # this is tech debt
 
-    _instance: Optional["SQLiteConn"] = None
-    _conn: Connection | None = None
-
-    def __new__(cls, *args: Any, **kwargs: Any) -> "SQLiteConn":
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    # Arrow type of the columns read, by the affinity of their declared type as SQLite
+    # rules it, columns of other declared types (e.g. TIMESTAMP) are inferred
+    ARROW_AFFINITIES: ClassVar[list[tuple[str, DataType]]] = [
+        ("INT", int64()),
+        ("CHAR", string()),
+        ("CLOB", string()),
+        ("TEXT", string()),
+        ("REAL", float64()),
+        ("FLOA", float64()),
+        ("DOUB", float64()),
+    ]
+    # rows fetched at a time by full reads, bounding the Python objects held at once
+    READ_CHUNK_SIZE: ClassVar[int] = 2_000
+    # watermarks of every feature group, e.g. up to where incremental loads crawled
+    WATERMARKS_TABLE: ClassVar[str] = "_watermarks"
+    REFRESH_ATTEMPTS_TABLE: ClassVar[str] = "_refresh_attempts"
 
     def __init__(self, db_path: str | None = None):
-        if not self._conn and not db_path:
+        """Feature store of the ``db_path`` database, sharing its connection pool.
+
+        Reads go through a connection of the calling thread and writes through the
+        single writer of the database, so a store can be used from any thread.
+        """
+        if not db_path:
             raise ValueError(self.ERR_NO_DB_PATH)
 
-        if db_path:
-            assert Path(db_path).exists(), self.ERR_DB_NOT_EXISTS.format(db_path)
+        assert Path(db_path).exists(), self.ERR_DB_NOT_EXISTS.format(db_path)
+        self.db_path = db_path
+        self.__pool: SQLitePool = SQLitePool.get(db_path)
+
+    def reader(self) -> AbstractContextManager[Connection]:
+        """Read connection of the calling thread."""
+        return self.__pool.reader()
+
+    def writer(self) -> AbstractContextManager[Connection]:
+        """The write connection of the database, committed on exit."""
+        return self.__pool.writer()
+
+    def close(self) -> None:
+        """Close the connections of the database, for every store sharing them."""
+        self.__pool.close()
+
+    def __enter__(self) -> "SQLiteConn":
+        return self
 
-        if not self._conn and db_path:
-            self._conn = connect(db_path)
+    def __exit__(self, *_: object) -> None:
+        self.close()
 
     def __prepare_for_storage(self, features: DataFrame) -> DataFrame:
-        df = features.copy()
-        df = df.convert_dtypes()
+        # the only conversion of the data written, a new frame the caller's is left as is
+        df: DataFrame = features.convert_dtypes()
         list_cols: Index[str] = df.select_dtypes(include=["object"]).columns
-        for col in list_cols:
-            df[col] = df[col].apply(lambda x: dumps(x) if isinstance(x, list) else x)
-        return df
-
-    def __deserialize_list_columns(self, features: DataFrame) -> DataFrame:
-        """Deserialize JSON strings back to lists with proper UTF-8 encoding."""
-        df: DataFrame = features.copy()
-        for col in self.DESEARIALIZE_COLS:
-            if col in df.columns:
-                df[col] = df[col].apply(
-                    lambda x: [
-                        bytes(item, "utf-8").decode("utf-8") if isinstance(item, str) else item
-                        for item in loads(x)
-                    ]
-                    if isinstance(x, str)
-                    else x
-                )
-        return df
+        return df.assign(
+            **{
+                col: df[col].map(lambda x: dumps(x) if isinstance(x, list) else x)
+                for col in list_cols
+            }
+        )
+
+    def __arrow_types(self, conn: Connection, table: str) -> dict[str, DataType | None]:
+        """Arrow type of each column of a table, None for the inferred ones."""
+        arrow_types: dict[str, DataType | None] = {}
+        for _, column, declared, *_ in conn.execute(f"PRAGMA table_info({table})").fetchall():
+            arrow_types[column] = next(
+                (
+                    arrow_type
+                    for affinity, arrow_type in self.ARROW_AFFINITIES
+                    if affinity in (declared or "").upper()
+                ),
+                None,
+            )
+        return arrow_types
+
+    @staticmethod
+    def __arrow_column(values: Any, arrow_type: DataType | None) -> Series:
+        try:
+            inferred: Array = array(values, from_pandas=True)
+        except (ArrowInvalid, ArrowTypeError):
+            return Series(values)  # mixed values
+
+        try:
+            typed: Array = inferred.cast(arrow_type) if arrow_type is not None else inferred
+        except (ArrowInvalid, ArrowNotImplementedError):
+            # values not of the declared type, SQLite does not enforce it
+            typed = inferred
+        return Series(ArrowExtensionArray(typed))
+
+    @staticmethod
+    def __lists(values: tuple) -> Series:
+        """Deserialize JSON lists to an Arrow list column, parsing each distinct one once."""
+        parsed: dict[str, list[Any]] = {}
+        lists: list[Any] = []
+        for value in values:
+            if isinstance(value, str) and value not in parsed:
+                parsed[value] = loads(value)
+            lists.append(parsed[value] if isinstance(value, str) else value)
+        try:
+            return Series(ArrowExtensionArray(array(lists, type=list_(string()))))
+        except (ArrowInvalid, ArrowTypeError):
+            # labels other than strings, kept as lists of their own
+            return Series([list(x) if isinstance(x, list) else x for x in lists], dtype=object)
+
+    def __frame(
+        self, rows: list[tuple], columns: list[str], arrow_types: dict[str, DataType | None]
+    ) -> DataFrame:
+        """Build the frame of the rows read, the only conversion of the data read.
+
+        Columns are built as Arrow arrays, scalars of their declared type and JSON lists
+        as lists of strings, so every read, and every chunk of a read, has the same dtypes
+        even when all values are missing.
+        """
+        values: Iterable[tuple] = zip(*rows, strict=True) if rows else (() for _ in columns)
+        data: dict[str, Series] = {
+            column: (
+                self.__lists(column_values)
+                if column in self.DESEARIALIZE_COLS
+                else self.__arrow_column(column_values, arrow_types.get(column))
+            )
+            for column, column_values in zip(columns, values, strict=True)
+        }
+        return DataFrame(data, columns=columns, copy=False)
+
+    def __read(
+        self,
+        cursor: Cursor,
+        columns: list[str],
+        arrow_types: dict[str, DataType | None],
+        chunk_size: int,
+    ) -> Iterator[DataFrame]:
+        """Frames of the rows of a cursor, ``chunk_size`` rows at a time."""
+        try:
+            while rows := cursor.fetchmany(chunk_size):
+                yield self.__frame(rows, columns, arrow_types)
+        finally:
+            cursor.close()
+
+    def __columns(self, conn: Connection, table: str) -> list[str]:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+    def __is_versioned(self, conn: Connection, feature_group: str) -> bool:
+        columns: list[str] = self.__columns(conn, feature_group)
+        return self.KEY_COL in columns and self.VERSION_COL in columns
+
+    def __max_rowid(self, conn: Connection, feature_group: str) -> int:
+        if not self.__columns(conn, feature_group):
+            return 0
+        return int(
+            conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {feature_group}").fetchone()[0]  # noqa: S608
+        )
+
+    def __ranked(self, feature_group: str, columns: list[str], where: str = "") -> str:
+        """Select the versions of each key, newest first, ranked in the ``_rank`` column."""
+        selected: str = ", ".join(f'"{column}"' for column in columns)
+        return (
+            f"SELECT {selected}, ROW_NUMBER() OVER ("  # noqa: S608
+            f"PARTITION BY {self.KEY_COL} ORDER BY {self.VERSION_COL} DESC, rowid DESC"
+            f") AS _rank FROM {feature_group} {where}"
+        )
+
+    def __sync_latest(
+        self, conn: Connection, feature_group: str, since_rowid: int | None = None
+    ) -> None:
+        """Materialize the latest version of each key in the ``<feature_group>_latest`` table.
+
+        Args:
+            feature_group: Versioned feature group.
+            since_rowid: Only the keys of the rows stored after this one changed, the
+                whole table is rebuilt if None.
+        """
+        latest: str = f"{feature_group}{self.LATEST_SUFFIX}"
+        columns: list[str] = self.__columns(conn, feature_group)
+        selected: str = ", ".join(f'"{column}"' for column in columns)
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {feature_group}_versions "
+            f"ON {feature_group} ({self.KEY_COL}, {self.VERSION_COL})"
+        )
+        if since_rowid is None or not self.__columns(conn, latest):
+            conn.execute(f"DROP TABLE IF EXISTS {latest}")
+            conn.execute(
+                f"CREATE TABLE {latest} AS SELECT {selected} "  # noqa: S608
+                f"FROM ({self.__ranked(feature_group, columns)}) WHERE _rank = 1"
+            )
+            conn.execute(f"CREATE UNIQUE INDEX {latest}_key ON {latest} ({self.KEY_COL})")
+            return
+
+        changed: str = (
+            f"WHERE {self.KEY_COL} IN "  # noqa: S608
+            f"(SELECT {self.KEY_COL} FROM {feature_group} WHERE rowid > ?)"
+        )
+        conn.execute(
+            f"INSERT OR REPLACE INTO {latest} ({selected}) SELECT {selected} "  # noqa: S608
+            f"FROM ({self.__ranked(feature_group, columns, changed)}) WHERE _rank = 1",
+            (since_rowid,),
+        )
 
+    def __current(self, feature_group: str) -> str:
+        """Table holding the current rows of a feature group, materialized on first read."""
+        with self.__pool.reader() as conn:
+            if not self.__is_versioned(conn, feature_group):
+                return feature_group
+
+            latest: str = f"{feature_group}{self.LATEST_SUFFIX}"
+            if self.__columns(conn, latest):
+                return latest
+
+        with self.__pool.writer() as conn:
+            return self.__latest(conn, feature_group)
+
+    def __latest(self, conn: Connection, feature_group: str) -> str:
+        """Latest versions table of a versioned feature group, materialized if missing."""
+        latest: str = f"{feature_group}{self.LATEST_SUFFIX}"
+        if not self.__columns(conn, latest):
+            logger.info(f"Materializing the latest versions of {feature_group} in {latest}")
+            self.__sync_latest(conn, feature_group)
+        return latest
+
+    @telemetry.stage("feature_store.insert")
     def insert(
         self,
         feature_group: str,
@@ -74,36 +283,514 @@ class SQLiteConn(FeatureStoreInterface):
         logger.info(f"Storing {len(features)} records in {feature_group} feature group")
         features_to_store: DataFrame = self.__prepare_for_storage(features)
 
-        features_to_store.to_sql(
-            name=feature_group,
-            con=self._conn,
-            if_exists=mode,
-            index=False,
+        with self.__pool.writer() as conn:
+            if mode == "replace":
+                self.__replace(conn, feature_group, features_to_store)
+            else:
+                stored_rowid: int = self.__max_rowid(conn, feature_group)
+                features_to_store.to_sql(
+                    name=feature_group,
+                    con=conn,
+                    if_exists=mode,
+                    index=False,
+                )
+                if self.__is_versioned(conn, feature_group):
+                    self.__sync_latest(conn, feature_group, stored_rowid)
+        telemetry.count(
+            "feature_store_rows_written_total", len(features), feature_group=feature_group
         )
 
-    def fetch_existing_movie_ids(self, feature_group: str) -> set[int]:
-        if not self._conn:
-            raise ValueError(self.ERR_CONN_NOT_INITIALIZED)
+    def __replace(self, conn: Connection, feature_group: str, features: DataFrame) -> None:
+        """Swap the rows of a feature group for ``features``, as one transaction.
+
+        The rows are written to a staging table renamed over the feature group once
+        complete, readers see the previous rows until then, never a missing or empty table.
+        """
+        staging: str = f"{feature_group}{self.REPLACING_SUFFIX}"
+        features.to_sql(name=staging, con=conn, if_exists="replace", index=False)
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute(f"DROP TABLE IF EXISTS {feature_group}{self.LATEST_SUFFIX}")
+        conn.execute(f"DROP TABLE IF EXISTS {feature_group}")
+        conn.execute(f"ALTER TABLE {staging} RENAME TO {feature_group}")
+        if self.__is_versioned(conn, feature_group):
+            self.__sync_latest(conn, feature_group)
+
+    @staticmethod
+    def __column_type(data_type: DataType) -> str:
+        if types.is_integer(data_type) or types.is_boolean(data_type):
+            return "INTEGER"
+        if types.is_floating(data_type):
+            return "REAL"
+        return "TEXT"
 
+    def __stage(
+        self, conn: Connection, batches: Iterable[RecordBatch]
+    ) -> tuple[list[str], str, int]:
+        """Stream the batches into the ``_staging`` temporary table.
+
+        Returns:
+            The staged columns, their definition and the number of staged rows.
+        """
+        staged: int = 0
+        columns: list[str] = []
+        definition: str = ""
+        for batch in batches:
+            if not columns:
+                columns = batch.schema.names
+                definition = ", ".join(
+                    f'"{field.name}" {self.__column_type(field.type)}' for field in batch.schema
+                )
+                conn.execute("DROP TABLE IF EXISTS temp._staging")
+                conn.execute(f"CREATE TEMP TABLE _staging ({definition})")
+            # sqlite3 only binds Python values, converted from zero-copy slices
+            for offset in range(0, batch.num_rows, self.STAGING_ROWS):
+                rows: RecordBatch = batch.slice(offset, self.STAGING_ROWS)
+                conn.executemany(
+                    f"INSERT INTO temp._staging VALUES ({', '.join('?' * len(columns))})",  # noqa: S608
+                    zip(*(column.to_pylist() for column in rows.columns), strict=True),
+                )
+            staged += batch.num_rows
+        return columns, definition, staged
+
+    def __make_room(
+        self, conn: Connection, feature_group: str, mode: str, key: str, version: str
+    ) -> str:
+        """Delete the stored rows replaced by an upsert of ``temp._latest``.
+
+        Versioned feature groups keep their previous versions, only a reloaded version is
+        replaced. Otherwise the stored row of a key is replaced if not newer than the
+        loaded one.
+
+        Returns:
+            The condition of the loaded rows to insert.
+        """
+        if mode == "replace":
+            return ""
+
+        versioned: bool = self.__is_versioned(conn, feature_group)
+        replaced: str = (
+            f"loaded.{version} = stored.{version}"
+            if versioned
+            else f"loaded.{version} >= stored.{version}"
+        )
+        conn.execute(
+            f"DELETE FROM {feature_group} WHERE rowid IN ("  # noqa: S608
+            f"SELECT stored.rowid FROM {feature_group} AS stored "
+            f"JOIN temp._latest AS loaded ON loaded.{key} = stored.{key} WHERE {replaced})"
+        )
+        if versioned:
+            return ""
+        return f"WHERE loaded.{key} NOT IN (SELECT {key} FROM {feature_group})"  # noqa: S608
+
+    @telemetry.stage("feature_store.bulk_load")
+    def bulk_load(
+        self,
+        feature_group: str,
+        batches: Iterable[RecordBatch],
+        mode: str = "replace",
+        key: str = "id",
+        version: str = "extraction_date",
+    ) -> int:
+        """Load Arrow record batches, keeping the latest version of each key.
+
+        The batches are streamed into a temporary staging table, ``STAGING_ROWS`` rows at
+        a time, so memory is bounded by those rows whatever the batch size. Deduplication
+        and the final write are set-based statements in the same transaction: the latest
+        ``version`` of each ``key`` wins, the last loaded row on ties.
+
+        Args:
+            feature_group: Feature group to load.
+            batches: Record batches with the columns of the feature group.
+            mode: ``replace`` recreates the feature group with the schema of the batches,
+                ``upsert`` adds the loaded versions to a versioned feature group, replacing
+                the rows of a reloaded version, otherwise it replaces the stored rows of
+                the loaded keys when the loaded version is not older.
+            key: Column identifying a row.
+            version: Column ordering the versions of a row.
+
+        Returns:
+            int: Number of rows stored.
+        """
         if not feature_group:
             raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
 
-        logger.info(f"Fetching existing movie IDs from {feature_group}")
-        query: str = "SELECT id FROM ?"
-        idx: DataFrame = DataFrame(
-            self._conn.execute(query, (feature_group,)).fetchall(), columns=["id"]
+        if mode not in self.BULK_LOAD_MODES:
+            raise ValueError(self.ERR_INVALID_MODE.format(mode, ", ".join(self.BULK_LOAD_MODES)))
+
+        with self.__pool.writer() as conn:
+            columns, definition, staged = self.__stage(conn, batches)
+            if not columns:
+                raise ValueError(self.ERR_EMPTY_FEATURES)
+
+            selected: str = ", ".join(f'"{column}"' for column in columns)
+            conn.execute(
+                f"CREATE TEMP TABLE _latest AS SELECT {selected} FROM ("  # noqa: S608
+                f"SELECT *, ROW_NUMBER() OVER ("
+                f"PARTITION BY {key} ORDER BY {version} DESC, rowid DESC) AS _rank "
+                f"FROM temp._staging) WHERE _rank = 1"
+            )
+            conn.execute(f"CREATE INDEX temp._latest_{key} ON _latest ({key})")
+            # the tables are swapped in one transaction, the old one is kept on errors
+            if not conn.in_transaction:  # no rows were staged
+                conn.execute("BEGIN")
+            if mode == "replace":
+                conn.execute(f"DROP TABLE IF EXISTS {feature_group}{self.LATEST_SUFFIX}")
+                conn.execute(f"DROP TABLE IF EXISTS {feature_group}")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {feature_group} ({definition})")
+            inserted: str = self.__make_room(conn, feature_group, mode, key, version)
+            stored_rowid: int = self.__max_rowid(conn, feature_group)
+            stored: int = conn.execute(
+                f"INSERT INTO {feature_group} ({selected}) "  # noqa: S608
+                f"SELECT {selected} FROM temp._latest AS loaded {inserted}"
+            ).rowcount
+            if self.__is_versioned(conn, feature_group):
+                self.__sync_latest(conn, feature_group, None if mode == "replace" else stored_rowid)
+            conn.execute("DROP TABLE temp._staging")
+            conn.execute("DROP TABLE temp._latest")
+
+        logger.info(
+            f"Bulk loaded {staged} records into {feature_group} feature group, "
+            f"{stored} stored after deduplication"
+        )
+        telemetry.count("feature_store_rows_written_total", stored, feature_group=feature_group)
+        return stored
+
+    def fetch_stale_movie_ids(
+        self, feature_group: str, extracted_before: str, limit: int
+    ) -> list[int]:
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        logger.info(f"Fetching up to {limit} movies extracted before {extracted_before}")
+        current: str = self.__current(feature_group)
+        with self.__pool.reader() as conn:
+            if self.__columns(conn, self.REFRESH_ATTEMPTS_TABLE):
+                query: str = (
+                    f"SELECT movies.id FROM {current} AS movies "  # noqa: S608
+                    f"LEFT JOIN {self.REFRESH_ATTEMPTS_TABLE} AS attempts "
+                    "ON attempts.feature_group = ? AND attempts.id = movies.id "
+                    "WHERE movies.extraction_date < ? "
+                    "AND (attempts.attempted_on IS NULL OR attempts.attempted_on < ?) "
+                    "ORDER BY movies.is_popular DESC, movies.popularity DESC LIMIT ?"
+                )
+                params: tuple = (feature_group, extracted_before, extracted_before, limit)
+            else:
+                query = (
+                    f"SELECT id FROM {current} WHERE extraction_date < ? "  # noqa: S608
+                    "ORDER BY is_popular DESC, popularity DESC LIMIT ?"
+                )
+                params = (extracted_before, limit)
+            ids: list[int] = [row[0] for row in conn.execute(query, params).fetchall()]
+        telemetry.count("feature_store_rows_read_total", len(ids), feature_group=feature_group)
+        return ids
+
+    def store_refresh_attempts(self, feature_group: str, ids: list[int], attempted_on: str) -> None:
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        with self.__pool.writer() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.REFRESH_ATTEMPTS_TABLE} ("
+                "feature_group TEXT NOT NULL, id INTEGER NOT NULL, attempted_on TEXT NOT NULL, "
+                "PRIMARY KEY (feature_group, id))"
+            )
+            conn.executemany(
+                f"INSERT INTO {self.REFRESH_ATTEMPTS_TABLE} VALUES (?, ?, ?) "  # noqa: S608
+                "ON CONFLICT (feature_group, id) DO UPDATE "
+                "SET attempted_on = excluded.attempted_on",
+                [(feature_group, movie_id, attempted_on) for movie_id in ids],
+            )
+
+    @telemetry.stage("feature_store.update")
+    def update_features(self, feature_group: str, features: DataFrame, key: str = "id") -> int:
+        """Update the given columns of the stored rows matching the features key.
+
+        Versioned feature groups keep the previous versions: the current row of each key
+        is stored again with the updated columns, as a new version.
+        """
+        if not feature_group or features.empty:
+            raise ValueError(self.ERR_EMPTY_FEATURES)
+
+        logger.info(f"Updating {len(features)} records in {feature_group} feature group")
+        columns: list[str] = [column for column in features.columns if column != key]
+        with self.__pool.writer() as conn:
+            versioned: bool = self.__is_versioned(conn, feature_group)
+            updates: DataFrame = self.__prepare_for_storage(features).astype(object)
+            conn.execute("DROP TABLE IF EXISTS temp._updates")
+            conn.execute(f"CREATE TEMP TABLE _updates ({', '.join(updates.columns)})")
+            conn.executemany(
+                f"INSERT INTO temp._updates VALUES ({', '.join('?' * len(updates.columns))})",  # noqa: S608
+                updates.where(updates.notna(), None).itertuples(index=False, name=None),
+            )
+            conn.execute(f"CREATE INDEX temp._updates_{key} ON _updates ({key})")
+            if versioned:
+                current: str = self.__latest(conn, feature_group)
+                stored_columns: list[str] = self.__columns(conn, feature_group)
+                stored_rowid: int = self.__max_rowid(conn, feature_group)
+                updated: int = conn.execute(
+                    f"INSERT INTO {feature_group} ({', '.join(stored_columns)}) SELECT "  # noqa: S608
+                    + ", ".join(
+                        f"updates.{column}" if column in columns else f"current.{column}"
+                        for column in stored_columns
+                    )
+                    + f" FROM {current} AS current "
+                    f"JOIN temp._updates AS updates ON current.{key} = updates.{key}"
+                ).rowcount
+                self.__sync_latest(conn, feature_group, stored_rowid)
+            else:
+                updated = conn.execute(
+                    f"UPDATE {feature_group} SET "  # noqa: S608
+                    f"{', '.join(f'{column} = updates.{column}' for column in columns)} "
+                    f"FROM temp._updates AS updates WHERE {feature_group}.{key} = updates.{key}"
+                ).rowcount
+            conn.execute("DROP TABLE temp._updates")
+
+        telemetry.count("feature_store_rows_written_total", updated, feature_group=feature_group)
+        return updated
+
+    @telemetry.stage("feature_store.update")
+    def update_popular_movies(self, feature_group: str, popular_ids: set[int]) -> int:
+        """Flag the current movies in ``popular_ids`` as popular and every other one as not.
+
+        The flag is a current state, so versioned feature groups update their latest
+        version in place rather than storing a new one.
+        """
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        logger.info(f"Updating popularity of {feature_group} with {len(popular_ids)} popular ids")
+        with self.__pool.writer() as conn:
+            current: str = (
+                self.__latest(conn, feature_group)
+                if self.__is_versioned(conn, feature_group)
+                else feature_group
+            )
+            conn.execute("DROP TABLE IF EXISTS temp._popular")
+            conn.execute("CREATE TEMP TABLE _popular (id INTEGER PRIMARY KEY)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp._popular VALUES (?)", ((i,) for i in popular_ids)
+            )
+            # only the rows whose flag changes are written
+            updated: int = conn.execute(
+                f"UPDATE {current} "  # noqa: S608
+                "SET is_popular = id IN (SELECT id FROM temp._popular) "
+                "WHERE is_popular IS NOT (id IN (SELECT id FROM temp._popular))"
+            ).rowcount
+            if current != feature_group:
+                conn.execute(
+                    f"UPDATE {feature_group} SET is_popular = current.is_popular "  # noqa: S608
+                    f"FROM {current} AS current WHERE {feature_group}.id = current.id "
+                    f"AND {feature_group}.{self.VERSION_COL} IS current.{self.VERSION_COL} "
+                    f"AND {feature_group}.is_popular IS NOT current.is_popular"
+                )
+            conn.execute("DROP TABLE temp._popular")
+
+        telemetry.count("feature_store_rows_written_total", updated, feature_group=feature_group)
+        return updated
+
+    @telemetry.stage("feature_store.compact")
+    def compact(self, feature_group: str, keep_versions: int = 1) -> int:
+        """Delete all but the ``keep_versions`` latest versions of each key and reclaim space.
+
+        Args:
+            feature_group: Versioned feature group to compact.
+            keep_versions: Versions kept per key, the latest one included.
+
+        Returns:
+            int: Number of rows deleted.
+        """
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        if keep_versions < 1:
+            raise ValueError(self.ERR_INVALID_KEEP_VERSIONS.format(keep_versions))
+
+        with self.__pool.writer() as conn:
+            if not self.__is_versioned(conn, feature_group):
+                raise ValueError(
+                    self.ERR_NOT_VERSIONED.format(feature_group, self.KEY_COL, self.VERSION_COL)
+                )
+
+            deleted: int = conn.execute(
+                f"DELETE FROM {feature_group} WHERE rowid IN ("  # noqa: S608
+                f"SELECT rowid FROM ({self.__ranked(feature_group, ['rowid'])}) "
+                f"WHERE _rank > ?)",
+                (keep_versions,),
+            ).rowcount
+        with self.__pool.writer() as conn:
+            conn.execute("VACUUM")  # outside of a transaction, once the delete is committed
+
+        logger.info(
+            f"Compacted {feature_group} feature group to {keep_versions} versions per "
+            f"{self.KEY_COL}, {deleted} rows deleted"
         )
+        return deleted
+
+    def fetch_existing_movie_ids(self, feature_group: str) -> set[int]:
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        logger.info(f"Fetching existing movie IDs from {feature_group}")
+        # table names can't be bound as parameters
+        query: str = f"SELECT id FROM {self.__current(feature_group)}"  # noqa: S608
+        with self.__pool.reader() as conn:
+            idx: DataFrame = DataFrame(conn.execute(query).fetchall(), columns=["id"])
+        telemetry.count("feature_store_rows_read_total", len(idx), feature_group=feature_group)
         return set(idx["id"].tolist())
 
-    def query_features(self, feature_group: str, columns: list[str] | None = None) -> DataFrame:
-        if not self._conn:
-            raise ValueError(self.ERR_CONN_NOT_INITIALIZED)
+    def fetch_watermark(self, feature_group: str, name: str) -> str | None:
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        with self.__pool.reader() as conn:
+            if not self.__columns(conn, self.WATERMARKS_TABLE):
+                return None
+            row: tuple | None = conn.execute(
+                f"SELECT value FROM {self.WATERMARKS_TABLE} "  # noqa: S608
+                "WHERE feature_group = ? AND name = ?",
+                (feature_group, name),
+            ).fetchone()
+        return row[0] if row else None
 
+    def store_watermark(self, feature_group: str, name: str, value: str) -> None:
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        logger.info(f"Storing {name} watermark {value} of {feature_group}")
+        with self.__pool.writer() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.WATERMARKS_TABLE} ("
+                "feature_group TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL, "
+                "updated_at TEXT NOT NULL, PRIMARY KEY (feature_group, name))"
+            )
+            conn.execute(
+                f"INSERT INTO {self.WATERMARKS_TABLE} VALUES (?, ?, ?, datetime('now')) "  # noqa: S608
+                "ON CONFLICT (feature_group, name) DO UPDATE "
+                "SET value = excluded.value, updated_at = excluded.updated_at",
+                (feature_group, name, value),
+            )
+
+    @telemetry.stage("feature_store.query")
+    def query_features(
+        self, feature_group: str, columns: list[str] | None = None, as_of: str | None = None
+    ) -> DataFrame:
+        """Read the current rows of a feature group, or the rows as of a date.
+
+        Versioned feature groups are read from their materialized latest versions, so
+        each key is read once. With ``as_of`` the latest version of each key extracted
+        on or before that date is read instead.
+        """
         if not feature_group:
             raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
 
         logger.info(f"Querying features from {feature_group} with columns {columns}")
-        query: str = f"SELECT {', '.join(columns) if columns else '*'} FROM {feature_group}"  # noqa: S608
-        features: DataFrame = DataFrame(self._conn.execute(query).fetchall(), columns=columns)
-        deserialized_features: DataFrame = self.__deserialize_list_columns(features)
-        return deserialized_features
+        source: str = self.__current(feature_group)
+        with self.__pool.reader() as conn:
+            selected: list[str] = columns or self.__columns(conn, feature_group)
+            parameters: tuple[str, ...] = ()
+            if as_of is not None and source == feature_group:
+                raise ValueError(
+                    self.ERR_NOT_VERSIONED.format(feature_group, self.KEY_COL, self.VERSION_COL)
+                )
+            if as_of is not None:
+                ranked: str = self.__ranked(
+                    feature_group, selected, f"WHERE {self.VERSION_COL} <= ?"
+                )
+                source, parameters = f"({ranked}) WHERE _rank = 1", (as_of,)
+
+            query: str = f"SELECT {', '.join(selected)} FROM {source}"  # noqa: S608
+            arrow_types: dict[str, DataType | None] = self.__arrow_types(conn, feature_group)
+            chunks: list[DataFrame] = list(
+                self.__read(
+                    conn.execute(query, parameters), selected, arrow_types, self.READ_CHUNK_SIZE
+                )
+            )
+        features: DataFrame = (
+            concat(chunks, ignore_index=True) if chunks else self.__frame([], selected, arrow_types)
+        )
+        telemetry.count("feature_store_rows_read_total", len(features), feature_group=feature_group)
+        return features
+
+    def iter_features(
+        self, feature_group: str, columns: list[str] | None = None, chunk_size: int = 50_000
+    ) -> Iterator[DataFrame]:
+        """Stream the current rows of a feature group, ``chunk_size`` rows at a time.
+
+        Rows come in storage order, the order of ``query_features``, and only one chunk
+        is held in memory at a time.
+        """
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        logger.info(f"Streaming features from {feature_group} in chunks of {chunk_size} rows")
+        source: str = self.__current(feature_group)
+        with self.__pool.reader() as conn:
+            selected: list[str] = columns or self.__columns(conn, feature_group)
+            for chunk in self.__read(
+                conn.execute(f"SELECT {', '.join(selected)} FROM {source}"),  # noqa: S608
+                selected,
+                self.__arrow_types(conn, feature_group),
+                chunk_size,
+            ):
+                telemetry.count(
+                    "feature_store_rows_read_total", len(chunk), feature_group=feature_group
+                )
+                yield chunk
+
+    @telemetry.stage("feature_store.lookup")
+    def get_features_by_ids(
+        self, feature_group: str, ids: Iterable[int], columns: list[str] | None = None
+    ) -> DataFrame:
+        """Read the current features of the given movies, in the order of ``ids``.
+
+        Up to ``MAX_LOOKUP_PARAMS`` ids are bound to an ``IN`` list padded to a power of
+        two, so the driver reuses a few prepared statements. Larger lookups join a
+        temporary table. Both use the key index of the current rows.
+        """
+        if not feature_group:
+            raise ValueError(self.ERR_MISSING_FEATURE_GROUP)
+
+        keys: list[int] = list(dict.fromkeys(int(i) for i in ids))
+        current: str = self.__current(feature_group)
+        rows: list[tuple] = []
+        with self.__pool.reader() as conn:
+            selected: list[str] = [
+                self.KEY_COL,
+                *(
+                    column
+                    for column in (columns or self.__columns(conn, feature_group))
+                    if column != self.KEY_COL
+                ),
+            ]
+            projection: str = ", ".join(f"current.{column}" for column in selected)
+            if keys and len(keys) <= self.MAX_LOOKUP_PARAMS:
+                padded: list[int] = keys + keys[-1:] * (
+                    (1 << (len(keys) - 1).bit_length()) - len(keys)
+                )
+                rows = conn.execute(
+                    f"SELECT {projection} FROM {current} AS current "  # noqa: S608
+                    f"WHERE current.{self.KEY_COL} IN ({', '.join('?' * len(padded))})",
+                    padded,
+                ).fetchall()
+            elif keys:
+                # a temporary table of the reader, committed so no read snapshot is held
+                with conn:
+                    conn.execute("DROP TABLE IF EXISTS temp._lookup")
+                    conn.execute("CREATE TEMP TABLE _lookup (id INTEGER PRIMARY KEY)")
+                    conn.executemany(
+                        "INSERT INTO temp._lookup VALUES (?)", ((key,) for key in keys)
+                    )
+                    rows = conn.execute(
+                        f"SELECT {projection} FROM temp._lookup AS lookup "  # noqa: S608
+                        f"JOIN {current} AS current ON current.{self.KEY_COL} = lookup.id"
+                    ).fetchall()
+                    conn.execute("DROP TABLE temp._lookup")
+
+            arrow_types: dict[str, DataType | None] = self.__arrow_types(conn, feature_group)
+        features: DataFrame = self.__frame(rows, selected, arrow_types)
+        telemetry.count("feature_store_rows_read_total", len(features), feature_group=feature_group)
+        if not features.empty:
+            order: DataFrame = self.__frame([(key,) for key in keys], [self.KEY_COL], arrow_types)
+            features = order.merge(features, on=self.KEY_COL)
+        return features
@@ -0,0 +1,110 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from sqlite3 import Connection, connect
+from threading import Lock, local
+from typing import ClassVar
+from weakref import finalize
+
+
+class _Reader:
+    """Read connection of a thread, held by its thread local storage only."""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+
+
+class SQLitePool:
+    """Connections to one SQLite database, shared by every thread of the process.
+
+    The database runs in WAL mode, so readers never block the writer nor each other.
+    Each thread reads through its own connection, created on first use and closed once
+    the thread exits, so short-lived worker threads don't leak connections. Writes go
+    through a single connection serialized by a lock, as SQLite allows one writer at
+    a time anyway. Pools are shared per database file: ``SQLitePool.get`` returns the
+    same pool for every path of the same file.
+
+    Attributes:
+        db_path: Resolved path of the database file.
+        timeout: Seconds a connection waits for a lock before failing.
+    """
+
+    ERR_CLOSED: ClassVar[str] = "Connection pool of {} is closed"
+
+    _pools: ClassVar[dict[str, "SQLitePool"]] = {}
+    _pools_lock: ClassVar[Lock] = Lock()
+
+    def __init__(self, db_path: str, timeout: float = 30.0):
+        self.db_path = str(Path(db_path).resolve())
+        self.timeout = timeout
+        self.__local: local = local()
+        self.__readers: set[Connection] = set()
+        self.__readers_lock: Lock = Lock()
+        self.__write_lock: Lock = Lock()
+        self.__writer: Connection | None = None
+        self.__closed: bool = False
+
+    @classmethod
+    def get(cls, db_path: str) -> "SQLitePool":
+        """Pool of the database file, created on first use."""
+        key: str = str(Path(db_path).resolve())
+        with cls._pools_lock:
+            pool: SQLitePool | None = cls._pools.get(key)
+            if pool is None or pool.__closed:
+                pool = cls._pools[key] = cls(key)
+            return pool
+
+    def __connect(self) -> Connection:
+        if self.__closed:
+            raise RuntimeError(self.ERR_CLOSED.format(self.db_path))
+        # closed by the pool from any thread, each connection is used by one at a time
+        conn: Connection = connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def __release(self, conn: Connection) -> None:
+        with self.__readers_lock:
+            self.__readers.discard(conn)
+        conn.close()
+
+    @contextmanager
+    def reader(self) -> Iterator[Connection]:
+        """Read connection of the calling thread."""
+        reader: _Reader | None = getattr(self.__local, "reader", None)
+        if reader is None:
+            reader = self.__local.reader = _Reader(self.__connect())
+            with self.__readers_lock:
+                self.__readers.add(reader.conn)
+            # the thread local storage of a thread is dropped when it exits, so is the reader
+            finalize(reader, self.__release, reader.conn)
+        yield reader.conn
+
+    @contextmanager
+    def writer(self) -> Iterator[Connection]:
+        """The write connection, held by one thread at a time and committed on exit."""
+        with self.__write_lock:
+            if self.__writer is None:
+                self.__writer = self.__connect()
+            with self.__writer:
+                yield self.__writer
+
+    def close(self) -> None:
+        """Close every connection, the pool can't be used afterwards."""
+        with self.__write_lock, self.__readers_lock:
+            self.__closed = True
+            for conn in self.__readers:
+                conn.close()
+            self.__readers.clear()
+            if self.__writer is not None:
+                self.__writer.close()
+                self.__writer = None
+        with self._pools_lock:
+            if self._pools.get(self.db_path) is self:
+                del self._pools[self.db_path]
+
+    def __enter__(self) -> "SQLitePool":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
@@ -0,0 +1,190 @@
+import sys
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from datetime import datetime
+from json import dumps
+from os import replace
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, process_time
+from typing import Any, ClassVar
+
+from loguru import logger
+
+from src.utils.profiling import StageProfiler
+
+try:
+    import resource
+except ImportError:  # not available on Windows, peak RSS is not reported
+    resource = None  # type: ignore[assignment]
+
+
+class Telemetry:
+    """Collects the stage timings and counters of a pipeline run.
+
+    Stages record their wall time, the process CPU time spent meanwhile (including the
+    BLAS and worker threads) and the process peak RSS when they end. Counters are
+    monotonic totals identified by a name and labels, e.g. HTTP requests per endpoint
+    and status. Everything is thread-safe and aggregated per name, so a stage entered
+    many times (e.g. a feature store query) reports its calls and total time.
+
+    The report is written at the end of each run as JSON and in the Prometheus text
+    exposition format, ready for the node exporter textfile collector.
+
+    Attributes:
+        started_at: When the telemetry was started or last reset.
+        stages: Calls, wall, CPU seconds and peak RSS of each stage.
+        counters: Value of each counter, by name and labels.
+        profiler: Profiler of the selected stages, if profiling is enabled.
+    """
+
+    METRICS_PREFIX: ClassVar[str] = "movie_recommender"
+    # stage fields accumulated over the calls, the others are last or peak values
+    STAGE_COUNTERS: ClassVar[set[str]] = {"calls", "wall_seconds", "cpu_seconds"}
+    TIMESTAMP_FORMAT: ClassVar[str] = "%Y%m%dT%H%M%S"
+
+    def __init__(self) -> None:
+        self.__lock: Lock = Lock()
+        self.profiler: StageProfiler | None = None
+        self.reset()
+
+    def reset(self) -> "Telemetry":
+        with self.__lock:
+            self.started_at: datetime = datetime.now()
+            self.stages: dict[str, dict[str, float]] = {}
+            self.counters: defaultdict[tuple[str, tuple[tuple[str, str], ...]], float] = (
+                defaultdict(int)
+            )
+        return self
+
+    @staticmethod
+    def peak_rss_bytes() -> int | None:
+        """Peak resident set size of the process so far."""
+        if resource is None:
+            return None
+        peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as the ``name`` stage, also usable as a decorator."""
+        wall: float = perf_counter()
+        cpu: float = process_time()
+        profile: AbstractContextManager = (
+            self.profiler.profile(name) if self.profiler else nullcontext()
+        )
+        try:
+            with profile:
+                yield
+        finally:
+            wall_seconds: float = perf_counter() - wall
+            cpu_seconds: float = process_time() - cpu
+            peak_rss: int | None = self.peak_rss_bytes()
+            with self.__lock:
+                stage: dict[str, float] = self.stages.setdefault(
+                    name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+                )
+                stage["calls"] += 1
+                stage["wall_seconds"] += wall_seconds
+                stage["cpu_seconds"] += cpu_seconds
+                if peak_rss is not None:
+                    stage["peak_rss_bytes"] = max(stage.get("peak_rss_bytes", 0), peak_rss)
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increase the ``name`` counter with the given labels by ``value``."""
+        key = (name, tuple(sorted((label, str(v)) for label, v in labels.items())))
+        with self.__lock:
+            self.counters[key] += value
+
+    def report(self) -> dict[str, Any]:
+        with self.__lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "peak_rss_bytes": self.peak_rss_bytes(),
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+            }
+
+    @staticmethod
+    def escape_label(value: str) -> str:
+        """Escape a label value for the Prometheus text exposition format."""
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def to_prometheus(self, **labels: str) -> str:
+        """Render the report in the Prometheus text exposition format.
+
+        Args:
+            labels: Labels added to every sample, e.g. the pipeline.
+
+        Returns:
+            str: One ``# TYPE`` line per metric followed by its samples.
+        """
+
+        def sample(name: str, value: float, sample_labels: dict[str, str]) -> str:
+            all_labels: str = ",".join(
+                f'{key}="{self.escape_label(label)}"'
+                for key, label in {**labels, **sample_labels}.items()
+            )
+            return f"{self.METRICS_PREFIX}_{name}{{{all_labels}}} {value}"
+
+        report: dict[str, Any] = self.report()
+        metrics: dict[str, tuple[str, list[str]]] = {}
+        for stage_name, stage in report["stages"].items():
+            for field, value in stage.items():
+                metric: str = f"stage_{field}"
+                metric_type: str = "counter" if field in self.STAGE_COUNTERS else "gauge"
+                metrics.setdefault(metric, (metric_type, []))[1].append(
+                    sample(metric, value, {"stage": stage_name})
+                )
+        for counter in report["counters"]:
+            metrics.setdefault(counter["name"], ("counter", []))[1].append(
+                sample(counter["name"], counter["value"], counter["labels"])
+            )
+        if report["peak_rss_bytes"] is not None:
+            metrics["peak_rss_bytes"] = (
+                "gauge",
+                [sample("peak_rss_bytes", report["peak_rss_bytes"], {})],
+            )
+
+        lines: list[str] = []
+        for metric, (metric_type, samples) in metrics.items():
+            lines.append(f"# TYPE {self.METRICS_PREFIX}_{metric} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def write(self, pipeline: str, directory: str = r"data/08_reporting") -> tuple[Path, Path]:
+        """Write the run report as JSON and Prometheus text files.
+
+        The JSON report is kept per run. The Prometheus file is replaced atomically on
+        every run of the pipeline, as scraped by the textfile collector.
+
+        Args:
+            pipeline: Pipeline that was run, names the files and labels the metrics.
+            directory: Reporting directory.
+
+        Returns:
+            The JSON and Prometheus file paths.
+        """
+        path: Path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+
+        json_path: Path = path / (
+            f"run_report_{pipeline}_{self.started_at.strftime(self.TIMESTAMP_FORMAT)}.json"
+        )
+        json_path.write_text(dumps({"pipeline": pipeline, **self.report()}, indent=2))
+
+        prometheus_path: Path = path / f"{pipeline}_pipeline.prom"
+        temporary_path: Path = prometheus_path.with_suffix(".prom.tmp")
+        temporary_path.write_text(self.to_prometheus(pipeline=pipeline))
+        replace(temporary_path, prometheus_path)
+
+        logger.info(f"Run report written to {json_path} and {prometheus_path}")
+        return json_path, prometheus_path
+
+
+# process-wide telemetry, shared by every instrumented component of a run
+telemetry: Telemetry = Telemetry()
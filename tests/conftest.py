@@ -0,0 +1,25 @@
+from collections.abc import Iterator
+from pathlib import Path
+from sqlite3 import connect
+
+import pytest
+from numpy import asarray, ndarray
+from pandas import DataFrame
+
+from src.utils.sqlite_conn import SQLiteConn
+
+TEST_FEATURES: list[str] = ["popularity", "vote_average", "vote_count"]
+
+
+def to_numpy(X: DataFrame) -> ndarray:
+    """Preprocessing of the test models, the numeric test features as a float matrix."""
+    return asarray(X[TEST_FEATURES].to_numpy(dtype=float))
+
+
+@pytest.fixture
+def sqlite_store(tmp_path: Path) -> Iterator[SQLiteConn]:
+    """Feature store in a fresh SQLite database, closed after the test."""
+    db_path = tmp_path / "feature_store.sqlite"
+    connect(db_path).close()
+    with SQLiteConn(str(db_path)) as store:
+        yield store
@@ -0,0 +1,14 @@
+import pytest
+
+from src.data.synthetic_movies import CatalogueProfile, SyntheticMovieGenerator
+
+
+@pytest.fixture(scope="package")
+def profile() -> CatalogueProfile:
+    """Fit the catalogue profile once from the raw snapshots."""
+    return CatalogueProfile.from_parquet()
+
+
+@pytest.fixture
+def generator(profile: CatalogueProfile) -> SyntheticMovieGenerator:
+    return SyntheticMovieGenerator(profile, seed=0)
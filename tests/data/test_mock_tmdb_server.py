@@ -0,0 +1,72 @@
+from collections.abc import Generator
+
+import pytest
+import requests
+
+from src.data.mock_tmdb_server import MockTMDbConfig, MockTMDbServer
+from src.data.synthetic_movies import SyntheticMovieGenerator
+from src.pipelines.feature_pipeline.movies_client import MoviesAPIClient, MoviesAPIConfig
+
+TEST_TOKEN: str = "dummy_token"  # noqa: S105
+TEST_ROWS: int = 200
+TEST_PAGE_SIZE: int = 20
+TEST_PAGES: int = 2
+HEADERS: dict[str, str] = {"Authorization": f"Bearer {TEST_TOKEN}"}
+
+
+@pytest.fixture
+def server(generator: SyntheticMovieGenerator) -> Generator[MockTMDbServer]:
+    config = MockTMDbConfig(page_size=TEST_PAGE_SIZE)
+    with MockTMDbServer(generator.generate(TEST_ROWS), generator, config) as mock_server:
+        yield mock_server
+
+
+def test_discover_pages(server: MockTMDbServer) -> None:
+    """Test discover pages are sorted by release date and cover the catalogue."""
+    response = requests.get(f"{server.base_url}/discover/movie?page=2", headers=HEADERS, timeout=5)
+    data = response.json()
+
+    assert response.status_code == MockTMDbServer.HTTP_OKAY
+    assert data["total_results"] == TEST_ROWS
+    assert len(data["results"]) == TEST_PAGE_SIZE
+    dates = [movie["release_date"] for movie in data["results"]]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_details_and_errors(server: MockTMDbServer) -> None:
+    """Test movie details, unknown movies and missing credentials."""
+    details = requests.get(f"{server.base_url}/movie/1", headers=HEADERS, timeout=5)
+    assert details.json()["id"] == 1
+
+    missing = requests.get(f"{server.base_url}/movie/999999", headers=HEADERS, timeout=5)
+    assert missing.status_code == MockTMDbServer.HTTP_NOT_FOUND
+
+    unauthorized = requests.get(f"{server.base_url}/movie/1", timeout=5)
+    assert unauthorized.status_code == MockTMDbServer.HTTP_UNAUTHORIZED
+    assert server.stats[("/3/movie/{id}", MockTMDbServer.HTTP_OKAY)] == 1
+
+
+def test_rate_limit(generator: SyntheticMovieGenerator) -> None:
+    """Test requests over the rate limit are throttled with a Retry-After header."""
+    config = MockTMDbConfig(rate_limit=1)
+    with MockTMDbServer(generator.generate(TEST_ROWS), generator, config) as server:
+        responses = [
+            requests.get(f"{server.base_url}/movie/1", headers=HEADERS, timeout=5) for _ in range(3)
+        ]
+
+    throttled = [r for r in responses if r.status_code == MockTMDbServer.HTTP_TOO_MANY_REQUESTS]
+    assert throttled
+    assert throttled[0].headers["Retry-After"] == str(MockTMDbServer.RETRY_AFTER)
+
+
+def test_client_against_mock(server: MockTMDbServer) -> None:
+    """Test the movies client fetches a full snapshot from the mock server."""
+    config = MoviesAPIConfig(
+        token=TEST_TOKEN, feature_group="movies", base_url=server.base_url, pages=TEST_PAGES
+    )
+    client = MoviesAPIClient(config).fetch_movie_extended_info().fetch_popular_movie_ids()
+
+    assert client.movies is not None
+    assert len(client.movies) == TEST_PAGES * TEST_PAGE_SIZE
+    assert client.movies["runtime"].notna().all()
+    assert server.stats[("/3/movie/{id}", MockTMDbServer.HTTP_OKAY)] == len(client.movies)
@@ -0,0 +1,47 @@
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src.data.synthetic_movies import CatalogueProfile, SyntheticMovieGenerator
+from src.pipelines.feature_pipeline.movies_client import MoviesAPIData
+
+TEST_ROWS: int = 500
+TEST_FIRST_ID: int = 1000
+
+
+def test_profile_requires_snapshots() -> None:
+    """Test fitting a profile without snapshot files fails."""
+    with pytest.raises(FileNotFoundError):
+        CatalogueProfile.from_parquet(paths=[])
+
+
+def test_generate(generator: SyntheticMovieGenerator, profile: CatalogueProfile) -> None:
+    """Test generated movies have unique ids and values within the observed ranges."""
+    movies = generator.generate(TEST_ROWS, first_id=TEST_FIRST_ID)
+
+    assert len(movies) == TEST_ROWS
+    assert movies["id"].is_unique
+    assert movies["id"].min() == TEST_FIRST_ID
+    for col in ("popularity", "vote_average", "budget"):
+        quantiles = profile.quantiles[col]
+        assert movies[col].between(quantiles[0] - 1, quantiles[-1] + 1).all()
+    assert set(movies["status"]) <= set(profile.categories["status"][0])
+    assert all(isinstance(genres, list) for genres in movies["genres"])
+
+
+def test_generate_is_reproducible(profile: CatalogueProfile) -> None:
+    """Test the same seed generates the same catalogue."""
+    first = SyntheticMovieGenerator(profile, seed=1).generate(TEST_ROWS)
+    second = SyntheticMovieGenerator(profile, seed=1).generate(TEST_ROWS)
+    assert_frame_equal(first, second)
+
+
+def test_payloads(generator: SyntheticMovieGenerator) -> None:
+    """Test generated movies render as valid TMDb payloads."""
+    movies = generator.generate(TEST_ROWS)
+
+    results = generator.discover_results(movies)
+    assert [MoviesAPIData(**result).id for result in results] == movies["id"].tolist()
+
+    details = generator.movie_details(movies.to_dict("records")[0])
+    assert [genre["name"] for genre in details["genres"]] == movies["genres"].iloc[0]
+    assert all("id" in genre for genre in details["genres"])
@@ -0,0 +1,135 @@
+from json import loads
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+from pyarrow.parquet import write_table
+
+from src.pipelines.backfill_pipeline.pipeline import (
+    BackfillPipelineConfig,
+    MovieBackfillPipeline,
+)
+from src.utils.sqlite_conn import SQLiteConn
+
+TEST_FEATURE_GROUP: str = "movies"
+
+
+def write_snapshot(path: Path, ids: list[int], popularity: float) -> str:
+    """Write a raw snapshot with the API schema (lists as Arrow lists)."""
+    write_table(
+        pa.table(
+            {
+                "id": ids,
+                "adult": [False] * len(ids),
+                "original_title": [f"Movie {i}" for i in ids],
+                "popularity": [popularity] * len(ids),
+                "vote_count": [10] * len(ids),
+                "release_date": ["2025-05-06", ""] + ["2020-01-01"] * (len(ids) - 2),
+                "is_popular": [True] * len(ids),
+                "budget": [1_000_000.0] * len(ids),
+                "genres": [["Acción", 'Quote"d'], None] + [[]] * (len(ids) - 2),
+                "keywords": [["unused"]] * len(ids),
+            }
+        ),
+        path,
+    )
+    return str(path)
+
+
+def stored_movies(sqlite_store: SQLiteConn) -> dict[int, tuple]:
+    with sqlite_store.reader() as conn:
+        rows = conn.execute(
+            f"SELECT id, popularity, extraction_date FROM {TEST_FEATURE_GROUP}"  # noqa: S608
+        ).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+
+def test_invalid_config() -> None:
+    with pytest.raises(ValueError, match="Invalid load type"):
+        BackfillPipelineConfig(feature_group=TEST_FEATURE_GROUP, paths=["a.parquet"], type="full")
+    with pytest.raises(ValueError, match="No snapshot files found"):
+        BackfillPipelineConfig(feature_group=TEST_FEATURE_GROUP, paths=[])
+
+
+def test_store_schema(tmp_path: Path) -> None:
+    """Test snapshot batches are converted to the feature store columns and formats."""
+    path = write_snapshot(tmp_path / "movies_dataset_2025-05-07.parquet", [1, 2, 3], 1.0)
+    table = pa.parquet.read_table(path)
+    batch = MovieBackfillPipeline(
+        BackfillPipelineConfig(feature_group=TEST_FEATURE_GROUP, paths=[path])
+    ).to_store_schema(table.to_batches()[0], "2025-05-07")
+
+    assert batch.schema.names == list(MovieBackfillPipeline.COLUMNS)
+    movies = batch.to_pylist()
+    assert loads(movies[0]["genres"]) == ["Acción", 'Quote"d']
+    assert [movie["genres"] for movie in movies[1:]] == ["[]", "[]"]
+    assert movies[0]["spoken_languages"] == "[]"
+    assert [movie["release_date"] for movie in movies[:2]] == ["2025-05-06 00:00:00", None]
+    assert movies[0]["budget"] == 1_000_000  # noqa: PLR2004
+    assert movies[0]["adult"] == 0
+    assert movies[0]["extraction_date"] == "2025-05-07"
+
+
+def test_parse_list_strings() -> None:
+    """Test lists stored as their numpy repr are parsed."""
+    lists = MovieBackfillPipeline.parse_list_strings(
+        pa.array(["['Acción' 'Crimen']", "['Drama']", "[]", None])
+    )
+    assert lists.to_pylist() == [["Acción", "Crimen"], ["Drama"], None, None]
+
+
+def test_latest_snapshot_wins(tmp_path: Path, sqlite_store: SQLiteConn) -> None:
+    """Test movies are deduplicated by id keeping the latest extraction date."""
+    newer = write_snapshot(tmp_path / "movies_dataset_2025-05-12.parquet", [2, 3, 4], 2.0)
+    older = write_snapshot(tmp_path / "movies_dataset_2025-05-07.parquet", [1, 2, 3], 1.0)
+    config = BackfillPipelineConfig(
+        feature_group=TEST_FEATURE_GROUP, paths=[newer, older], batch_size=2
+    )
+
+    stored = MovieBackfillPipeline(config).run(sqlite_store)
+
+    assert stored == 4  # noqa: PLR2004
+    assert stored_movies(sqlite_store) == {
+        1: (1.0, "2025-05-07"),
+        2: (2.0, "2025-05-12"),
+        3: (2.0, "2025-05-12"),
+        4: (2.0, "2025-05-12"),
+    }
+    genres = sqlite_store.query_features(TEST_FEATURE_GROUP, ["id", "genres"])
+    assert genres.set_index("id")["genres"][2] == ["Acción", 'Quote"d']
+
+
+def test_incremental_upsert(tmp_path: Path, sqlite_store: SQLiteConn) -> None:
+    """Test incremental loads add versions, the latest one is read, reloads replace theirs."""
+    first = write_snapshot(tmp_path / "movies_dataset_2025-05-11.parquet", [1, 2, 3], 1.0)
+    MovieBackfillPipeline(
+        BackfillPipelineConfig(feature_group=TEST_FEATURE_GROUP, paths=[first])
+    ).run(sqlite_store)
+
+    newer = write_snapshot(tmp_path / "movies_dataset_2025-05-12.parquet", [3, 4, 5], 2.0)
+    older = write_snapshot(tmp_path / "movies_dataset_2025-05-07.parquet", [1, 6, 7], 0.5)
+    incremental = BackfillPipelineConfig(
+        feature_group=TEST_FEATURE_GROUP, paths=[newer, older], type="incremental"
+    )
+    stored = MovieBackfillPipeline(incremental).run(sqlite_store)
+
+    current = sqlite_store.query_features(
+        TEST_FEATURE_GROUP, ["id", "popularity", "extraction_date"]
+    ).set_index("id")
+    assert stored == 6  # noqa: PLR2004
+    assert sorted(current.index) == [1, 2, 3, 4, 5, 6, 7]
+    assert current.loc[1].tolist() == [1.0, "2025-05-11"]  # stored version is newer
+    assert current.loc[3].tolist() == [2.0, "2025-05-12"]
+
+    assert MovieBackfillPipeline(incremental).run(sqlite_store) == 6  # noqa: PLR2004
+    with sqlite_store.reader() as conn:
+        versions = conn.execute(
+            f"SELECT id, extraction_date FROM {TEST_FEATURE_GROUP} "  # noqa: S608
+            "WHERE id IN (1, 3) ORDER BY id, extraction_date"
+        ).fetchall()
+    assert versions == [
+        (1, "2025-05-07"),
+        (1, "2025-05-11"),
+        (3, "2025-05-11"),
+        (3, "2025-05-12"),
+    ]
@@ -0,0 +1,148 @@
+from collections.abc import Callable
+from json import loads
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from numpy import array, eye
+from numpy.testing import assert_array_equal
+from pandas import DataFrame
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+from src.pipelines.evaluation_pipeline.pipeline import (
+    EvaluationPipelineConfig,
+    MovieEvaluationPipeline,
+)
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.recommender_models import RecommenderModelConfig, euclidean_similarity
+from tests.conftest import TEST_FEATURES, to_numpy
+
+TEST_FEATURE_GROUP: str = "test_movies"
+TEST_K: int = 2
+TEST_MOVIES: int = 6
+
+
+@pytest.fixture
+def feature_store() -> MagicMock:
+    """Create mock feature store returning six movies with genres."""
+    movies = DataFrame(
+        {
+            "id": [1, 2, 3, 4, 5, 6],
+            "popularity": [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+            "vote_average": [7.5, 8.0, 6.0, 5.5, 7.0, 6.5],
+            "vote_count": [100, 200, 300, 400, 500, 600],
+            "genres": [["Drama"], ["Drama", "Comedy"], ["Comedy"], ["Action"], [], ["Action"]],
+        }
+    )
+    mock = MagicMock(spec=FeatureStoreInterface)
+    mock.query_features.side_effect = lambda feature_group, columns: movies[columns]
+    return mock
+
+
+def model_config(
+    feature_store: MagicMock,
+    name: str,
+    model: Callable,
+    embedding_group: str | None,
+    top_k: int | None = None,
+) -> RecommenderModelConfig:
+    return RecommenderModelConfig(
+        model_name=name,
+        feature_store=feature_store,
+        training_feature_group=TEST_FEATURE_GROUP,
+        similarity_matrix_group=f"{name}_similarity",
+        required_features=TEST_FEATURES,
+        transformation_pipeline=Pipeline(steps=[("to_numpy", FunctionTransformer(to_numpy))]),
+        model=model,
+        embedding_group=embedding_group,
+        top_k=top_k,
+    )
+
+
+def test_invalid_config(feature_store: MagicMock) -> None:
+    """Test models and k validation."""
+    with pytest.raises(ValueError, match=EvaluationPipelineConfig.ERR_NO_MODELS):
+        EvaluationPipelineConfig(models=[])
+    with pytest.raises(ValueError, match="k must be at least"):
+        EvaluationPipelineConfig(
+            models=[model_config(feature_store, "cosine", cosine_similarity, "embeddings")], k=1
+        )
+
+
+def test_list_metrics() -> None:
+    """Test the neighbour list metrics on hand computed lists."""
+    neighbours = array([[1, 2], [0, 2], [0, 1]])
+    genres = csr_matrix(array([[1, 0], [1, 1], [0, 0]]))
+
+    half: float = 0.5
+    assert MovieEvaluationPipeline.coverage(array([[1, 2], [2, 1], [1, 2]]), 3) == 2 / 3
+    assert MovieEvaluationPipeline.intra_list_diversity(neighbours, eye(3)) == 1.0
+    assert MovieEvaluationPipeline.intra_list_diversity(neighbours, eye(3)[[0, 0, 0]]) == 0.0
+    # sparse vectors, e.g. hashed text, give the same diversity without being densified
+    assert MovieEvaluationPipeline.intra_list_diversity(neighbours, csr_matrix(eye(3))) == 1.0
+    assert MovieEvaluationPipeline.popularity_bias(neighbours, array([0.2, 0.4, 0.6])) == (
+        pytest.approx(0.4)
+    )
+    # the third movie has no genres, the first shares one with the second only
+    assert MovieEvaluationPipeline.genre_overlap(neighbours, genres) == half
+    assert MovieEvaluationPipeline.neighbour_overlap(neighbours, neighbours[:, ::-1]) == 1.0
+    other = array([[1, 0], [2, 2], [1, 2]])
+    assert MovieEvaluationPipeline.neighbour_overlap(neighbours, other) == half
+
+
+def test_matrix_top_k() -> None:
+    """Test similarity matrix rows are ranked best first, excluding the movie itself."""
+    similarities = array([[1.0, 0.2, 0.9, 0.5], [0.2, 1.0, 0.1, 0.3], [0.9, 0.1, 1.0, 0.4]])
+
+    assert_array_equal(
+        MovieEvaluationPipeline.matrix_top_k(similarities, array([0, 1, 2]), TEST_K),
+        [[2, 3], [3, 0], [0, 3]],
+    )
+
+
+def test_run(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test kernel and similarity matrix models are compared and the report written."""
+    config = EvaluationPipelineConfig(
+        models=[
+            model_config(feature_store, "cosine", cosine_similarity, "embeddings"),
+            model_config(feature_store, "euclidean", euclidean_similarity, None),
+        ],
+        feature_group=TEST_FEATURE_GROUP,
+        k=TEST_K,
+        latency_queries=3,
+        report_dir=str(tmp_path),
+    )
+    pipeline = MovieEvaluationPipeline(config).run()
+
+    summary = pipeline.summary()
+    assert summary.index.tolist() == ["cosine", "euclidean"]
+    assert ((summary["coverage"] > 0) & (summary["coverage"] <= 1)).all()
+    assert (summary["latency_ms_p99"] >= summary["latency_ms_p50"]).all()
+    assert summary.loc["euclidean", "output_bytes"] == TEST_MOVIES * TEST_MOVIES * 8
+    assert pipeline.report["movies"] == TEST_MOVIES
+    assert list(pipeline.report["neighbour_overlap"]) == ["cosine | euclidean"]
+
+    json_path, csv_path = pipeline.write()
+    assert loads(json_path.read_text())["models"].keys() == {"cosine", "euclidean"}
+    assert csv_path.read_text().startswith("model,fit_seconds")
+
+
+def test_run_top_k_neighbours(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test models storing their top k neighbours are served from them."""
+    config = EvaluationPipelineConfig(
+        models=[
+            model_config(feature_store, "cosine", cosine_similarity, "embeddings"),
+            model_config(feature_store, "neighbours", cosine_similarity, None, top_k=TEST_K),
+        ],
+        feature_group=TEST_FEATURE_GROUP,
+        k=TEST_K,
+        latency_queries=3,
+        report_dir=str(tmp_path),
+    )
+    pipeline = MovieEvaluationPipeline(config).run()
+
+    assert pipeline.report["neighbour_overlap"] == {"cosine | neighbours": 1.0}
+    assert pipeline.summary().loc["neighbours", "output_bytes"] > 0
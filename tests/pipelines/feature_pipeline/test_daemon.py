@@ -0,0 +1,153 @@
+from collections.abc import Iterator
+from itertools import count
+from re import escape
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pandas import DataFrame
+
+from src.pipelines.feature_pipeline.daemon import DaemonConfig, FeatureIngestDaemon
+from src.pipelines.feature_pipeline.movies_client import MoviesAPIClient, NoMoviesError
+from src.pipelines.feature_pipeline.pipeline import FeaturePipelineConfig
+from src.utils.feature_store_interface import FeatureStoreInterface
+
+TEST_FEATURE_GROUP: str = "test_movies"
+TEST_CYCLES: int = 3
+
+
+@pytest.fixture
+def config() -> FeaturePipelineConfig:
+    return FeaturePipelineConfig(
+        api_token="dummy_token",  # noqa: S106
+        feature_group=TEST_FEATURE_GROUP,
+        type="incremental",
+    )
+
+
+@pytest.fixture
+def feature_store() -> MagicMock:
+    mock = MagicMock(spec=FeatureStoreInterface)
+    mock.fetch_existing_movie_ids.return_value = {1, 2, 3}
+    mock.fetch_watermark.return_value = None
+    return mock
+
+
+@pytest.fixture
+def mock_client() -> Iterator[MagicMock]:
+    """Mock API client storing one new movie per cycle, ids 4, 5, ..."""
+    client = MagicMock(spec=MoviesAPIClient)
+    client.fetch_popular_movie_ids.return_value = client
+    client.fetch_movie_extended_info.return_value = client
+    client.watermark = None
+    ids = count(4)
+
+    def store(_: FeatureStoreInterface) -> MagicMock:
+        client.movies = DataFrame({"id": [next(ids)]})
+        return client
+
+    client.store_movies_features.side_effect = store
+    with patch("src.pipelines.feature_pipeline.pipeline.MoviesAPIClient") as mock:
+        mock.return_value = client
+        yield mock
+
+
+def daemon(
+    config: FeaturePipelineConfig, feature_store: MagicMock, **daemon_config: int
+) -> FeatureIngestDaemon:
+    return FeatureIngestDaemon(
+        config,
+        DaemonConfig(interval=0.001, jitter=0.0, report_dir=None, **daemon_config),
+        feature_store,
+    )
+
+
+def test_invalid_config(config: FeaturePipelineConfig, feature_store: MagicMock) -> None:
+    with pytest.raises(ValueError, match="interval must be positive"):
+        DaemonConfig(interval=0)
+    with pytest.raises(ValueError, match="jitter must be in"):
+        DaemonConfig(jitter=1.0)
+    with pytest.raises(ValueError, match="max_cycles must be at least 1"):
+        DaemonConfig(max_cycles=0)
+    config.type = "initial"
+    with pytest.raises(ValueError, match="runs incremental loads"):
+        FeatureIngestDaemon(config, DaemonConfig(), feature_store)
+
+
+def test_serve(
+    config: FeaturePipelineConfig, feature_store: MagicMock, mock_client: MagicMock
+) -> None:
+    """Test cycles share the session and the ids, read from the store once."""
+    ingest_daemon = daemon(config, feature_store, max_cycles=TEST_CYCLES)
+
+    assert ingest_daemon.serve() == TEST_CYCLES
+
+    feature_store.fetch_existing_movie_ids.assert_called_once_with(TEST_FEATURE_GROUP)
+    assert ingest_daemon.pipeline.existing_ids == {1, 2, 3, 4, 5, 6}
+    known_ids = [call.args[1] for call in mock_client.call_args_list]
+    assert known_ids[0] is ingest_daemon.pipeline.existing_ids
+    sessions = {call.args[0].session for call in mock_client.call_args_list}
+    assert sessions == {ingest_daemon.session}
+
+
+def test_no_new_movies(
+    config: FeaturePipelineConfig, feature_store: MagicMock, mock_client: MagicMock
+) -> None:
+    """Test cycles without new movies are not failures."""
+    mock_client.side_effect = NoMoviesError(MoviesAPIClient.ERR_NO_MOVIES)
+    ingest_daemon = daemon(config, feature_store, max_cycles=TEST_CYCLES, max_failures=1)
+
+    assert ingest_daemon.serve() == TEST_CYCLES
+    assert ingest_daemon.pipeline.existing_ids == {1, 2, 3}
+
+    mock_client.side_effect = ValueError(MoviesAPIClient.ERR_NO_MOVIES)
+    ingest_daemon = daemon(config, feature_store, max_failures=1)
+    with pytest.raises(ValueError, match=MoviesAPIClient.ERR_NO_MOVIES):
+        ingest_daemon.serve()
+
+
+def test_popular_pages(
+    config: FeaturePipelineConfig, feature_store: MagicMock, mock_client: MagicMock
+) -> None:
+    """Test cycles only request a few popular list pages."""
+    config.popular_pages = 400
+    ingest_daemon = daemon(config, feature_store, max_cycles=1)
+    ingest_daemon.serve()
+
+    assert mock_client.call_args.args[0].popular_pages == DaemonConfig.popular_pages
+    assert config.popular_pages == 400  # noqa: PLR2004
+    with pytest.raises(
+        ValueError, match=escape(DaemonConfig.ERR_INVALID_LIMIT.format("popular_pages", 0))
+    ):
+        DaemonConfig(popular_pages=0)
+
+
+def test_failures(
+    config: FeaturePipelineConfig, feature_store: MagicMock, mock_client: MagicMock
+) -> None:
+    """Test failed cycles are retried, until too many fail in a row."""
+    mock_client.side_effect = [ConnectionError(), mock_client.return_value, ConnectionError()]
+    ingest_daemon = daemon(config, feature_store, max_cycles=TEST_CYCLES, max_failures=2)
+    assert ingest_daemon.serve() == TEST_CYCLES
+
+    mock_client.side_effect = ConnectionError()
+    ingest_daemon = daemon(config, feature_store, max_failures=2)
+    with pytest.raises(ConnectionError):
+        ingest_daemon.serve()
+    assert ingest_daemon.cycles == 2  # noqa: PLR2004
+
+
+def test_stop(
+    config: FeaturePipelineConfig, feature_store: MagicMock, mock_client: MagicMock
+) -> None:
+    """Test a stop request lets the running cycle complete and stops before the next."""
+    ingest_daemon = daemon(config, feature_store)
+    client: MagicMock = mock_client.return_value
+
+    def stop_while_fetching() -> MagicMock:
+        ingest_daemon.stop()
+        return client
+
+    client.fetch_movie_extended_info.side_effect = stop_while_fetching
+
+    assert ingest_daemon.serve() == 1
+    assert ingest_daemon.pipeline.existing_ids == {1, 2, 3, 4}
@@ -1,4 +1,7 @@
 from collections.abc import Generator
+from gzip import GzipFile
+from json import dumps, loads
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -7,6 +10,9 @@ from src.pipelines.feature_pipeline.movies_client import (
     MoviesAPIClient,
     MoviesAPIConfig,
 )
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.raw_landing import RawLandingZone
+from src.utils.telemetry import telemetry
 
 TEST_TOKEN: str = "dummy_token"  # noqa: S105
 TEST_FEATURE_GROUP: str = "test_movies"
@@ -21,6 +27,7 @@ def config() -> MoviesAPIConfig:
         token=TEST_TOKEN,
         feature_group=TEST_FEATURE_GROUP,
         pages=1,
+        popular_pages=1,
         timeout=1,
     )
 
@@ -191,3 +198,214 @@ def test_skip_existing_movies(
 
     with pytest.raises(ValueError, match=MoviesAPIClient.ERR_NO_MOVIES):
         MoviesAPIClient(config, existing_ids=existing_ids)
+
+
+@patch("src.pipelines.feature_pipeline.movies_client.sleep")
+def test_throttled_requests_are_retried(
+    mock_sleep: MagicMock,
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    mock_base_response: MagicMock,
+) -> None:
+    """Test throttled requests wait for Retry-After and are retried."""
+    throttled = MagicMock()
+    throttled.status_code = 429
+    throttled.headers = {"Retry-After": "2"}
+    mock_get.side_effect = [throttled, mock_base_response]
+
+    client = MoviesAPIClient(config)
+
+    assert client.movies is not None
+    assert len(client.movies) == 1
+    mock_sleep.assert_called_once_with(2.0)
+
+
+@patch("src.pipelines.feature_pipeline.movies_client.sleep")
+def test_throttled_requests_give_up(
+    mock_sleep: MagicMock, mock_get: MagicMock, config: MoviesAPIConfig
+) -> None:
+    """Test requests still throttled after the retries are skipped."""
+    throttled = MagicMock()
+    throttled.status_code = 429
+    throttled.headers = {}
+    mock_get.return_value = throttled
+
+    with pytest.raises(ValueError, match=MoviesAPIClient.ERR_NO_MOVIES):
+        MoviesAPIClient(config)
+    assert mock_get.call_count == config.max_retries + 1
+    assert mock_sleep.call_count == config.max_retries
+
+
+def test_requests_are_counted(
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    mock_base_response: MagicMock,
+) -> None:
+    """Test every request is counted by endpoint and status."""
+    mock_get.return_value = mock_base_response
+    telemetry.reset()
+
+    MoviesAPIClient(config)
+
+    assert telemetry.counters[
+        ("http_requests_total", (("endpoint", "discover"), ("status", "200")))
+    ]
+    assert telemetry.stages["tmdb.build_movie_base"]["calls"] == 1
+
+
+def test_refresh_movies(
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    mock_extended_response: MagicMock,
+) -> None:
+    """Test refreshes fetch the details of the given movies only, skipping failures."""
+    mock_extended_response.json.return_value["popularity"] = 12.5
+    error_response = MagicMock()
+    error_response.status_code = 500
+    mock_get.side_effect = [mock_extended_response, error_response]
+    feature_store = MagicMock(spec=FeatureStoreInterface)
+
+    client = MoviesAPIClient(config, refresh_ids=[7, 8]).update_movies_features(feature_store)
+
+    assert mock_get.call_count == 2  # noqa: PLR2004
+    assert client.movies is not None
+    assert client.movies["id"].tolist() == [7]
+    assert client.movies["popularity"].tolist() == [12.5]
+    assert client.movies["genres"].tolist() == [["Action"]]
+    stored = feature_store.update_features.call_args.args[1]
+    assert "extraction_date" in stored.columns
+
+
+def test_update_popular_movies(
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    mock_popular_response: MagicMock,
+) -> None:
+    """Test popularity refreshes only request the popular list pages."""
+    config.popular_pages = 3
+    mock_get.return_value = mock_popular_response
+    feature_store = MagicMock(spec=FeatureStoreInterface)
+    feature_store.update_popular_movies.return_value = 2
+
+    client = (
+        MoviesAPIClient(config, popularity_only=True)
+        .fetch_popular_movie_ids()
+        .update_popular_movies(feature_store)
+    )
+
+    assert mock_get.call_count == 3  # noqa: PLR2004
+    assert all("/movie/popular" in call.args[0] for call in mock_get.call_args_list)
+    assert client.movies is None
+    feature_store.update_popular_movies.assert_called_once_with(TEST_FEATURE_GROUP, {1, 2})
+
+
+def test_update_popular_movies_incomplete(
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    mock_popular_response: MagicMock,
+) -> None:
+    """Test popular flags are kept when a popular page fails."""
+    config.popular_pages = 2
+    error_response = MagicMock()
+    error_response.status_code = 500
+    mock_get.side_effect = [mock_popular_response, error_response]
+    feature_store = MagicMock(spec=FeatureStoreInterface)
+
+    client = MoviesAPIClient(config, popularity_only=True).fetch_popular_movie_ids()
+
+    with pytest.raises(ValueError, match="1 of 2 pages failed"):
+        client.update_popular_movies(feature_store)
+    feature_store.update_popular_movies.assert_not_called()
+
+
+def test_responses_are_landed(
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    mock_base_response: MagicMock,
+    mock_extended_response: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Test successful responses are landed raw, by endpoint."""
+    error_response = MagicMock()
+    error_response.status_code = 500
+    for response in (mock_base_response, mock_extended_response):
+        response.content = dumps(response.json.return_value).encode()
+    mock_get.side_effect = [mock_base_response, error_response, mock_extended_response]
+
+    with RawLandingZone(str(tmp_path)) as landing:
+        MoviesAPIClient(config, landing=landing).fetch_popular_movie_ids()
+        MoviesAPIClient(config, refresh_ids=[1], landing=landing)
+
+    assert [landing.endpoint(path) for path in landing.files()] == ["details", "discover"]
+    with GzipFile(landing.files("discover")[0]) as file:
+        (response,) = [loads(line) for line in file]
+    assert response["endpoint"] == "discover"
+    assert response["body"] == mock_base_response.json.return_value
+
+
+def discover_pages(mock_get: MagicMock, released: list[str | None], ids: list[int]) -> None:
+    """Serve a discover page per release date, newest first, one movie each."""
+
+    def get(url: str, **_: object) -> MagicMock:
+        page = int(url.rsplit("page=", 1)[1])
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {
+            "results": [
+                {
+                    "id": ids[page - 1],
+                    "adult": False,
+                    "original_language": "en",
+                    "original_title": f"Movie {page}",
+                    "overview": "",
+                    "popularity": 1.0,
+                    "vote_average": 7.0,
+                    "vote_count": 10,
+                    "release_date": released[page - 1],
+                }
+            ]
+        }
+        return response
+
+    mock_get.side_effect = get
+
+
+@pytest.mark.parametrize(
+    ("watermark", "existing_ids", "pages_read"),
+    [
+        (None, None, 6),  # full loads crawl every page
+        ("2024-05-20", {99}, 4),  # stops at the first page 7 days before the watermark
+        (None, {99}, 6),
+    ],
+)
+def test_incremental_crawl_watermark(
+    mock_get: MagicMock,
+    config: MoviesAPIConfig,
+    watermark: str | None,
+    existing_ids: set[int] | None,
+    pages_read: int,
+) -> None:
+    """Test incremental crawls stop past the release date watermark, less the lookback."""
+    config.pages, config.watermark = 6, watermark
+    released = ["2999-01-01", "2024-06-01", "2024-05-15", "2024-05-01", "2024-04-01", None]
+    discover_pages(mock_get, released, ids=[1, 2, 3, 4, 5, 6])
+
+    client = MoviesAPIClient(config, existing_ids=existing_ids)
+
+    assert mock_get.call_count == pages_read
+    assert client.movies is not None
+    assert len(client.movies) == pages_read
+    # upcoming releases don't move the watermark
+    assert client.watermark == "2024-06-01"
+
+
+def test_incremental_crawl_known_pages(mock_get: MagicMock, config: MoviesAPIConfig) -> None:
+    """Test incremental crawls stop after consecutive pages of stored movies."""
+    config.pages = 10
+    discover_pages(mock_get, [None] * 10, ids=[1, 2, 10, 3, 4, 5, 6, 7, 8, 9])
+
+    client = MoviesAPIClient(config, existing_ids={1, 2, 3, 4, 5})
+
+    assert mock_get.call_count == 6  # noqa: PLR2004
+    assert client.movies is not None
+    assert client.movies["id"].tolist() == [10]
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock
+from datetime import date
+from unittest.mock import MagicMock, patch
 
 import pytest
 from pandas import DataFrame
@@ -17,6 +18,7 @@ from src.utils.feature_store_interface import FeatureStoreInterface
 TEST_TOKEN: str = "dummy_token"  # noqa: S105
 TEST_FEATURE_GROUP: str = "test_movies"
 TEST_PAGES: int = 1
+TEST_REQUEST_BUDGET: int = 25
 
 
 @pytest.fixture
@@ -24,6 +26,7 @@ def feature_store() -> MagicMock:
     """Create mock feature store."""
     mock = MagicMock(spec=FeatureStoreInterface)
     mock.fetch_existing_movie_ids.return_value = {1, 2, 3}  # Simulate existing movies
+    mock.fetch_watermark.return_value = "2025-04-01"
     return mock
 
 
@@ -82,6 +85,7 @@ def test_pipeline_initial_load(
     mock_client.fetch_popular_movie_ids.return_value = mock_client
     mock_client.fetch_movie_extended_info.return_value = mock_client
     mock_client.store_movies_features.return_value = mock_client
+    mock_client.watermark = None
 
     # Mock client creation
     def mock_init(config: MoviesAPIConfig, existing_ids: set[int] | None = None) -> MagicMock:
@@ -115,26 +119,39 @@ def test_pipeline_incremental_load(
     mock_client.fetch_popular_movie_ids.return_value = mock_client
     mock_client.fetch_movie_extended_info.return_value = mock_client
     mock_client.store_movies_features.return_value = mock_client
-
-    # Mock client creation
-    def mock_init(config: MoviesAPIConfig, existing_ids: set[int] | None = None) -> MagicMock:
-        assert existing_ids == {1, 2, 3}  # Should match feature store mock
+    mock_client.movies = DataFrame({"id": [4, 5]})
+    mock_client.watermark = "2025-05-01"
+    known_ids: list[set[int]] = []
+    watermarks: list[str | None] = []
+
+    # Mock client creation, recording the ids and watermark known to each client
+    def mock_new(
+        cls: type, config: MoviesAPIConfig, existing_ids: set[int] | None = None, **_: object
+    ) -> MagicMock:
+        known_ids.append(set(existing_ids or ()))
+        watermarks.append(config.watermark)
         return mock_client
 
-    monkeypatch.setattr(MoviesAPIClient, "__init__", mock_init)
-    monkeypatch.setattr(MoviesAPIClient, "__new__", lambda cls, *args, **kwargs: mock_client)
+    monkeypatch.setattr(MoviesAPIClient, "__new__", mock_new)
 
-    # Execute pipeline
+    # Execute pipeline twice, as the ingest daemon does
     pipeline = MovieFeaturePipeline(incremental_config)
     pipeline.run(feature_store)
+    pipeline.run(feature_store)
 
-    # Verify feature store was queried for existing IDs
+    # Verify feature store was queried for existing IDs once, then extended in memory
     feature_store.fetch_existing_movie_ids.assert_called_once_with(TEST_FEATURE_GROUP)
+    assert known_ids == [{1, 2, 3}, {1, 2, 3, 4, 5}]
+    # Verify the watermark was read once, and stored once it moved
+    feature_store.fetch_watermark.assert_called_once_with(TEST_FEATURE_GROUP, "release_date")
+    assert watermarks == ["2025-04-01", "2025-05-01"]
+    feature_store.store_watermark.assert_called_once_with(
+        TEST_FEATURE_GROUP, "release_date", "2025-05-01"
+    )
 
     # Verify client method calls
-    mock_client.fetch_popular_movie_ids.assert_called_once()
-    mock_client.fetch_movie_extended_info.assert_called_once()
-    mock_client.store_movies_features.assert_called_once_with(feature_store)
+    assert mock_client.fetch_movie_extended_info.call_count == 2  # noqa: PLR2004
+    mock_client.store_movies_features.assert_called_with(feature_store)
 
 
 def test_pipeline_config_validation(initial_config: FeaturePipelineConfig) -> None:
@@ -150,3 +167,88 @@ def test_pipeline_config_validation(initial_config: FeaturePipelineConfig) -> No
             feature_group=TEST_FEATURE_GROUP,
             type="invalid",
         )
+
+
+def test_pipeline_refresh(feature_store: MagicMock) -> None:
+    """Test refreshes re-fetch the stale movies within the budget and update them."""
+    config = FeaturePipelineConfig(
+        api_token=TEST_TOKEN,
+        feature_group=TEST_FEATURE_GROUP,
+        type="refresh",
+        max_age_days=0,
+        request_budget=TEST_REQUEST_BUDGET,
+    )
+    feature_store.fetch_stale_movie_ids.return_value = [1, 2]
+
+    with patch("src.pipelines.feature_pipeline.pipeline.MoviesAPIClient") as mock_client:
+        MovieFeaturePipeline(config).run(feature_store)
+
+    _, extracted_before = feature_store.fetch_stale_movie_ids.call_args.args
+    assert extracted_before == date.today().isoformat()
+    assert feature_store.fetch_stale_movie_ids.call_args.kwargs == {"limit": TEST_REQUEST_BUDGET}
+    assert mock_client.call_args.kwargs == {
+        "refresh_ids": [1, 2],
+        "landing": None,
+    }
+    mock_client.return_value.update_movies_features.assert_called_once_with(feature_store)
+    feature_store.fetch_existing_movie_ids.assert_not_called()
+    feature_store.store_refresh_attempts.assert_called_once_with(
+        TEST_FEATURE_GROUP, [1, 2], date.today().isoformat()
+    )
+
+
+def test_failed_refresh_is_recorded(feature_store: MagicMock) -> None:
+    """Test the requested movies are recorded as attempted when none could be fetched."""
+    config = FeaturePipelineConfig(
+        api_token=TEST_TOKEN, feature_group=TEST_FEATURE_GROUP, type="refresh"
+    )
+    feature_store.fetch_stale_movie_ids.return_value = [1, 2]
+
+    with (
+        patch("src.pipelines.feature_pipeline.pipeline.MoviesAPIClient") as mock_client,
+        pytest.raises(ValueError, match=MoviesAPIClient.ERR_NO_MOVIES),
+    ):
+        mock_client.side_effect = ValueError(MoviesAPIClient.ERR_NO_MOVIES)
+        MovieFeaturePipeline(config).run(feature_store)
+
+    feature_store.store_refresh_attempts.assert_called_once_with(
+        TEST_FEATURE_GROUP, [1, 2], date.today().isoformat()
+    )
+
+
+def test_pipeline_refresh_nothing_stale(feature_store: MagicMock) -> None:
+    """Test refreshes without stale movies make no request."""
+    config = FeaturePipelineConfig(
+        api_token=TEST_TOKEN, feature_group=TEST_FEATURE_GROUP, type="refresh"
+    )
+    feature_store.fetch_stale_movie_ids.return_value = []
+
+    with patch("requests.get") as mock_get:
+        MovieFeaturePipeline(config).run(feature_store)
+
+    mock_get.assert_not_called()
+    feature_store.update_features.assert_not_called()
+
+
+def test_pipeline_popularity(feature_store: MagicMock) -> None:
+    """Test popularity loads only fetch the popular list and update the popular flags."""
+    config = FeaturePipelineConfig(
+        api_token=TEST_TOKEN,
+        feature_group=TEST_FEATURE_GROUP,
+        type="popularity",
+        popular_pages=TEST_PAGES,
+    )
+
+    with patch("src.pipelines.feature_pipeline.pipeline.MoviesAPIClient") as mock_client:
+        MovieFeaturePipeline(config).run(feature_store)
+
+    api_config, *_ = mock_client.call_args.args
+    assert api_config.popular_pages == TEST_PAGES
+    assert mock_client.call_args.kwargs == {
+        "popularity_only": True,
+        "landing": None,
+    }
+    client = mock_client.return_value.fetch_popular_movie_ids.return_value
+    client.update_popular_movies.assert_called_once_with(feature_store)
+    feature_store.insert.assert_not_called()
+    feature_store.fetch_existing_movie_ids.assert_not_called()
@@ -0,0 +1,243 @@
+from pathlib import Path
+from time import monotonic, sleep
+from unittest.mock import MagicMock
+
+import pytest
+from numpy.random import default_rng
+from pandas import DataFrame
+from sklearn.preprocessing import FunctionTransformer
+
+from src.pipelines.inference_pipeline.pipeline import (
+    InferencePipelineConfig,
+    MovieInferencePipeline,
+)
+from src.utils.embedding_store import (
+    Embeddings,
+    EmbeddingStore,
+    FittedPreprocessor,
+    RecommendationCache,
+)
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.model_registry import ModelRegistry
+
+TEST_EMBEDDING_GROUP: str = "test_embeddings"
+TEST_K: int = 3
+TEST_FEATURES: list[str] = ["a", "b", "c", "d"]
+
+
+@pytest.fixture
+def embedding_store(tmp_path: Path) -> EmbeddingStore:
+    """Create an embedding store holding random embeddings for movies 1 to 20."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save(
+        TEST_EMBEDDING_GROUP, Embeddings.from_features(range(1, 21), default_rng(0).random((20, 4)))
+    )
+    return store
+
+
+def test_invalid_kernel() -> None:
+    """Test kernel validation."""
+    with pytest.raises(ValueError, match="Invalid kernel"):
+        InferencePipelineConfig(embedding_group=TEST_EMBEDDING_GROUP, kernel="euclidean")
+
+
+@pytest.mark.parametrize("kernel", ["cosine", "linear"])
+def test_recommend(embedding_store: EmbeddingStore, kernel: str) -> None:
+    """Test recommendations are ranked per movie."""
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP,
+        kernel=kernel,
+        k=TEST_K,
+        embedding_store=embedding_store,
+    )
+    recommendations = MovieInferencePipeline(config).recommend([1, 5])
+
+    assert len(recommendations) == 2 * TEST_K
+    assert recommendations["movie_id"].tolist() == [1] * TEST_K + [5] * TEST_K
+    assert recommendations["rank"].tolist() == [1, 2, 3] * 2
+    assert not (recommendations["movie_id"] == recommendations["recommended_id"]).any()
+
+
+def test_recommend_with_metadata(embedding_store: EmbeddingStore) -> None:
+    """Test the metadata of the recommended movies is looked up by id."""
+    feature_store = MagicMock(spec=FeatureStoreInterface)
+    feature_store.get_features_by_ids.side_effect = lambda group, ids, columns: DataFrame(
+        {"id": ids, "original_title": [f"Movie {i}" for i in ids]}
+    )
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP,
+        k=TEST_K,
+        embedding_store=embedding_store,
+        feature_store=feature_store,
+    )
+    recommendations = MovieInferencePipeline(config).recommend([1])
+
+    assert recommendations["original_title"].tolist() == [
+        f"Movie {i}" for i in recommendations["recommended_id"]
+    ]
+    _, ids, columns = feature_store.get_features_by_ids.call_args.args
+    assert sorted(ids) == sorted(recommendations["recommended_id"].tolist())
+    assert columns == ["original_title"]
+
+
+def test_recommend_from_warm_cache(embedding_store: EmbeddingStore) -> None:
+    """Test warmed movies are served from the cache, the others scored, alike."""
+    embeddings = embedding_store.load(TEST_EMBEDDING_GROUP)
+    cache = RecommendationCache.build(embeddings, [1, 2], k=TEST_K + 1)
+    cache.scores[:] = 0  # tells cached answers apart
+    embedding_store.save_cache(TEST_EMBEDDING_GROUP, cache)
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP, k=TEST_K, embedding_store=embedding_store
+    )
+    pipeline = MovieInferencePipeline(config)
+
+    assert pipeline.cache is not None
+    recommendations = pipeline.recommend([1, 5, 2])
+    served = MovieInferencePipeline(
+        InferencePipelineConfig(
+            embedding_group=TEST_EMBEDDING_GROUP,
+            k=TEST_K,
+            embedding_store=embedding_store,
+            warm_cache=False,
+        )
+    ).recommend([1, 5, 2])
+    assert recommendations["recommended_id"].tolist() == served["recommended_id"].tolist()
+    assert (recommendations["score"] == 0).tolist() == [True] * TEST_K + [False] * TEST_K + [
+        True
+    ] * TEST_K
+
+
+def test_warm_cache_too_short(embedding_store: EmbeddingStore) -> None:
+    embeddings = embedding_store.load(TEST_EMBEDDING_GROUP)
+    embedding_store.save_cache(
+        TEST_EMBEDDING_GROUP, RecommendationCache.build(embeddings, [1], k=TEST_K - 1)
+    )
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP, k=TEST_K, embedding_store=embedding_store
+    )
+    assert MovieInferencePipeline(config).cache is None
+
+
+def store_preprocessor(embedding_store: EmbeddingStore) -> DataFrame:
+    """Store the identity on the test features as the fitted preprocessor.
+
+    Returns:
+        DataFrame: Features of the stored movies, with their id.
+    """
+    embeddings = embedding_store.load(TEST_EMBEDDING_GROUP)
+    features = DataFrame(default_rng(0).random((20, 4)), columns=TEST_FEATURES)
+    embedding_store.save_preprocessor(
+        TEST_EMBEDDING_GROUP,
+        FittedPreprocessor(
+            embeddings.fingerprint(), TEST_FEATURES, FunctionTransformer().fit(features)
+        ),
+    )
+    return features.assign(id=embeddings.ids)
+
+
+def test_recommend_features(embedding_store: EmbeddingStore) -> None:
+    """Test raw feature records are scored as the stored movies, in one batch."""
+    features = store_preprocessor(embedding_store)
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP, k=TEST_K, embedding_store=embedding_store
+    )
+    pipeline = MovieInferencePipeline(config)
+
+    stored = pipeline.recommend_features(features.iloc[[0, 4]].to_dict("records"))
+    assert stored.equals(pipeline.recommend([1, 5]))
+
+    # a new movie twin of movie 5, without id, has it as closest movie
+    new = pipeline.recommend_features(features.iloc[[4]].drop(columns="id"))
+    assert new["movie_id"].tolist() == [0] * TEST_K
+    assert new["recommended_id"].iloc[0] == 5  # noqa: PLR2004
+    assert new["score"].iloc[0] == pytest.approx(1)
+
+
+def test_recommend_new_movie(embedding_store: EmbeddingStore) -> None:
+    """Test movies ingested after training are scored from their stored features."""
+    features = store_preprocessor(embedding_store).assign(id=lambda df: df["id"] + 100)
+    feature_store = MagicMock(spec=FeatureStoreInterface)
+    feature_store.get_features_by_ids.side_effect = lambda group, ids, columns: features.loc[
+        features["id"].isin(ids), ["id", *columns]
+    ]
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP,
+        k=TEST_K,
+        embedding_store=embedding_store,
+        feature_store=feature_store,
+        metadata_columns=[],
+    )
+    pipeline = MovieInferencePipeline(config)
+
+    recommendations = pipeline.recommend([105, 1, 101])
+    assert recommendations["movie_id"].tolist() == [105] * TEST_K + [1] * TEST_K + [101] * TEST_K
+    # each new movie is the twin of a stored one, its closest movie
+    assert recommendations["recommended_id"].tolist()[:: 2 * TEST_K] == [5, 1]
+    stored = recommendations.iloc[TEST_K : 2 * TEST_K].reset_index(drop=True)
+    assert stored.equals(pipeline.recommend([1]))
+
+    with pytest.raises(KeyError, match=r"not found in embeddings: \[999\]"):
+        pipeline.recommend([101, 999])
+
+
+def test_new_movie_without_preprocessor(embedding_store: EmbeddingStore) -> None:
+    """Test only the stored movies are served without the fitted preprocessor."""
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP,
+        embedding_store=embedding_store,
+        feature_store=MagicMock(spec=FeatureStoreInterface),
+    )
+    pipeline = MovieInferencePipeline(config)
+
+    with pytest.raises(KeyError, match="not found in embeddings"):
+        pipeline.recommend([101])
+    with pytest.raises(ValueError, match="No fitted preprocessor stored"):
+        pipeline.recommend_features([{"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0}])
+
+
+def publish(registry: ModelRegistry, first_id: int) -> str:
+    """Publish a version holding random embeddings for 20 movies from ``first_id``."""
+    with registry.new_version() as version:
+        version.embedding_store.save(
+            TEST_EMBEDDING_GROUP,
+            Embeddings.from_features(
+                range(first_id, first_id + 20), default_rng(first_id).random((20, 4))
+            ),
+        )
+    return version.version
+
+
+def test_switch_to_published_version(tmp_path: Path) -> None:
+    """Test a newly published version is served without restarting the pipeline."""
+    registry = ModelRegistry(str(tmp_path))
+    first = publish(registry, 1)
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP, k=TEST_K, registry=registry, reload_seconds=0.01
+    )
+
+    with MovieInferencePipeline(config) as pipeline:
+        assert pipeline.version == first
+        assert pipeline.recommend([1])["recommended_id"].max() <= 20  # noqa: PLR2004
+
+        second = publish(registry, 101)
+        deadline = monotonic() + 5
+        while pipeline.version != second and monotonic() < deadline:
+            sleep(0.01)
+
+        assert pipeline.version == second
+        assert pipeline.recommend([101])["recommended_id"].min() > 100  # noqa: PLR2004
+
+
+def test_registry_not_watched(tmp_path: Path) -> None:
+    """Test the served version only changes on request without a reload interval."""
+    registry = ModelRegistry(str(tmp_path))
+    first = publish(registry, 1)
+    config = InferencePipelineConfig(
+        embedding_group=TEST_EMBEDDING_GROUP, registry=registry, reload_seconds=None
+    )
+    pipeline = MovieInferencePipeline(config)
+    second = publish(registry, 101)
+
+    assert pipeline.version == first
+    assert pipeline.switch(second).version == second
+    assert pipeline.embeddings.ids.min() == 101  # noqa: PLR2004
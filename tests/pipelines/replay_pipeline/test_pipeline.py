@@ -0,0 +1,117 @@
+from gzip import GzipFile
+from json import dumps
+from pathlib import Path
+
+import pytest
+
+from src.pipelines.replay_pipeline.pipeline import (
+    MovieReplayPipeline,
+    ReplayPipelineConfig,
+)
+from src.utils.raw_landing import RawLandingZone
+from src.utils.sqlite_conn import SQLiteConn
+
+TEST_FEATURE_GROUP: str = "movies"
+TEST_BUDGET: int = 1_000_000
+
+
+def movie(movie_id: int, popularity: float = 1.0) -> dict:
+    """Movie as in discover and popular results."""
+    return {
+        "id": movie_id,
+        "adult": False,
+        "original_language": "en",
+        "original_title": f"Movie {movie_id}",
+        "overview": "Overview",
+        "popularity": popularity,
+        "vote_average": 7.5,
+        "vote_count": 10,
+        "release_date": "2024-01-01",
+        "genre_ids": [18],
+    }
+
+
+def details(movie_id: int, genres: list[str]) -> dict:
+    """Movie as in a details response."""
+    return {
+        **movie(movie_id, popularity=9.0),
+        "runtime": 120,
+        "budget": TEST_BUDGET,
+        "revenue": 2_000_000,
+        "status": "Released",
+        "tagline": "Tagline",
+        "genres": [{"id": i, "name": name} for i, name in enumerate(genres)],
+        "spoken_languages": [{"iso_639_1": "en", "name": "English"}],
+    }
+
+
+def land(root: Path, partition: str, endpoint: str, bodies: list[dict]) -> Path:
+    """Land responses in a partition, as the feature pipeline does."""
+    with RawLandingZone(str(root)) as landing:
+        for body in bodies:
+            landing.append(endpoint, f"https://tmdb/{endpoint}", dumps(body).encode())
+    (path,) = landing.files(endpoint)[-1:]
+    target = root / f"{RawLandingZone.PARTITION_PREFIX}{partition}" / path.name
+    target.parent.mkdir(exist_ok=True)
+    path.rename(target)
+    return target
+
+
+def stored_movies(sqlite_store: SQLiteConn) -> dict[int, dict]:
+    movies = sqlite_store.query_features(TEST_FEATURE_GROUP)
+    return {movie["id"]: movie for movie in movies.to_dict("records")}
+
+
+@pytest.fixture
+def raw_dir(tmp_path: Path) -> Path:
+    """Landing zone with two days of discover, popular and details responses."""
+    root = tmp_path / "raw"
+    land(root, "2025-05-01", "discover", [{"results": [movie(1), movie(2)]}])
+    land(root, "2025-05-01", "details", [details(1, ["Drama", "Comedy"])])
+    land(root, "2025-05-01", "popular", [{"results": [movie(1)]}])
+    land(root, "2025-05-02", "discover", [{"results": [movie(1, 5.0), movie(3)]}])
+    land(root, "2025-05-02", "popular", [{"results": [movie(2)]}, {"results": [movie(3)]}])
+    return root
+
+
+def test_invalid_config(tmp_path: Path, raw_dir: Path) -> None:
+    with pytest.raises(ValueError, match="Invalid load type"):
+        ReplayPipelineConfig(feature_group=TEST_FEATURE_GROUP, raw_dir=str(raw_dir), type="full")
+    with pytest.raises(ValueError, match="No raw response files found"):
+        ReplayPipelineConfig(feature_group=TEST_FEATURE_GROUP, raw_dir=str(tmp_path / "empty"))
+
+
+def test_run(raw_dir: Path, sqlite_store: SQLiteConn) -> None:
+    """Test the landed responses rebuild the feature group, details first."""
+    config = ReplayPipelineConfig(
+        feature_group=TEST_FEATURE_GROUP, raw_dir=str(raw_dir), max_workers=2
+    )
+    assert MovieReplayPipeline(config).run(sqlite_store) == 3  # noqa: PLR2004
+
+    movies = stored_movies(sqlite_store)
+    # details take precedence over the later discover result of movie 1
+    assert movies[1]["popularity"] == 9.0  # noqa: PLR2004
+    assert movies[1]["budget"] == TEST_BUDGET
+    assert list(movies[1]["genres"]) == ["Drama", "Comedy"]
+    assert list(movies[1]["spoken_languages"]) == ["English"]
+    assert movies[1]["extraction_date"] == "2025-05-01"
+    assert movies[3]["extraction_date"] == "2025-05-02"
+    assert list(movies[2]["genres"]) == []
+    assert movies[2]["release_date"] == "2024-01-01 00:00:00"
+    # popular movies are those of the latest popular lists
+    assert {movie_id: movies[movie_id]["is_popular"] for movie_id in movies} == {1: 0, 2: 1, 3: 1}
+
+
+def test_truncated_file(tmp_path: Path, sqlite_store: SQLiteConn) -> None:
+    """Test the complete responses of a file left truncated are replayed."""
+    path = land(tmp_path, "2025-05-01", "discover", [{"results": [movie(i)]} for i in range(1, 4)])
+    with GzipFile(path, mode="ab") as file:
+        file.write(dumps({"endpoint": "discover", "body": {"results": [movie(4)]}}).encode())
+    path.write_bytes(path.read_bytes()[:-8])  # drops the trailer of the last member
+
+    responses = MovieReplayPipeline.read(path)
+    assert [body["results"][0]["id"] for body in responses["body"].to_pylist()] == [1, 2, 3]
+    config = ReplayPipelineConfig(feature_group=TEST_FEATURE_GROUP, raw_dir=str(tmp_path))
+    MovieReplayPipeline(config).run(sqlite_store)
+    assert sorted(stored_movies(sqlite_store)) == [1, 2, 3]
+    assert {movie["is_popular"] for movie in stored_movies(sqlite_store).values()} == {None}
@@ -0,0 +1,147 @@
+from pathlib import Path
+
+import pytest
+from numpy import array_equal, float32
+from pandas import ArrowDtype, DataFrame
+from pyarrow import list_, string
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from src.pipelines.training_pipeline.movie_feature_preprocessor import (
+    MovieFeaturePreprocessor,
+    MultiLabelBinarizerTransformer,
+)
+
+TEST_GENRES: list[list[str]] = [
+    ["Acción", "Crimen"],
+    [],
+    ["Drama", "Acción", "Acción"],
+    ["Comedia"],
+]
+
+
+@pytest.fixture
+def movies() -> DataFrame:
+    """Create a small movies frame with the preprocessor columns."""
+    return DataFrame(
+        {
+            "popularity": [219.2, 18.3, None, 5.0],
+            "vote_average": [8.1, 7.1, 6.0, 5.5],
+            "vote_count": [10, 10, 25, 40],
+            "runtime": [112, 101, 90, None],
+            "budget": [0, 0, 1_000_000, 0],
+            "revenue": [0, 0, 2_000_000, 0],
+            "is_popular": [1, 0, 0, 1],
+            "original_language": ["fr", "en", "es", "unknown"],
+            "genres": TEST_GENRES,
+            "spoken_languages": [["Français"], ["English", "Español"], [], ["Klingon"]],
+        }
+    )
+
+
+def test_binarizer_matches_sklearn() -> None:
+    """Test the CSR indicators match sklearn's MultiLabelBinarizer."""
+    X = DataFrame({"genres": TEST_GENRES})
+    mlb = MultiLabelBinarizer()
+    expected = mlb.fit_transform(X["genres"])
+
+    transformer = MultiLabelBinarizerTransformer()
+    indicators = transformer.fit_transform(X)
+
+    assert array_equal(indicators.toarray(), expected)
+    assert array_equal(transformer.fit(X).transform(X).toarray(), expected)
+    assert transformer.get_feature_names_out() == mlb.classes_.tolist()
+
+
+def test_binarizer_ignores_unknown_labels() -> None:
+    """Test labels not seen on fit are ignored on transform."""
+    transformer = MultiLabelBinarizerTransformer().fit(DataFrame({"genres": TEST_GENRES}))
+    indicators = transformer.transform(DataFrame({"genres": [["Western", "Drama"], None]}))
+
+    assert indicators.shape == (2, len(transformer.classes_))
+    assert indicators.toarray()[0].tolist() == [0, 0, 0, 1]
+    assert indicators[1].nnz == 0
+
+
+def test_binarizer_arrow_lists() -> None:
+    """Test Arrow list columns are binarized as lists, missing lists as empty ones."""
+    lists = DataFrame({"genres": [*TEST_GENRES, None]})
+    arrow_lists = lists.astype({"genres": ArrowDtype(list_(string()))})
+
+    transformer = MultiLabelBinarizerTransformer()
+
+    assert array_equal(
+        transformer.fit_transform(arrow_lists).toarray(),
+        transformer.fit_transform(lists).toarray(),
+    )
+
+
+def test_binarizer_mappings() -> None:
+    """Test labels are mapped before binarizing, missing ones to the default label."""
+    transformer = MultiLabelBinarizerTransformer(mappings={"English": "Germanic"})
+    indicators = transformer.fit_transform(DataFrame({"langs": [["English", "Klingon"], []]}))
+
+    assert transformer.get_feature_names_out() == ["Germanic", "Unknown/Other"]
+    assert indicators.toarray().tolist() == [[1, 1], [0, 0]]
+
+
+def test_map_lang(movies: DataFrame) -> None:
+    """Test mapping of language codes and language lists."""
+    mapped = MovieFeaturePreprocessor.map_lang(
+        movies, "spoken_languages", MovieFeaturePreprocessor.SPOKEN_LANGUAGES_MAPPINGS
+    )
+    assert mapped["spoken_languages"].tolist() == [
+        ["European (Romance)"],
+        ["European (Germanic)", "European (Romance)"],
+        [],
+        ["Unknown/Other"],
+    ]
+    assert movies["spoken_languages"].tolist()[0] == ["Français"]  # input untouched
+
+    mapped = MovieFeaturePreprocessor.map_lang(
+        movies, "original_language", MovieFeaturePreprocessor.ORIGINAL_LANGUAGE_MAPPINGS
+    )
+    assert mapped["original_language"].tolist()[:3] == [
+        "European (Romance)",
+        "European (Germanic)",
+        "European (Romance)",
+    ]
+
+
+def test_preprocessor_output(movies: DataFrame) -> None:
+    """Test the preprocessor returns a dense matrix with one column per feature name."""
+    preprocessor = MovieFeaturePreprocessor.get_preprocessor()
+    features = preprocessor.fit_transform(movies.convert_dtypes())
+
+    assert not hasattr(features, "toarray")
+    assert features.shape == (len(movies), len(preprocessor.get_feature_names_out()))
+    assert array_equal(preprocessor.transform(movies.convert_dtypes()), features)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4])
+def test_fit_chunked(movies: DataFrame, tmp_path: Path, chunk_size: int) -> None:
+    """Test the out of core fit matches the in-memory one, even on chunks of missing values."""
+    movies = movies.assign(id=[10, 20, 30, 40], original_title=["a", "b", "c", "d"])
+    expected = MovieFeaturePreprocessor.get_preprocessor().fit_transform(movies.convert_dtypes())
+
+    def chunks() -> list[DataFrame]:
+        return [movies.iloc[i : i + chunk_size] for i in range(0, len(movies), chunk_size)]
+
+    features, ids = MovieFeaturePreprocessor.fit_chunked(
+        MovieFeaturePreprocessor.get_preprocessor(), chunks, str(tmp_path / "features.npy")
+    )
+
+    assert features.dtype == float32
+    assert array_equal(features, expected.astype(float32))
+    assert ids.tolist() == [10, 20, 30, 40]
+
+
+def test_fit_chunked_rows_changed(movies: DataFrame, tmp_path: Path) -> None:
+    """Test the rows must be the same in both passes."""
+    passes = iter([[movies.assign(id=range(4))], [movies.assign(id=range(4))] * 2])
+
+    with pytest.raises(ValueError, match="Rows changed between the passes"):
+        MovieFeaturePreprocessor.fit_chunked(
+            MovieFeaturePreprocessor.get_preprocessor(),
+            lambda: next(passes),
+            str(tmp_path / "features.npy"),
+        )
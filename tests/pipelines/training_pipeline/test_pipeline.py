@@ -0,0 +1,444 @@
+from collections.abc import Callable
+from pathlib import Path
+from re import escape
+from threading import current_thread, main_thread
+from tracemalloc import get_traced_memory, start, stop
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from numpy import allclose, array_equal, float32, memmap
+from numpy.random import default_rng
+from pandas import DataFrame
+from pyarrow import default_memory_pool, proxy_memory_pool, set_memory_pool
+from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+from src.pipelines.training_pipeline.movie_feature_preprocessor import MovieFeaturePreprocessor
+from src.pipelines.training_pipeline.pipeline import MovieTrainPipeline
+from src.pipelines.training_pipeline.text_feature_preprocessor import TextFeaturePreprocessor
+from src.utils.embedding_store import Embeddings, EmbeddingStore
+from src.utils.feature_store_interface import FeatureStoreInterface
+from src.utils.model_registry import ModelRegistry
+from src.utils.recommender_models import RecommenderModel, RecommenderModelConfig
+from src.utils.sqlite_conn import SQLiteConn
+from tests.conftest import TEST_FEATURES, to_numpy
+
+TEST_FEATURE_GROUP: str = "test_movies"
+TEST_EMBEDDING_GROUP: str = "test_embeddings"
+# peak Python, numpy and Arrow memory of a fit from the feature store, relative to the
+# preprocessed matrix: about 2.8 traced and 1.2 in the Arrow pool
+MAX_FIT_MEMORY_RATIO: float = 5.0
+
+
+@pytest.fixture
+def feature_store() -> MagicMock:
+    """Create mock feature store returning a small feature group."""
+    mock = MagicMock(spec=FeatureStoreInterface)
+    mock.query_features.return_value = DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "popularity": [10.0, 20.0, 30.0, 40.0],
+            "vote_average": [7.5, 8.0, 6.0, 5.5],
+            "vote_count": [100, 200, 300, 400],
+            "is_popular": [1, 0, 0, 1],
+        }
+    )
+    return mock
+
+
+def build_model(
+    feature_store: FeatureStoreInterface,
+    name: str,
+    model: Callable,
+    embedding_store: EmbeddingStore | None = None,
+    precision: str = "float32",
+) -> RecommenderModel:
+    return RecommenderModel(
+        RecommenderModelConfig(
+            model_name=name,
+            feature_store=feature_store,
+            training_feature_group=TEST_FEATURE_GROUP,
+            similarity_matrix_group=f"{name}_similarity",
+            required_features=TEST_FEATURES,
+            transformation_pipeline=Pipeline(steps=[("to_numpy", FunctionTransformer(to_numpy))]),
+            model=model,
+            embedding_group=TEST_EMBEDDING_GROUP if embedding_store else None,
+            embedding_store=embedding_store or EmbeddingStore(),
+            precision=precision,
+        )
+    )
+
+
+def test_invalid_executor() -> None:
+    """Test executor validation."""
+    with pytest.raises(ValueError, match="Invalid executor"):
+        MovieTrainPipeline(executor="invalid")
+
+
+def test_no_steps() -> None:
+    """Test running a pipeline without steps."""
+    with pytest.raises(ValueError, match=MovieTrainPipeline.ERR_NO_STEPS):
+        MovieTrainPipeline().save_model_outputs()
+
+
+@pytest.mark.parametrize("executor", ["sequential", "thread"])
+def test_save_model_outputs(feature_store: MagicMock, executor: str) -> None:
+    """Test every step is fitted and stored, with shared inputs prepared once."""
+    cosine = build_model(feature_store, "cosine", cosine_similarity)
+    linear = build_model(feature_store, "linear", linear_kernel)
+
+    pipeline = (
+        MovieTrainPipeline(executor=executor)
+        .add_training_step(cosine)
+        .add_training_step(linear)
+        .save_model_outputs()
+    )
+
+    # same features and preprocessing, the feature group is read only once
+    feature_store.query_features.assert_called_once()
+    assert feature_store.insert.call_count == len(pipeline.steps)
+    assert cosine.similarity_matrix is not None
+    assert linear.similarity_matrix is not None
+
+    expected = cosine_similarity(to_numpy(feature_store.query_features.return_value))
+    assert allclose(cosine.similarity_matrix.to_numpy(), expected)
+
+    assert pipeline.run_metadata["executor"] == executor
+    for name in ("cosine", "linear"):
+        step = pipeline.run_metadata["steps"][name]
+        assert {"prepare_seconds", "fit_seconds", "store_seconds"} <= step.keys()
+    assert pipeline.run_metadata["wall_seconds"] >= 0
+
+
+def test_thread_executor_sqlite_store(
+    feature_store: MagicMock, sqlite_store: SQLiteConn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test fits run in threads while outputs are stored from the calling thread."""
+    sqlite_store.insert(TEST_FEATURE_GROUP, feature_store.query_features.return_value)
+    insert, threads = sqlite_store.insert, []
+
+    def record_insert(*args: Any, **kwargs: Any) -> None:
+        threads.append(current_thread())
+        insert(*args, **kwargs)
+
+    monkeypatch.setattr(sqlite_store, "insert", record_insert)
+    cosine = build_model(sqlite_store, "cosine", cosine_similarity)
+    linear = build_model(sqlite_store, "linear", linear_kernel)
+
+    MovieTrainPipeline(executor="thread", max_workers=2).add_training_step(
+        cosine
+    ).add_training_step(linear).save_model_outputs()
+
+    for name in ("cosine", "linear"):
+        stored = sqlite_store.query_features(feature_group=f"{name}_similarity")
+        assert len(stored) == len(feature_store.query_features.return_value)
+    assert threads == [main_thread()] * 2
+
+
+def test_kernel_models_store_embeddings(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test kernel models store one embedding matrix and no pairwise matrix."""
+    embedding_store = EmbeddingStore(str(tmp_path))
+    cosine = build_model(feature_store, "cosine", cosine_similarity, embedding_store)
+    linear = build_model(feature_store, "linear", linear_kernel, embedding_store)
+
+    MovieTrainPipeline().add_training_step(cosine).add_training_step(linear).save_model_outputs()
+
+    feature_store.insert.assert_not_called()
+    assert cosine.similarity_matrix is None
+    embeddings = embedding_store.load(TEST_EMBEDDING_GROUP)
+    assert embeddings.ids.tolist() == [1, 2, 3, 4]
+
+    features = to_numpy(feature_store.query_features.return_value)
+    scores = embeddings.score(embeddings.vectors, embeddings.norms, "linear")
+    assert allclose(scores, linear_kernel(features), rtol=1e-4)
+
+
+def test_preprocessor_is_stored(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test the pipeline fitted preparing the shared inputs is stored with the embeddings."""
+    embedding_store = EmbeddingStore(str(tmp_path))
+    cosine = build_model(feature_store, "cosine", cosine_similarity, embedding_store)
+    linear = build_model(feature_store, "linear", linear_kernel, embedding_store)
+
+    MovieTrainPipeline().add_training_step(cosine).add_training_step(linear).save_model_outputs()
+
+    assert linear.config.transformation_pipeline is cosine.config.transformation_pipeline
+    preprocessor = embedding_store.load_preprocessor(TEST_EMBEDDING_GROUP)
+    assert preprocessor is not None
+    assert preprocessor.columns == TEST_FEATURES
+    features = feature_store.query_features.return_value
+    assert allclose(preprocessor.transform(features), to_numpy(features))
+
+
+def test_quantized_embeddings(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test quantized embeddings are stored with their top-k drift from full precision."""
+    embedding_store = EmbeddingStore(str(tmp_path))
+    cosine = build_model(feature_store, "cosine", cosine_similarity, embedding_store, "int8")
+
+    MovieTrainPipeline().add_training_step(cosine).save_model_outputs()
+
+    assert embedding_store.load(TEST_EMBEDDING_GROUP).precision == "int8"
+    assert cosine.quantization_drift is not None
+    assert cosine.quantization_drift.keys() == {"recall_at_k", "exact_order"}
+
+
+def test_warm_cache(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test popular and hot movies recommendations are precomputed from the stored embeddings."""
+    embedding_store = EmbeddingStore(str(tmp_path))
+    cosine = build_model(feature_store, "cosine", cosine_similarity, embedding_store, "int8")
+
+    MovieTrainPipeline(warm_cache_k=2, hot_ids=[2]).add_training_step(cosine).save_model_outputs()
+
+    cache = embedding_store.load_cache(TEST_EMBEDDING_GROUP, "cosine")
+    assert cache is not None
+    assert cache.ids.tolist() == [1, 2, 4]
+    neighbours, _ = embedding_store.load(TEST_EMBEDDING_GROUP).top_k([1, 2, 4], k=2)
+    assert (cache.neighbours == neighbours).all()
+
+
+def test_publish_to_registry(feature_store: MagicMock, tmp_path: Path) -> None:
+    """Test a run publishes a new version with its embeddings, warm cache and manifest."""
+    embedding_store = EmbeddingStore(str(tmp_path / "unversioned"))
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    cosine = build_model(feature_store, "cosine", cosine_similarity, embedding_store)
+
+    pipeline = MovieTrainPipeline(warm_cache_k=2, registry=registry)
+    pipeline.add_training_step(cosine).save_model_outputs()
+
+    assert registry.current() == pipeline.run_metadata["version"]
+    assert not embedding_store.root.exists()
+    version_store = registry.embedding_store()
+    assert version_store.load(TEST_EMBEDDING_GROUP).ids.tolist() == [1, 2, 3, 4]
+    assert version_store.load_cache(TEST_EMBEDDING_GROUP, "cosine") is not None
+    manifest = registry.manifest()["models"]["cosine"]
+    assert manifest["fingerprint"] == version_store.fingerprint(TEST_EMBEDDING_GROUP)
+    assert manifest["data_hash"]
+    assert manifest["fit_seconds"] >= 0
+
+
+def test_failed_run_is_not_published(feature_store: MagicMock, tmp_path: Path) -> None:
+    registry = ModelRegistry(str(tmp_path))
+    cosine = build_model(feature_store, "cosine", cosine_similarity, EmbeddingStore(str(tmp_path)))
+    feature_store.query_features.side_effect = [feature_store.query_features.return_value, OSError]
+
+    with pytest.raises(OSError):
+        MovieTrainPipeline(warm_cache_k=2, registry=registry).add_training_step(
+            cosine
+        ).save_model_outputs()
+    assert registry.current() is None
+    assert registry.versions() == []
+
+
+def test_warm_cache_before_store(feature_store: MagicMock, tmp_path: Path) -> None:
+    cosine = build_model(feature_store, "cosine", cosine_similarity, EmbeddingStore(str(tmp_path)))
+    with pytest.raises(ValueError, match=escape(RecommenderModel.ERR_NOT_STORED)):
+        cosine.fit().store_warm_cache(2)
+
+
+def test_invalid_precision(feature_store: MagicMock) -> None:
+    with pytest.raises(ValueError, match="Invalid precision"):
+        build_model(feature_store, "cosine", cosine_similarity, precision="int4")
+
+
+def test_chunked_inputs(tmp_path: Path) -> None:
+    """Test inputs preprocessed out of core match the in-memory ones, memory-mapped."""
+    movies = DataFrame(
+        {
+            "id": [1, 2, 3],
+            "popularity": [10.0, None, 30.0],
+            "vote_average": [7.5, 8.0, 6.0],
+            "vote_count": [100, 200, 300],
+            "runtime": [90, 120, None],
+            "budget": [0, 10, 20],
+            "revenue": [0, 30, 40],
+            "is_popular": [1, 0, 0],
+            "original_language": ["en", "fr", "en"],
+            "genres": [["Drama"], [], ["Drama", "Comedy"]],
+            "spoken_languages": [["English"], ["Français"], []],
+        }
+    )
+    feature_store = MagicMock(spec=FeatureStoreInterface)
+    feature_store.query_features.return_value = movies
+    feature_store.iter_features.side_effect = lambda *_, chunk_size, **__: [
+        movies.iloc[i : i + chunk_size] for i in range(0, len(movies), chunk_size)
+    ]
+
+    def build(chunk_size: int | None) -> RecommenderModel:
+        return RecommenderModel(
+            RecommenderModelConfig(
+                model_name="cosine",
+                feature_store=feature_store,
+                training_feature_group=TEST_FEATURE_GROUP,
+                similarity_matrix_group="cosine_similarity",
+                required_features=movies.columns.drop("id").tolist(),
+                transformation_pipeline=MovieFeaturePreprocessor.get_preprocessor(),
+                model=cosine_similarity,
+                embedding_group=TEST_EMBEDDING_GROUP,
+                embedding_store=EmbeddingStore(str(tmp_path / "embeddings")),
+                chunk_size=chunk_size,
+                model_input_dir=str(tmp_path),
+            )
+        )
+
+    (features, ids), (chunked, chunked_ids) = (
+        build(None).prepare_inputs(),
+        build(2).prepare_inputs(),
+    )
+
+    assert array_equal(chunked, features.astype(float32))
+    assert array_equal(chunked_ids, ids)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    # the embeddings of out of core inputs are normalized into a memory-mapped matrix too
+    model = build(2).fit(chunked, chunked_ids).store_outputs()
+    assert model.embeddings is not None
+    assert isinstance(model.embeddings.vectors, memmap)
+    assert len(list(tmp_path.glob("*.npy"))) == 2  # noqa: PLR2004
+    stored = model.config.embedding_store.load(TEST_EMBEDDING_GROUP)
+    assert allclose(stored.vectors, Embeddings.from_features(ids, features).vectors)
+
+
+def test_top_k_neighbours(
+    feature_store: MagicMock, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the top k neighbours computed in blocks are stored instead of the matrix."""
+    monkeypatch.setattr(RecommenderModel, "NEIGHBOURS_BLOCK_ROWS", 3)
+    monkeypatch.setattr(RecommenderModel, "NEIGHBOURS_BLOCK_COLUMNS", 2)
+    movies = DataFrame(
+        {
+            "id": [10, 20, 30, 40, 50],
+            "overview": ["space war", "war in space", "bakery in Paris", "Paris bakery", None],
+            "tagline": [None, "", "bread", None, "nothing shared"],
+        }
+    )
+    feature_store.query_features.return_value = movies
+    feature_store.iter_features.side_effect = lambda *_, chunk_size, **__: [
+        movies.iloc[i : i + chunk_size] for i in range(0, len(movies), chunk_size)
+    ]
+
+    def fit(chunk_size: int | None) -> RecommenderModel:
+        config = RecommenderModelConfig(
+            model_name="text",
+            feature_store=feature_store,
+            training_feature_group=TEST_FEATURE_GROUP,
+            similarity_matrix_group="text_similarity",
+            required_features=TextFeaturePreprocessor.TEXT_COLS,
+            transformation_pipeline=TextFeaturePreprocessor.get_preprocessor(2**10),
+            model=cosine_similarity,
+            chunk_size=chunk_size,
+            model_input_dir=str(tmp_path),
+            chunked_fit=TextFeaturePreprocessor.fit_chunked,
+            top_k=2,
+        )
+        return RecommenderModel(config).fit().store_outputs()
+
+    model = fit(None)
+    assert model.similarity_matrix is None
+    assert model.neighbours is not None
+    assert model.neighbours.columns.tolist() == ["movie_id", "rank", "recommended_id", "score"]
+    assert model.neighbours["movie_id"].tolist() == [10, 10, 20, 20, 30, 30, 40, 40, 50, 50]
+    assert model.neighbours["rank"].tolist() == [1, 2] * 5
+    assert model.neighbours["recommended_id"].tolist()[::2] == [20, 10, 40, 30, 10]
+    assert not (model.neighbours["movie_id"] == model.neighbours["recommended_id"]).any()
+    assert model.neighbours["score"].tolist()[-2:] == [0, 0]
+    similarities = cosine_similarity(
+        TextFeaturePreprocessor.get_preprocessor(2**10).fit_transform(movies)
+    )
+    expected = [similarities[i, j] for i, j in [(0, 1), (1, 0), (2, 3), (3, 2), (4, 0)]]
+    assert allclose(model.neighbours["score"].tolist()[::2], expected)
+    stored = feature_store.insert.call_args.kwargs
+    assert stored["feature_group"] == "text_similarity"
+    assert stored["features"] is model.neighbours
+
+    chunked = fit(2)
+    assert chunked.neighbours is not None
+    assert chunked.neighbours.equals(model.neighbours)
+
+
+def test_invalid_top_k(feature_store: MagicMock) -> None:
+    with pytest.raises(ValueError, match="Top k must be positive"):
+        RecommenderModelConfig(
+            model_name="cosine",
+            feature_store=feature_store,
+            training_feature_group=TEST_FEATURE_GROUP,
+            similarity_matrix_group="cosine_similarity",
+            required_features=TEST_FEATURES,
+            transformation_pipeline=Pipeline(steps=[("to_numpy", FunctionTransformer(to_numpy))]),
+            model=cosine_similarity,
+            top_k=0,
+        )
+
+
+def test_invalid_chunk_size(feature_store: MagicMock) -> None:
+    with pytest.raises(ValueError, match="Chunk size must be positive"):
+        RecommenderModelConfig(
+            model_name="cosine",
+            feature_store=feature_store,
+            training_feature_group=TEST_FEATURE_GROUP,
+            similarity_matrix_group="cosine_similarity",
+            required_features=TEST_FEATURES,
+            transformation_pipeline=Pipeline(steps=[("to_numpy", FunctionTransformer(to_numpy))]),
+            model=cosine_similarity,
+            chunk_size=0,
+        )
+
+
+def test_fit_memory(sqlite_store: SQLiteConn) -> None:
+    """Test a fit from the feature store peaks within a small multiple of its matrix."""
+    movies, rng = 20_000, default_rng(0)
+    genres = ["Drama", "Comedia", "Acción", "Terror", "Animación"]
+    sqlite_store.insert(
+        TEST_FEATURE_GROUP,
+        DataFrame(
+            {
+                "id": range(movies),
+                "original_title": [f"Movie {i}" for i in range(movies)],
+                "popularity": rng.random(movies) * 100,
+                "vote_average": rng.random(movies) * 10,
+                "vote_count": rng.integers(0, 5_000, movies),
+                "runtime": rng.integers(60, 180, movies),
+                "budget": rng.integers(0, 10**8, movies),
+                "revenue": rng.integers(0, 10**9, movies),
+                "is_popular": rng.integers(0, 2, movies),
+                "original_language": rng.choice(["en", "fr", "es", "ja"], movies),
+                "genres": [list(rng.choice(genres, i % 3, replace=False)) for i in range(movies)],
+                "spoken_languages": [["English"] if i % 2 else ["Français"] for i in range(movies)],
+            }
+        ),
+    )
+    preprocessor = MovieFeaturePreprocessor.get_preprocessor()
+    model = RecommenderModel(
+        RecommenderModelConfig(
+            model_name="cosine",
+            feature_store=sqlite_store,
+            training_feature_group=TEST_FEATURE_GROUP,
+            similarity_matrix_group="cosine_similarity",
+            required_features=[
+                "original_title",
+                *MovieFeaturePreprocessor.NUM_COLS,
+                *MovieFeaturePreprocessor.CAT_COLS,
+                *MovieFeaturePreprocessor.MULTI_LABEL_CAT_COLS,
+            ],
+            transformation_pipeline=preprocessor,
+            model=cosine_similarity,
+            embedding_group=TEST_EMBEDDING_GROUP,
+        )
+    )
+
+    # Python and numpy allocations are traced, Arrow buffers come from its memory pool
+    arrow_pool = proxy_memory_pool(default_memory_pool())
+    previous_pool = default_memory_pool()
+    set_memory_pool(arrow_pool)
+    start()
+    try:
+        model.fit()
+        _, traced_peak = get_traced_memory()
+    finally:
+        stop()
+        set_memory_pool(previous_pool)
+
+    # the peaks may not coincide, their sum bounds the peak of the fit
+    peak = traced_peak + arrow_pool.max_memory()
+    matrix_bytes = movies * len(preprocessor.get_feature_names_out()) * 8
+    assert peak < MAX_FIT_MEMORY_RATIO * matrix_bytes, peak / matrix_bytes
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+from numpy import allclose, float32
+from pandas import DataFrame
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+
+from src.pipelines.training_pipeline.text_feature_preprocessor import TextFeaturePreprocessor
+
+TEST_N_FEATURES: int = 2**10
+TEST_COMPONENTS: int = 16
+
+
+@pytest.fixture
+def movies() -> DataFrame:
+    """Create movies with missing overviews and taglines."""
+    return DataFrame(
+        {
+            "id": [1, 2, 3, 4, 5],
+            "overview": [
+                "A war veteran returns home",
+                "A war veteran fights in space",
+                None,
+                "Two friends open a bakery in Paris",
+                "Friends open a bakery",
+            ],
+            "tagline": ["", None, "Only a tagline", "Bread and love", None],
+        }
+    )
+
+
+def chunks(movies: DataFrame, chunk_size: int) -> list[DataFrame]:
+    return [movies.iloc[i : i + chunk_size] for i in range(0, len(movies), chunk_size)]
+
+
+def test_join_text(movies: DataFrame) -> None:
+    """Test each movie is one document of its overview and tagline."""
+    text = TextFeaturePreprocessor.join_text(movies)
+    assert text.tolist()[1:3] == ["A war veteran fights in space ", " Only a tagline"]
+
+
+def test_similar_text(movies: DataFrame) -> None:
+    """Test movies sharing terms are the most similar, stop words aside."""
+    features = TextFeaturePreprocessor.get_preprocessor(TEST_N_FEATURES).fit_transform(movies)
+    similarities = cosine_similarity(features)
+
+    assert features.shape == (len(movies), TEST_N_FEATURES)
+    assert similarities[0].argsort()[-2] == 1
+    assert similarities[3].argsort()[-2] == 4  # noqa: PLR2004
+    assert similarities[2, [0, 1, 3, 4]].max() == 0
+
+
+@pytest.mark.parametrize("n_components", [None, TEST_COMPONENTS])
+def test_fit_chunked(movies: DataFrame, tmp_path: Path, n_components: int | None) -> None:
+    """Test a single pass over chunks matches the in-memory preprocessing."""
+    expected = TextFeaturePreprocessor.get_preprocessor(
+        TEST_N_FEATURES, n_components
+    ).fit_transform(movies)
+
+    features, ids = TextFeaturePreprocessor.fit_chunked(
+        TextFeaturePreprocessor.get_preprocessor(TEST_N_FEATURES, n_components),
+        lambda: chunks(movies, 2),
+        str(tmp_path / "text.npy"),
+    )
+
+    assert ids.tolist() == movies["id"].tolist()
+    if n_components is None:
+        assert isinstance(features, csr_matrix)
+        assert (features != expected).nnz == 0
+        assert not features.data.flags.writeable  # memory-mapped read-only
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "text.data.f32",
+            "text.indices.i32",
+        ]
+    else:
+        assert features.shape == (len(movies), n_components)
+        assert allclose(features, expected.astype(float32))
+        assert features.dtype == float32
+        assert [path.name for path in tmp_path.iterdir()] == ["text.f32"]
+
+
+def test_fit_chunked_no_rows(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match=TextFeaturePreprocessor.ERR_NO_ROWS):
+        TextFeaturePreprocessor.fit_chunked(
+            TextFeaturePreprocessor.get_preprocessor(), list, str(tmp_path / "text.npy")
+        )
+    assert not list(tmp_path.iterdir())
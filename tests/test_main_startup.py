@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+from subprocess import run
+
+# generous for slow CI runners, today the CLI imports in ~0.15s without the pipelines
+STARTUP_BUDGET_SECONDS: float = 0.5
+TRAINING_MODULES: tuple[str, ...] = ("sklearn", "scipy", "threadpoolctl")
+
+
+def import_times(statement: str) -> dict[str, float]:
+    """Cumulative import time in seconds of each module imported by ``statement``."""
+    result = run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    )
+    times: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_main_startup_budget() -> None:
+    """Test the CLI entry point imports within budget and without any pipeline."""
+    times = import_times("import main")
+
+    assert times["main"] < STARTUP_BUDGET_SECONDS
+    assert not [module for module in times if module.startswith(("pandas", *TRAINING_MODULES))]
+
+
+def test_feature_pipeline_skips_training_stack() -> None:
+    """Test the feature pipeline runs without loading scikit-learn."""
+    times = import_times(
+        "import main; import src.pipelines.feature_pipeline.pipeline, src.utils.sqlite_conn"
+    )
+    assert not [module for module in times if module.startswith(TRAINING_MODULES)]
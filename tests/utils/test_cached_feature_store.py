@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+
+import pytest
+from pandas import DataFrame
+
+from src.utils.cached_feature_store import CachedFeatureStore
+from src.utils.feature_store_interface import FeatureStoreInterface
+
+TEST_FEATURE_GROUP: str = "movies"
+TEST_COLUMNS: list[str] = ["original_title"]
+
+
+def lookup(feature_group: str, ids: list[int], columns: list[str]) -> DataFrame:
+    return DataFrame({"id": ids, "original_title": [f"Movie {i}" for i in ids]})
+
+
+@pytest.fixture
+def feature_store() -> MagicMock:
+    mock = MagicMock(spec=FeatureStoreInterface)
+    mock.get_features_by_ids.side_effect = lookup
+    return mock
+
+
+def test_lookups_are_cached(feature_store: MagicMock) -> None:
+    """Test only the ids missing from the cache are read from the store."""
+    store = CachedFeatureStore(feature_store)
+
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [1, 2], TEST_COLUMNS)
+    features = store.get_features_by_ids(TEST_FEATURE_GROUP, [3, 2, 1], TEST_COLUMNS)
+
+    assert features["id"].tolist() == [3, 2, 1]
+    assert features["original_title"].tolist() == ["Movie 3", "Movie 2", "Movie 1"]
+    assert [call.args[1] for call in feature_store.get_features_by_ids.call_args_list] == [
+        [1, 2],
+        [3],
+    ]
+
+
+def test_least_recently_used_rows_are_evicted(feature_store: MagicMock) -> None:
+    """Test the cache is bounded, evicting the least recently used rows."""
+    store = CachedFeatureStore(feature_store, max_rows=2)
+
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [1, 2], TEST_COLUMNS)
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [1], TEST_COLUMNS)
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [3], TEST_COLUMNS)
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [1, 2], TEST_COLUMNS)
+
+    assert len(store) == 2  # noqa: PLR2004
+    assert feature_store.get_features_by_ids.call_args.args[1] == [2]
+
+
+def test_writes_invalidate_the_cache(feature_store: MagicMock) -> None:
+    """Test inserts and updates drop the cached rows of their feature group."""
+    store = CachedFeatureStore(feature_store)
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [1], TEST_COLUMNS)
+    store.get_features_by_ids("other", [1], TEST_COLUMNS)
+
+    store.insert(TEST_FEATURE_GROUP, DataFrame({"id": [1]}))
+
+    assert len(store) == 1
+    feature_store.insert.assert_called_once()
+    store.get_features_by_ids(TEST_FEATURE_GROUP, [1], TEST_COLUMNS)
+    assert feature_store.get_features_by_ids.call_count == 3  # noqa: PLR2004
+
+
+def test_invalid_size(feature_store: MagicMock) -> None:
+    with pytest.raises(ValueError, match="Cache size must be positive"):
+        CachedFeatureStore(feature_store, max_rows=0)
@@ -0,0 +1,294 @@
+from collections.abc import Callable
+from pathlib import Path
+from pickle import PicklingError
+
+import pytest
+from numpy import allclose, float32, load, memmap, ndarray, save, zeros
+from numpy.random import default_rng
+from pandas import DataFrame
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
+from sklearn.preprocessing import FunctionTransformer
+
+from src.utils.embedding_store import (
+    Embeddings,
+    EmbeddingStore,
+    FittedPreprocessor,
+    RecommendationCache,
+)
+
+TEST_MOVIES: int = 50
+TEST_FEATURES: int = 8
+TEST_K: int = 5
+TEST_FIRST_ID: int = 100
+
+
+@pytest.fixture
+def features() -> ndarray:
+    """Create a random feature matrix with a zero row."""
+    matrix = default_rng(0).random((TEST_MOVIES, TEST_FEATURES))
+    matrix[3] = 0
+    return matrix
+
+
+@pytest.fixture
+def embeddings(features: ndarray) -> Embeddings:
+    return Embeddings.from_features(range(TEST_FIRST_ID, TEST_FIRST_ID + TEST_MOVIES), features)
+
+
+def test_embeddings_are_normalized(embeddings: Embeddings, features: ndarray) -> None:
+    """Test rows are stored with unit norm as float32, next to their norms."""
+    assert embeddings.vectors.dtype == float32
+    assert allclose(embeddings.vectors * embeddings.norms[:, None], features, atol=1e-6)
+    assert embeddings.norms[3] == 0
+
+
+@pytest.mark.parametrize(
+    ("kernel", "model"), [("cosine", cosine_similarity), ("linear", linear_kernel)]
+)
+def test_score_matches_sklearn(
+    embeddings: Embeddings, features: ndarray, kernel: str, model: Callable
+) -> None:
+    """Test every kernel is a single product against the stored embeddings."""
+    scores = embeddings.score(embeddings.vectors, embeddings.norms, kernel)
+    assert allclose(scores, model(features, features), rtol=1e-4, atol=1e-5)
+
+
+def test_from_sparse_features(features: ndarray) -> None:
+    """Test sparse feature matrices give the same embeddings."""
+    sparse = Embeddings.from_features(range(TEST_MOVIES), csr_matrix(features))
+    dense = Embeddings.from_features(range(TEST_MOVIES), features)
+    assert allclose(sparse.vectors, dense.vectors)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_normalize_to_file(
+    tmp_path: Path, features: ndarray, monkeypatch: pytest.MonkeyPatch, sparse: bool
+) -> None:
+    """Test rows normalized block by block into a memory-mapped file match in-memory ones."""
+    monkeypatch.setattr(Embeddings, "NORMALIZE_BLOCK_BYTES", 7 * TEST_FEATURES * 4)
+    path = tmp_path / "vectors.npy"
+    save(path, features)
+    inputs = csr_matrix(features) if sparse else load(path, mmap_mode="r")
+
+    mapped = Embeddings.from_features(range(TEST_MOVIES), inputs, str(tmp_path / "unit.npy"))
+    expected = Embeddings.from_features(range(TEST_MOVIES), features)
+
+    assert isinstance(mapped.vectors, memmap)
+    assert mapped.vectors.filename == str(tmp_path / "unit.npy")
+    assert allclose(mapped.vectors, expected.vectors)
+    assert allclose(mapped.norms, expected.norms)
+
+
+def test_top_k(embeddings: Embeddings, features: ndarray) -> None:
+    """Test neighbours are the best scored movies, excluding the movie itself."""
+    neighbours, scores = embeddings.top_k(
+        [TEST_FIRST_ID, TEST_FIRST_ID + 10], k=TEST_K, batch_size=1
+    )
+
+    expected = cosine_similarity(features)[[0, 10]]
+    expected[[0, 1], [0, 10]] = -1
+    assert neighbours.shape == (2, TEST_K)
+    assert TEST_FIRST_ID not in neighbours[0]
+    assert (neighbours - TEST_FIRST_ID == expected.argsort(axis=1)[:, ::-1][:, :TEST_K]).all()
+    assert (scores[:, :-1] >= scores[:, 1:]).all()
+
+
+@pytest.mark.parametrize("kernel", ["cosine", "linear"])
+def test_top_k_features(embeddings: Embeddings, features: ndarray, kernel: str) -> None:
+    """Test feature rows are scored like the stored movies, excluding stored ones if named."""
+    movie_ids = [TEST_FIRST_ID, TEST_FIRST_ID + 10]
+    rows = features[[0, 10]]
+
+    neighbours, scores = embeddings.top_k_features(
+        rows, k=TEST_K, kernel=kernel, movie_ids=movie_ids
+    )
+    expected_neighbours, expected_scores = embeddings.top_k(movie_ids, k=TEST_K, kernel=kernel)
+    assert (neighbours == expected_neighbours).all()
+    assert allclose(scores, expected_scores, rtol=1e-5)
+
+    # a new movie has every stored movie as candidate, its twin included
+    neighbours, scores = embeddings.top_k_features(csr_matrix(rows), k=TEST_K, batch_size=1)
+    assert neighbours[:, 0].tolist() == movie_ids
+    assert allclose(scores[:, 0], 1)
+
+
+def test_top_k_features_width(embeddings: Embeddings) -> None:
+    with pytest.raises(ValueError, match="Feature rows have 2 columns"):
+        embeddings.top_k_features(zeros((1, 2)))
+
+
+def test_unknown_movie(embeddings: Embeddings) -> None:
+    """Test querying a movie without embeddings."""
+    with pytest.raises(KeyError, match="not found"):
+        embeddings.top_k([1])
+
+
+def test_invalid_kernel(embeddings: Embeddings) -> None:
+    with pytest.raises(ValueError, match="Invalid kernel"):
+        embeddings.score(embeddings.vectors, embeddings.norms, "euclidean")
+
+
+def test_store_roundtrip(tmp_path: Path, embeddings: Embeddings) -> None:
+    """Test embeddings are saved and loaded memory-mapped."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save("movies", embeddings)
+    loaded = store.load("movies")
+
+    assert (loaded.ids == embeddings.ids).all()
+    assert allclose(loaded.vectors, embeddings.vectors)
+    assert allclose(loaded.norms, embeddings.norms)
+
+    with pytest.raises(FileNotFoundError):
+        store.load("missing")
+
+
+def test_save_replaces_files(
+    tmp_path: Path, embeddings: Embeddings, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test saves swap whole files, mapped ones stay valid and failed saves change nothing."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save("movies", embeddings)
+    mapped = store.load("movies")
+    vectors = embeddings.vectors.copy()
+
+    fingerprint = store.save("movies", Embeddings.from_features(embeddings.ids, -vectors))
+
+    assert allclose(mapped.vectors, vectors)
+    assert allclose(store.load("movies").vectors, -vectors)
+
+    def fail() -> str:
+        raise RuntimeError
+
+    monkeypatch.setattr(Embeddings, "fingerprint", lambda _: fail())
+    with pytest.raises(RuntimeError):
+        store.save("movies", embeddings)
+
+    assert store.fingerprint("movies") == fingerprint
+    assert allclose(store.load("movies").vectors, -vectors)
+    assert [path.name for path in tmp_path.iterdir()] == ["movies"]
+
+
+def test_save_switches_versions(tmp_path: Path, embeddings: Embeddings) -> None:
+    """Test saves make a whole new version current, keeping the one they replaced."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save("movies", embeddings.quantize("int8"))
+    store.save("movies", embeddings.quantize("float16"))
+    previous = (tmp_path / "movies" / EmbeddingStore.POINTER_FILE).read_text()
+    fingerprint = store.save("movies", embeddings)
+    store.save_cache("movies", RecommendationCache.build(embeddings, embeddings.ids, TEST_K))
+
+    current = (tmp_path / "movies" / EmbeddingStore.POINTER_FILE).read_text()
+    assert sorted(path.name for path in (tmp_path / "movies").iterdir()) == sorted(
+        [EmbeddingStore.POINTER_FILE, previous, current]
+    )
+    assert sorted(path.name for path in (tmp_path / "movies" / current).iterdir()) == [
+        EmbeddingStore.FINGERPRINT_FILE,
+        "ids.npy",
+        "norms.npy",
+        "vectors.npy",
+        EmbeddingStore.CACHE_FILE.format("cosine"),
+    ]
+    loaded = store.load("movies")
+    assert loaded.scales is None
+    assert allclose(loaded.dense(), embeddings.vectors)
+    assert store.fingerprint("movies") == fingerprint
+    # scales left over next to float rows are never applied
+    scaled = Embeddings(embeddings.ids, embeddings.vectors, embeddings.norms, embeddings.norms)
+    assert allclose(scaled.dense(), embeddings.vectors)
+
+
+@pytest.mark.parametrize(("precision", "atol"), [("float16", 1e-3), ("int8", 1e-2)])
+def test_quantize(
+    tmp_path: Path,
+    embeddings: Embeddings,
+    monkeypatch: pytest.MonkeyPatch,
+    precision: str,
+    atol: float,
+) -> None:
+    """Test quantized embeddings score close to full precision, also blockwise and stored."""
+    monkeypatch.setattr(Embeddings, "BLOCK_ROWS", 16)
+    quantized = embeddings.quantize(precision)
+    store = EmbeddingStore(str(tmp_path))
+    store.save("movies", quantized)
+    loaded = store.load("movies")
+
+    assert loaded.precision == precision
+    assert loaded.vectors.nbytes < embeddings.vectors.nbytes
+    assert allclose(loaded.dense(), embeddings.vectors, atol=atol)
+    assert allclose(
+        loaded.score(embeddings.vectors[:2], embeddings.norms[:2], "linear"),
+        embeddings.score(embeddings.vectors[:2], embeddings.norms[:2], "linear"),
+        atol=atol * 10,
+    )
+    assert loaded.top_k_drift(embeddings, k=TEST_K)["recall_at_k"] >= 0.9  # noqa: PLR2004
+
+    store.save("movies", loaded.quantize("float32"))
+    assert store.load("movies").scales is None
+
+
+def test_invalid_precision(embeddings: Embeddings) -> None:
+    with pytest.raises(ValueError, match="Invalid precision"):
+        embeddings.quantize("int4")
+
+
+def test_top_k_drift(embeddings: Embeddings) -> None:
+    """Test the drift of identical embeddings is null."""
+    assert embeddings.top_k_drift(embeddings, k=TEST_K, sample=10) == {
+        "recall_at_k": 1.0,
+        "exact_order": 1.0,
+    }
+
+
+def test_recommendation_cache(tmp_path: Path, embeddings: Embeddings) -> None:
+    """Test warm recommendations match top-k and are dropped once the embeddings change."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save("movies", embeddings)
+    hot_ids = [TEST_FIRST_ID + 7, TEST_FIRST_ID, -1]  # unknown movies are not cached
+    store.save_cache("movies", RecommendationCache.build(embeddings, hot_ids, TEST_K))
+
+    cache = store.load_cache("movies", "cosine")
+    assert cache is not None
+    assert cache.ids.tolist() == [TEST_FIRST_ID, TEST_FIRST_ID + 7]
+    assert cache.k == TEST_K
+    neighbours, scores = embeddings.top_k(cache.ids, k=TEST_K)
+    assert (cache.neighbours == neighbours).all()
+    assert allclose(cache.scores, scores)
+
+    rows, hits = cache.lookup([TEST_FIRST_ID + 7, TEST_FIRST_ID + 1])
+    assert hits.tolist() == [True, False]
+    assert rows[0] == 1
+    assert store.load_cache("movies", "linear") is None
+
+    store.save("movies", embeddings.quantize("int8"))
+    assert store.load_cache("movies", "cosine") is None
+
+
+def test_preprocessor(tmp_path: Path, embeddings: Embeddings) -> None:
+    """Test the fitted preprocessor is served only with the embeddings it computed."""
+    store = EmbeddingStore(str(tmp_path))
+    assert store.save("movies", embeddings)
+    assert store.load_preprocessor("movies") is None
+
+    pipeline = FunctionTransformer().fit(DataFrame({"a": [1.0], "b": [2.0]}))
+    store.save_preprocessor("movies", FittedPreprocessor(embeddings.fingerprint(), ["a"], pipeline))
+    preprocessor = store.load_preprocessor("movies")
+    assert preprocessor is not None
+    assert preprocessor.transform(DataFrame({"b": [4.0], "a": [3.0]})).columns.tolist() == ["a"]
+    with pytest.raises(ValueError, match=r"missing the columns: \['a'\]"):
+        preprocessor.transform(DataFrame({"b": [4.0]}))
+
+    store.save("movies", embeddings.quantize("int8"))
+    assert store.load_preprocessor("movies") is None
+
+
+def test_unpicklable_preprocessor(tmp_path: Path, embeddings: Embeddings) -> None:
+    """Test a preprocessor that can't be stored leaves none behind."""
+    store = EmbeddingStore(str(tmp_path))
+    fingerprint = store.save("movies", embeddings)
+    pipeline = FunctionTransformer(lambda X: X)
+    store.save_preprocessor("movies", FittedPreprocessor(fingerprint, ["a"], FunctionTransformer()))
+
+    with pytest.raises((PicklingError, AttributeError)):
+        store.save_preprocessor("movies", FittedPreprocessor(fingerprint, ["a"], pipeline))
+    assert store.load_preprocessor("movies") is None
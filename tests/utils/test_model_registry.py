@@ -0,0 +1,103 @@
+from pathlib import Path
+
+import pytest
+from numpy.random import default_rng
+
+from src.utils.embedding_store import Embeddings
+from src.utils.model_registry import ModelRegistry, RegistryWatcher
+
+TEST_EMBEDDING_GROUP: str = "movies"
+
+
+def publish(registry: ModelRegistry, seed: int = 0) -> str:
+    """Publish a version holding random embeddings for movies 1 to 10."""
+    with registry.new_version() as version:
+        version.embedding_store.save(
+            TEST_EMBEDDING_GROUP,
+            Embeddings.from_features(range(1, 11), default_rng(seed).random((10, 4))),
+        )
+        version.manifest["data_hash"] = f"hash-{seed}"
+    return version.version
+
+
+def test_invalid_keep(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="at least one version"):
+        ModelRegistry(str(tmp_path), keep=0)
+
+
+def test_new_version(tmp_path: Path) -> None:
+    """Test a version is published with its manifest once written."""
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.current() is None
+    with pytest.raises(FileNotFoundError):
+        registry.path()
+
+    first = publish(registry)
+    second = publish(registry, seed=1)
+
+    assert registry.versions() == [first, second]
+    assert registry.current() == second
+    manifest = registry.manifest()
+    assert manifest["version"] == second
+    assert manifest["data_hash"] == "hash-1"
+    assert "created_at" in manifest
+    assert registry.embedding_store(first).load(TEST_EMBEDDING_GROUP).ids.tolist() == list(
+        range(1, 11)
+    )
+
+
+def test_failed_version_is_not_published(tmp_path: Path) -> None:
+    """Test a version failing while written leaves no trace."""
+    registry = ModelRegistry(str(tmp_path))
+    first = publish(registry)
+
+    with pytest.raises(RuntimeError), registry.new_version() as version:
+        version.embedding_store.save(
+            TEST_EMBEDDING_GROUP, Embeddings.from_features([1], default_rng(0).random((1, 4)))
+        )
+        raise RuntimeError
+
+    assert registry.versions() == [first]
+    assert registry.current() == first
+    assert list(registry.versions_path.iterdir()) == [registry.path(first)]
+
+
+def test_rollback(tmp_path: Path) -> None:
+    """Test rolling back publishes the previous version, or the given one."""
+    registry = ModelRegistry(str(tmp_path))
+    first, second, third = publish(registry), publish(registry), publish(registry)
+
+    assert registry.rollback() == second
+    assert registry.current() == second
+    assert registry.rollback(third) == third
+    registry.rollback(first)
+    with pytest.raises(FileNotFoundError, match="No version published before"):
+        registry.rollback()
+    with pytest.raises(FileNotFoundError, match="not found"):
+        registry.rollback("missing")
+
+
+def test_retention(tmp_path: Path) -> None:
+    """Test only the most recent versions are kept, and always the current one."""
+    registry = ModelRegistry(str(tmp_path), keep=2)
+    versions = [publish(registry), publish(registry), publish(registry)]
+
+    assert registry.versions() == versions[1:]
+
+    registry.rollback(versions[1])
+    assert ModelRegistry(str(tmp_path), keep=1).prune() == []
+    assert registry.versions() == versions[1:]
+
+
+def test_watcher(tmp_path: Path) -> None:
+    """Test the watcher notifies every newly published version once."""
+    registry = ModelRegistry(str(tmp_path))
+    published: list[str] = []
+    watcher = RegistryWatcher(registry, published.append, version=publish(registry))
+
+    assert not watcher.check()
+    second = publish(registry)
+    assert watcher.check()
+    assert not watcher.check()
+    assert published == [second]
+    assert watcher.version == second
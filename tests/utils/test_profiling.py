@@ -0,0 +1,56 @@
+from pathlib import Path
+from pstats import Stats
+from time import sleep
+
+import pytest
+
+from src.utils.profiling import StageProfiler
+from src.utils.telemetry import Telemetry
+
+
+def busy_work() -> list[int]:
+    sleep(0.05)
+    return [i * i for i in range(50_000)]
+
+
+def test_invalid_mode() -> None:
+    with pytest.raises(ValueError, match="Invalid profile mode"):
+        StageProfiler("perf", stage="fit")
+
+
+def test_matches_last_component() -> None:
+    """Test stages match by full name or by their last component."""
+    profiler = StageProfiler("sampling", stage="fit")
+    assert profiler.matches("fit")
+    assert profiler.matches("cosine-movies.fit")
+    assert not profiler.matches("cosine-movies.fit_transform")
+
+
+def test_only_selected_stage_is_profiled(tmp_path: Path) -> None:
+    """Test the telemetry stages only profile the selected stage."""
+    telemetry = Telemetry()
+    telemetry.profiler = StageProfiler("cprofile", stage="fit")
+    with telemetry.stage("model.prepare_inputs"):
+        busy_work()
+    with telemetry.stage("model.fit"):
+        busy_work()
+
+    files = telemetry.profiler.write(str(tmp_path))
+
+    assert sorted(file.name for file in files) == ["model.fit.collapsed", "model.fit.pstats"]
+    functions = Stats(str(tmp_path / "model.fit.pstats")).get_stats_profile().func_profiles
+    assert "busy_work" in functions
+    assert "busy_work (test_profiling.py" in (tmp_path / "model.fit.collapsed").read_text()
+
+
+def test_tracemalloc(tmp_path: Path) -> None:
+    """Test the allocations of a stage are reported by line."""
+    profiler = StageProfiler("tracemalloc", stage="run")
+    with profiler.profile("run"):
+        squares = busy_work()  # still referenced when the snapshot is taken
+
+    profiler.write(str(tmp_path))
+    report = (tmp_path / "run.tracemalloc.txt").read_text()
+    assert report.startswith("# peak traced memory")
+    assert "test_profiling.py" in report
+    assert squares
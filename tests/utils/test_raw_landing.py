@@ -0,0 +1,48 @@
+from datetime import date
+from gzip import GzipFile
+from json import loads
+from pathlib import Path
+
+import pytest
+
+from src.utils.raw_landing import RawLandingZone
+
+
+def test_append(tmp_path: Path) -> None:
+    """Test responses are appended as NDJSON lines to a file per endpoint and day."""
+    with RawLandingZone(str(tmp_path)) as landing:
+        landing.append("discover", "https://tmdb/discover?page=1", b'{"results": [{"id": 1}]}')
+        landing.append("discover", "https://tmdb/discover?page=2", b'{\n  "results": []\n}')
+        landing.append("details", "https://tmdb/movie/1", b'{"id": 1, "tagline": "a\\nb"}')
+
+    (path,) = landing.files("discover")
+    assert landing.partition(path) == date.today().isoformat()
+    assert landing.endpoint(path) == "discover"
+    assert path.name == f"discover-{landing.run}{RawLandingZone.FILE_SUFFIX}"
+    with GzipFile(path) as file:
+        responses = [loads(line) for line in file]
+    assert [response["url"][-1] for response in responses] == ["1", "2"]
+    assert [response["body"] for response in responses] == [
+        {"results": [{"id": 1}]},
+        {"results": []},
+    ]
+    with GzipFile(landing.files("details")[0]) as file:
+        assert loads(file.read())["body"]["tagline"] == "a\nb"
+
+
+def test_runs_write_their_own_files(tmp_path: Path) -> None:
+    """Test runs never append to the files of another run."""
+    for _ in range(2):
+        with RawLandingZone(str(tmp_path)) as landing:
+            landing.append("popular", "https://tmdb/movie/popular", b'{"results": []}')
+
+    assert len(RawLandingZone(str(tmp_path)).files("popular")) == 2  # noqa: PLR2004
+    assert RawLandingZone(str(tmp_path)).files("details") == []
+
+
+def test_append_closed(tmp_path: Path) -> None:
+    landing = RawLandingZone(str(tmp_path))
+    landing.close()
+
+    with pytest.raises(RuntimeError, match="is closed"):
+        landing.append("discover", "https://tmdb/discover", b"{}")
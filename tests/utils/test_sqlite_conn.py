@@ -0,0 +1,310 @@
+from collections.abc import Iterator
+from typing import Any
+
+import pyarrow as pa
+import pytest
+from pandas import DataFrame, concat
+
+from src.utils.sqlite_conn import SQLiteConn
+
+TEST_FEATURE_GROUP: str = "movies"
+
+
+def store_movies(sqlite_store: SQLiteConn) -> None:
+    sqlite_store.insert(
+        TEST_FEATURE_GROUP,
+        DataFrame(
+            {
+                "id": [1, 2, 3, 4],
+                "popularity": [5.0, 50.0, 1.0, 9.0],
+                "is_popular": [False, False, True, False],
+                "genres": [["Drama"], [], ["Acción"], ["Drama"]],
+                "extraction_date": ["2025-05-01", "2025-05-01", "2025-05-01", "2025-06-01"],
+            }
+        ),
+    )
+
+
+def test_fetch_existing_movie_ids(sqlite_store: SQLiteConn) -> None:
+    store_movies(sqlite_store)
+
+    assert sqlite_store.fetch_existing_movie_ids(TEST_FEATURE_GROUP) == {1, 2, 3, 4}
+
+
+def test_insert_replace(sqlite_store: SQLiteConn, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test readers see the previous rows until a replacing insert swaps them at once."""
+    store_movies(sqlite_store)
+    to_sql = DataFrame.to_sql
+    seen: list[set[int]] = []
+
+    def write_and_read(features: DataFrame, *args: Any, **kwargs: Any) -> int | None:
+        written: int | None = to_sql(features, *args, **kwargs)
+        with sqlite_store.reader() as conn:
+            rows = conn.execute(f"SELECT id FROM {TEST_FEATURE_GROUP}").fetchall()  # noqa: S608
+        seen.append({movie_id for (movie_id,) in rows})
+        return written
+
+    monkeypatch.setattr(DataFrame, "to_sql", write_and_read)
+    sqlite_store.insert(
+        TEST_FEATURE_GROUP,
+        DataFrame({"id": [7, 8], "popularity": [1.0, 2.0], "extraction_date": "2025-07-01"}),
+        mode="replace",
+    )
+
+    assert seen == [{1, 2, 3, 4}]
+    assert sqlite_store.fetch_existing_movie_ids(TEST_FEATURE_GROUP) == {7, 8}
+    features = sqlite_store.query_features(TEST_FEATURE_GROUP)
+    assert features.columns.tolist() == ["id", "popularity", "extraction_date"]
+    with sqlite_store.reader() as conn:
+        tables = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    assert (f"{TEST_FEATURE_GROUP}{SQLiteConn.REPLACING_SUFFIX}",) not in tables
+
+
+def test_watermarks(sqlite_store: SQLiteConn) -> None:
+    """Test watermarks are stored per feature group and name, replacing the previous one."""
+    assert sqlite_store.fetch_watermark(TEST_FEATURE_GROUP, "release_date") is None
+
+    sqlite_store.store_watermark(TEST_FEATURE_GROUP, "release_date", "2025-05-01")
+    sqlite_store.store_watermark(TEST_FEATURE_GROUP, "release_date", "2025-06-01")
+    sqlite_store.store_watermark("other", "release_date", "2025-01-01")
+
+    assert sqlite_store.fetch_watermark(TEST_FEATURE_GROUP, "release_date") == "2025-06-01"
+    assert sqlite_store.fetch_watermark(TEST_FEATURE_GROUP, "popularity") is None
+
+
+def test_fetch_stale_movie_ids(sqlite_store: SQLiteConn) -> None:
+    """Test stale movies are returned popular first, then by popularity, up to the limit."""
+    store_movies(sqlite_store)
+
+    assert sqlite_store.fetch_stale_movie_ids(TEST_FEATURE_GROUP, "2025-06-01", limit=10) == [
+        3,
+        2,
+        1,
+    ]
+    assert sqlite_store.fetch_stale_movie_ids(TEST_FEATURE_GROUP, "2025-06-01", limit=2) == [3, 2]
+    assert sqlite_store.fetch_stale_movie_ids(TEST_FEATURE_GROUP, "2025-05-01", limit=10) == []
+
+
+def test_refresh_attempts(sqlite_store: SQLiteConn) -> None:
+    """Test movies attempted since the staleness date are skipped until the attempt ages."""
+    store_movies(sqlite_store)
+
+    sqlite_store.store_refresh_attempts(TEST_FEATURE_GROUP, [3], "2025-05-20")
+    sqlite_store.store_refresh_attempts("other", [2], "2025-07-01")
+
+    assert sqlite_store.fetch_stale_movie_ids(TEST_FEATURE_GROUP, "2025-05-15", limit=10) == [
+        2,
+        1,
+    ]
+    assert sqlite_store.fetch_stale_movie_ids(TEST_FEATURE_GROUP, "2025-06-01", limit=10) == [
+        3,
+        2,
+        1,
+    ]
+
+
+def test_update_features(sqlite_store: SQLiteConn) -> None:
+    """Test updates only change the given columns of the matching rows."""
+    store_movies(sqlite_store)
+
+    updated = sqlite_store.update_features(
+        TEST_FEATURE_GROUP,
+        DataFrame(
+            {
+                "id": [2, 99],
+                "popularity": [75.5, 1.0],
+                "genres": [["Comedia"], []],
+                "extraction_date": ["2025-06-02", "2025-06-02"],
+            }
+        ),
+    )
+
+    movies = sqlite_store.query_features(
+        TEST_FEATURE_GROUP, ["id", "popularity", "is_popular", "genres", "extraction_date"]
+    ).set_index("id")
+    assert updated == 1
+    assert len(movies) == 4  # noqa: PLR2004
+    assert movies.loc[2].tolist() == [75.5, 0, ["Comedia"], "2025-06-02"]
+    assert movies.loc[1].tolist() == [5.0, 0, ["Drama"], "2025-05-01"]
+
+    previous = sqlite_store.query_features(
+        TEST_FEATURE_GROUP, ["id", "popularity"], as_of="2025-05-01"
+    ).set_index("id")
+    assert previous.loc[2, "popularity"] == 50.0  # noqa: PLR2004
+
+
+def test_update_popular_movies(sqlite_store: SQLiteConn) -> None:
+    """Test every stored movie gets its popular flag, only changed rows are written."""
+    store_movies(sqlite_store)
+
+    updated = sqlite_store.update_popular_movies(TEST_FEATURE_GROUP, {2, 3, 99})
+
+    movies = sqlite_store.query_features(TEST_FEATURE_GROUP, ["id", "is_popular"])
+    assert updated == 1
+    assert movies.sort_values("id")["is_popular"].tolist() == [0, 1, 1, 0]
+
+
+def test_reads_latest_version(sqlite_store: SQLiteConn) -> None:
+    """Test reads return the latest version of each movie, or the one as of a date."""
+    store_movies(sqlite_store)
+    sqlite_store.insert(
+        TEST_FEATURE_GROUP,
+        DataFrame({"id": [1], "popularity": [6.0], "is_popular": [True], "genres": [[]]}).assign(
+            extraction_date="2025-07-01"
+        ),
+    )
+
+    current = sqlite_store.query_features(TEST_FEATURE_GROUP, ["id", "popularity"])
+    as_of = sqlite_store.query_features(
+        TEST_FEATURE_GROUP, ["id", "popularity"], as_of="2025-06-15"
+    )
+
+    assert current.sort_values("id")["popularity"].tolist() == [6.0, 50.0, 1.0, 9.0]
+    assert as_of.sort_values("id")["popularity"].tolist() == [5.0, 50.0, 1.0, 9.0]
+    assert sqlite_store.query_features(TEST_FEATURE_GROUP, ["id"], as_of="2025-04-01").empty
+    assert sqlite_store.fetch_stale_movie_ids(TEST_FEATURE_GROUP, "2025-06-01", limit=10) == [
+        3,
+        2,
+    ]
+
+
+def test_iter_features(sqlite_store: SQLiteConn) -> None:
+    """Test chunks hold the current rows in the order of a full query."""
+    store_movies(sqlite_store)
+    columns = ["id", "popularity", "genres"]
+
+    chunks = list(sqlite_store.iter_features(TEST_FEATURE_GROUP, columns, chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    streamed = concat(chunks, ignore_index=True)
+    assert streamed.equals(sqlite_store.query_features(TEST_FEATURE_GROUP, columns))
+    assert streamed["genres"].tolist() == [["Drama"], [], ["Acción"], ["Drama"]]
+
+
+def test_read_dtypes(sqlite_store: SQLiteConn) -> None:
+    """Test reads are Arrow typed by the stored columns, even in chunks of missing values."""
+    sqlite_store.insert(
+        TEST_FEATURE_GROUP,
+        DataFrame(
+            {
+                "id": [1, 2, 3],
+                "popularity": [5.5, 1.0, None],
+                "genres": [["Drama"], ["Drama", "Acción"], None],
+            }
+        ),
+    )
+
+    first, last = sqlite_store.iter_features(TEST_FEATURE_GROUP, chunk_size=2)
+
+    assert first.dtypes.equals(last.dtypes)
+    assert [str(dtype) for dtype in last.dtypes] == [
+        "int64[pyarrow]",
+        "double[pyarrow]",
+        "list<item: string>[pyarrow]",
+    ]
+    assert first["genres"].tolist() == [["Drama"], ["Drama", "Acción"]]
+
+
+def movie_batch(ids: list[int], extraction_date: str) -> pa.RecordBatch:
+    return pa.RecordBatch.from_pydict(
+        {
+            "id": ids,
+            "popularity": [float(i) for i in ids],
+            "extraction_date": [extraction_date] * len(ids),
+        }
+    )
+
+
+def test_bulk_load_replace(sqlite_store: SQLiteConn, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a replace load recreates the feature group with the schema of the batches."""
+    store_movies(sqlite_store)
+    monkeypatch.setattr(SQLiteConn, "STAGING_ROWS", 2)
+
+    stored = sqlite_store.bulk_load(
+        TEST_FEATURE_GROUP,
+        [movie_batch([1, 2, 3], "2025-07-01"), movie_batch([3, 5], "2025-08-01")],
+    )
+
+    assert stored == 4  # noqa: PLR2004
+    movies = sqlite_store.query_features(TEST_FEATURE_GROUP)
+    assert movies.columns.tolist() == ["id", "popularity", "extraction_date"]
+    assert movies.set_index("id")["extraction_date"].to_dict() == {
+        1: "2025-07-01",
+        2: "2025-07-01",
+        3: "2025-08-01",
+        5: "2025-08-01",
+    }
+
+
+def test_failed_bulk_load_keeps_feature_group(sqlite_store: SQLiteConn) -> None:
+    """Test the stored feature group is untouched when the batches fail midway."""
+    store_movies(sqlite_store)
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        yield movie_batch([1, 2], "2025-07-01")
+        raise OSError
+
+    with pytest.raises(OSError):
+        sqlite_store.bulk_load(TEST_FEATURE_GROUP, batches())
+
+    assert sqlite_store.fetch_existing_movie_ids(TEST_FEATURE_GROUP) == {1, 2, 3, 4}
+    assert "genres" in sqlite_store.query_features(TEST_FEATURE_GROUP).columns
+
+
+def test_compact(sqlite_store: SQLiteConn) -> None:
+    """Test compaction keeps the latest versions of each movie only."""
+    store_movies(sqlite_store)
+    for extraction_date in ("2025-07-01", "2025-08-01"):
+        sqlite_store.insert(
+            TEST_FEATURE_GROUP,
+            DataFrame({"id": [1, 2], "popularity": [1.0, 2.0], "is_popular": [False, False]})
+            .assign(genres=[[], []])
+            .assign(extraction_date=extraction_date),
+        )
+
+    deleted = sqlite_store.compact(TEST_FEATURE_GROUP, keep_versions=2)
+
+    assert deleted == 2  # noqa: PLR2004
+    with sqlite_store.reader() as conn:
+        versions = conn.execute(
+            "SELECT id, extraction_date FROM movies ORDER BY id, extraction_date"
+        ).fetchall()
+    assert versions == [
+        (1, "2025-07-01"),
+        (1, "2025-08-01"),
+        (2, "2025-07-01"),
+        (2, "2025-08-01"),
+        (3, "2025-05-01"),
+        (4, "2025-06-01"),
+    ]
+    assert len(sqlite_store.query_features(TEST_FEATURE_GROUP, ["id"])) == 4  # noqa: PLR2004
+    with pytest.raises(ValueError, match="At least one version"):
+        sqlite_store.compact(TEST_FEATURE_GROUP, keep_versions=0)
+
+
+def test_compact_not_versioned(sqlite_store: SQLiteConn) -> None:
+    """Test feature groups without versions cannot be compacted nor read as of a date."""
+    sqlite_store.insert("similarities", DataFrame({"a": [1.0], "b": [2.0]}))
+
+    with pytest.raises(ValueError, match="no id and extraction_date"):
+        sqlite_store.compact("similarities")
+    with pytest.raises(ValueError, match="no id and extraction_date"):
+        sqlite_store.query_features("similarities", as_of="2025-01-01")
+
+
+@pytest.mark.parametrize("max_lookup_params", [512, 2])
+def test_get_features_by_ids(
+    sqlite_store: SQLiteConn, monkeypatch: pytest.MonkeyPatch, max_lookup_params: int
+) -> None:
+    """Test lookups return the current rows of the known ids, in the requested order."""
+    monkeypatch.setattr(SQLiteConn, "MAX_LOOKUP_PARAMS", max_lookup_params)
+    store_movies(sqlite_store)
+
+    features = sqlite_store.get_features_by_ids(
+        TEST_FEATURE_GROUP, [4, 1, 99, 3, 4], ["popularity", "genres"]
+    )
+
+    assert features.columns.tolist() == ["id", "popularity", "genres"]
+    assert features["id"].tolist() == [4, 1, 3]
+    assert features["genres"].tolist() == [["Drama"], ["Drama"], ["Acción"]]
+    assert sqlite_store.get_features_by_ids(TEST_FEATURE_GROUP, [99], ["popularity"]).empty
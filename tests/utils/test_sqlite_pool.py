@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from gc import collect
+from pathlib import Path
+from sqlite3 import Connection, ProgrammingError, connect
+from threading import Thread
+
+import pytest
+from pandas import DataFrame
+
+from src.utils.sqlite_conn import SQLiteConn
+from src.utils.sqlite_pool import SQLitePool
+
+TEST_FEATURE_GROUP: str = "movies"
+TEST_THREADS: int = 8
+
+
+def new_database(path: Path) -> str:
+    connect(path).close()
+    return str(path)
+
+
+def test_pools_are_shared_per_database(tmp_path: Path) -> None:
+    """Test every path of a database shares its pool, and other databases do not."""
+    first = new_database(tmp_path / "first.sqlite")
+    second = new_database(tmp_path / "second.sqlite")
+
+    with SQLitePool.get(first) as pool:
+        assert SQLitePool.get(str(tmp_path / "." / "first.sqlite")) is pool
+        assert SQLitePool.get(second) is not pool
+    assert SQLitePool.get(first) is not pool
+    SQLitePool.get(first).close()
+    SQLitePool.get(second).close()
+
+
+def test_stores_use_their_own_database(tmp_path: Path) -> None:
+    """Test a store of another database does not read the first one."""
+    with (
+        SQLiteConn(new_database(tmp_path / "first.sqlite")) as first,
+        SQLiteConn(new_database(tmp_path / "second.sqlite")) as second,
+    ):
+        first.insert(TEST_FEATURE_GROUP, DataFrame({"id": [1], "title": ["First"]}))
+        second.insert(TEST_FEATURE_GROUP, DataFrame({"id": [2], "title": ["Second"]}))
+
+        assert first.query_features(TEST_FEATURE_GROUP, ["title"])["title"].tolist() == ["First"]
+        assert second.query_features(TEST_FEATURE_GROUP, ["title"])["title"].tolist() == ["Second"]
+
+
+def test_concurrent_readers_and_writer(sqlite_store: SQLiteConn) -> None:
+    """Test threads read and write through the same store, readers in their connection."""
+    sqlite_store.insert(
+        TEST_FEATURE_GROUP,
+        DataFrame({"id": range(100), "popularity": 1.0, "extraction_date": "2025-05-01"}),
+    )
+
+    def read_and_write(thread: int) -> int:
+        sqlite_store.update_features(
+            TEST_FEATURE_GROUP, DataFrame({"id": [thread], "popularity": [float(thread)]})
+        )
+        return len(sqlite_store.get_features_by_ids(TEST_FEATURE_GROUP, range(50), ["popularity"]))
+
+    with ThreadPoolExecutor(max_workers=TEST_THREADS) as executor:
+        read: list[int] = list(executor.map(read_and_write, range(TEST_THREADS)))
+
+    assert read == [50] * TEST_THREADS
+    popularity = sqlite_store.get_features_by_ids(
+        TEST_FEATURE_GROUP, range(TEST_THREADS), ["popularity"]
+    )
+    assert popularity["popularity"].tolist() == [float(i) for i in range(TEST_THREADS)]
+    with sqlite_store.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_readers_closed_with_their_thread(tmp_path: Path) -> None:
+    """Test the read connection of a thread is closed once the thread exits."""
+    pool = SQLitePool(new_database(tmp_path / "readers.sqlite"))
+    connections: list[Connection] = []
+
+    def read() -> None:
+        with pool.reader() as conn:
+            connections.append(conn)
+
+    threads = [Thread(target=read) for _ in range(TEST_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    collect()
+
+    assert len(set(connections)) == TEST_THREADS
+    for conn in connections:
+        with pytest.raises(ProgrammingError, match="closed"):
+            conn.execute("SELECT 1")
+    with pool.reader() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    pool.close()
+
+
+def test_closed_pool(tmp_path: Path) -> None:
+    pool = SQLitePool(new_database(tmp_path / "closed.sqlite"))
+    pool.close()
+
+    with pytest.raises(RuntimeError, match="is closed"), pool.reader():
+        pass
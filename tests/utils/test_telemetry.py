@@ -0,0 +1,95 @@
+from json import loads
+from pathlib import Path
+
+import pytest
+
+from src.utils.telemetry import Telemetry
+
+TEST_ROWS: int = 25
+
+
+@pytest.fixture
+def telemetry() -> Telemetry:
+    return Telemetry()
+
+
+def test_stage_aggregates_calls(telemetry: Telemetry) -> None:
+    """Test a stage entered many times reports its calls and total time."""
+    for _ in range(3):
+        with telemetry.stage("query"):
+            sum(range(10_000))
+
+    stage = telemetry.stages["query"]
+    assert stage["calls"] == 3  # noqa: PLR2004
+    assert stage["wall_seconds"] > 0
+    assert stage["cpu_seconds"] >= 0
+    assert stage["peak_rss_bytes"] > 0
+
+
+def test_stage_decorator_records_failures(telemetry: Telemetry) -> None:
+    """Test the stage decorator records the stage when the call raises."""
+
+    @telemetry.stage("failing")
+    def failing() -> None:
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        failing()
+    assert telemetry.stages["failing"]["calls"] == 1
+
+
+def test_counters_by_labels(telemetry: Telemetry) -> None:
+    """Test counters are kept per name and labels."""
+    telemetry.count("rows_read_total", TEST_ROWS, feature_group="movies")
+    telemetry.count("rows_read_total", TEST_ROWS, feature_group="movies")
+    telemetry.count("rows_read_total", 1, feature_group="other")
+
+    counters = {
+        counter["labels"]["feature_group"]: counter["value"]
+        for counter in telemetry.report()["counters"]
+    }
+    assert counters == {"movies": 2 * TEST_ROWS, "other": 1}
+
+
+def test_prometheus_format(telemetry: Telemetry) -> None:
+    """Test metrics are rendered with their type and labels."""
+    with telemetry.stage("fit"):
+        pass
+    telemetry.count("http_requests_total", endpoint="discover", status=200)
+
+    lines = telemetry.to_prometheus(pipeline="train").splitlines()
+    assert "# TYPE movie_recommender_http_requests_total counter" in lines
+    assert (
+        'movie_recommender_http_requests_total{pipeline="train",endpoint="discover",status="200"} 1'
+        in lines
+    )
+    assert any(
+        line.startswith('movie_recommender_stage_calls{pipeline="train",stage="fit"}')
+        for line in lines
+    )
+    assert "# TYPE movie_recommender_stage_calls counter" in lines
+    assert "# TYPE movie_recommender_stage_wall_seconds counter" in lines
+    assert "# TYPE movie_recommender_stage_peak_rss_bytes gauge" in lines
+
+
+def test_prometheus_label_escaping(telemetry: Telemetry) -> None:
+    """Test backslashes, quotes and newlines in label values are escaped."""
+    telemetry.count("errors_total", error='bad "id"\n\\')
+
+    lines = telemetry.to_prometheus().splitlines()
+    assert r'movie_recommender_errors_total{error="bad \"id\"\n\\"} 1' in lines
+
+
+def test_write(telemetry: Telemetry, tmp_path: Path) -> None:
+    """Test the JSON and Prometheus reports are written to the reporting directory."""
+    with telemetry.stage("run"):
+        telemetry.count("rows_written_total", TEST_ROWS)
+
+    json_path, prometheus_path = telemetry.write("feature", directory=str(tmp_path))
+
+    report = loads(json_path.read_text())
+    assert report["pipeline"] == "feature"
+    assert report["stages"]["run"]["calls"] == 1
+    assert prometheus_path.name == "feature_pipeline.prom"
+    assert "movie_recommender_rows_written_total" in prometheus_path.read_text()
+    assert not list(tmp_path.glob("*.tmp"))